@@ -0,0 +1,59 @@
+# Parse and serialize throughput of the task file formats: format 1 (a dict
+# per task, indented) against format 2 (positional rows, see todo.codec).
+#
+#   python -m benchmarks.bench_codec [count]
+
+import gc
+import json
+import sys
+import time
+
+from benchmarks.synthetic import make_tasks
+from todo import codec
+from todo.models import Task
+
+
+def dumps_v1(tasks: list[Task]) -> str:
+    return json.dumps({"last_id": len(tasks), "tasks": [t.to_dict() for t in tasks]}, indent=2)
+
+
+def loads_v1(text: str) -> list[Task]:
+    return [Task.from_dict(r) for r in json.loads(text)["tasks"]]
+
+
+def dumps_v2(tasks: list[Task]) -> str:
+    return codec.dumps(len(tasks), codec.encode_tasks(tasks))
+
+
+def loads_v2(text: str) -> list[Task]:
+    return codec.loads(json.loads(text))[1]
+
+
+def best_of(runs: int, fn, arg) -> float:
+    times = []
+    for _ in range(runs):
+        gc.collect()
+        t0 = time.perf_counter()
+        fn(arg)
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    tasks = make_tasks(count)
+    print(f"{count} tasks")
+    print(f"{'format':<8} {'size':>10} {'serialize':>16} {'parse':>16}")
+    for label, dumps, loads in [("1", dumps_v1, loads_v1), ("2", dumps_v2, loads_v2)]:
+        text = dumps(tasks)
+        assert loads(text) == tasks
+        write = best_of(5, dumps, tasks)
+        read = best_of(5, loads, text)
+        print(
+            f"{label:<8} {len(text.encode('utf-8')) / 1024 / 1024:>6.1f} MiB"
+            f" {count / write:>10,.0f} tasks/s {count / read:>10,.0f} tasks/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
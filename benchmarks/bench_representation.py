@@ -0,0 +1,71 @@
+# Compares memory and load time of the Task dataclass, before and after
+# slots=True, against TaskColumns.
+#
+#   python -m benchmarks.bench_representation [count]
+
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Optional
+import gc
+import sys
+import time
+import tracemalloc
+
+from benchmarks.columnar import TaskColumns
+from benchmarks.synthetic import make_records
+from todo.models import Recurrence, Status, Task
+
+
+# Task as it was before slots=True: every instance carries a __dict__
+@dataclass
+class DictTask:
+    id: int
+    title: str
+    created_at: datetime
+    task_date: date
+    status: Status = Status.ACTIVE
+    description: Optional[str] = None
+    recurrence: Optional[Recurrence] = None
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        recurrence = data.get("recurrence")
+        return cls(
+            id=data["id"],
+            title=data["title"],
+            description=data.get("description"),
+            created_at=datetime.fromisoformat(data["created_at"]),
+            task_date=date.fromisoformat(data["task_date"]),
+            status=Status(data.get("status", "active")),
+            recurrence=Recurrence.from_dict(recurrence) if recurrence else None,
+        )
+
+
+def measure(label: str, load, records: list[dict]) -> None:
+    gc.collect()
+    t0 = time.perf_counter()
+    result = load(records)
+    elapsed = time.perf_counter() - t0
+    del result
+
+    # Separate run: tracemalloc slows allocation down considerably
+    gc.collect()
+    tracemalloc.start()
+    result = load(records)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<12} {elapsed * 1000:>9.1f} ms {size / 1024 / 1024:>9.1f} MiB {size / len(records):>7.0f} B/task")
+    del result
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    records = make_records(count)
+    print(f"{count} tasks")
+    measure("dataclass", lambda rs: [DictTask.from_dict(r) for r in rs], records)
+    measure("slots", lambda rs: [Task.from_dict(r) for r in rs], records)
+    measure("columnar", TaskColumns.from_records, records)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+# Times the storage and rendering hot paths, and end-to-end CLI commands,
+# over synthetic histories of 10k, 100k and 1M tasks. Results are written as
+# JSON so runs can be compared across commits:
+#
+#   python -m benchmarks.bench_suite --output before.json
+#   python -m benchmarks.bench_suite --compare before.json --threshold 0.2
+#
+# With --compare, exits with status 1 if any benchmark got slower than the
+# baseline by more than the threshold (0.2 = 20%).
+
+from datetime import datetime, timedelta
+from pathlib import Path
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import START, write_task_file
+from todo.models import TaskStorage
+from todo.month import month_bounds, render_month
+from todo.week import render_week, week_bounds
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1M": 1_000_000}
+LOOKUPS = 1000  # get_task/_next_id calls per timed run
+PROJECT_ROOT = Path(__file__).parent.parent.resolve()
+
+
+def timed(fn, repeat: int) -> dict:
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - t0)
+    return {"best": min(runs), "median": statistics.median(runs), "runs": runs}
+
+
+def run_cli(task_file: Path, argv: list[str]) -> None:
+    env = {**os.environ, "TODO_TASK_FILE": str(task_file), "TODO_NO_DAEMON": "1"}
+    env.pop("TODO_STORAGE", None)
+    subprocess.run(
+        [sys.executable, "-m", "todo.cli", *argv],
+        env=env, cwd=PROJECT_ROOT, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+
+
+def bench_size(count: int, workdir: Path, repeat: int, cli: bool) -> dict[str, dict]:
+    task_file = workdir / f"tasks-{count}.json"
+    write_task_file(task_file, count)
+    # No fsync: measure serialization, not the disk
+    storage = TaskStorage(task_file, durable=False)
+    rng = random.Random(0)
+    ids = [rng.randint(1, count) for _ in range(LOOKUPS)]
+    reference = START + timedelta(days=1000)
+    first, last = month_bounds(reference.year, reference.month)
+
+    benchmarks = {
+        "load_tasks": storage.load_tasks,
+        "save_tasks": storage.save_tasks,
+        f"get_task_x{LOOKUPS}": lambda: [storage.get_task(i) for i in ids],
+        f"next_id_x{LOOKUPS}": lambda: [storage._next_id() for _ in ids],
+        "list_tasks": storage.list_tasks,
+        "render_week": lambda: render_week(storage.tasks_between(*week_bounds(reference)), reference),
+        "render_month": lambda: render_month(storage.tasks_between(first, last), reference.year, reference.month),
+    }
+    if cli:
+        day = reference.isoformat()
+        benchmarks.update({
+            "cli_list": lambda: run_cli(task_file, ["list", "--limit", "20"]),
+            "cli_week": lambda: run_cli(task_file, ["week", "--date", day]),
+            "cli_month": lambda: run_cli(task_file, ["month", "--date", day]),
+            "cli_add": lambda: run_cli(task_file, ["add", "--title", "Benchmark", "--date", day]),
+        })
+
+    results = {}
+    for name, fn in benchmarks.items():
+        results[name] = timed(fn, repeat)
+        print(f"  {name:<16} {results[name]['best'] * 1000:>10.2f} ms")
+    return results
+
+
+def compare(current: dict, baseline: dict, threshold: float, min_delta: float = 0.0) -> list[str]:
+    # A benchmark regresses when it is both `threshold` slower relative to
+    # the baseline and `min_delta` seconds slower in absolute terms, so
+    # sub-millisecond timings don't fail the run on noise.
+    regressions = []
+    for size, results in current["results"].items():
+        for name, result in results.items():
+            before = baseline["results"].get(size, {}).get(name)
+            if before is None:
+                continue
+            ratio = result["best"] / before["best"] if before["best"] else 1.0
+            flag = ""
+            if ratio > 1 + threshold and result["best"] - before["best"] > min_delta:
+                flag = "  REGRESSION"
+                regressions.append(f"{size}/{name}")
+            print(
+                f"{size:>5} {name:<16} {before['best'] * 1000:>10.2f} ms"
+                f" -> {result['best'] * 1000:>10.2f} ms  {ratio:>5.2f}x{flag}"
+            )
+    return regressions
+
+
+def _git_commit() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="bench_suite")
+    parser.add_argument("--sizes", default=",".join(SIZES), help=f"Comma-separated, from {', '.join(SIZES)}")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark; the best one is reported")
+    parser.add_argument("--no-cli", action="store_true", help="Skip the end-to-end CLI benchmarks")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown before failing (default: 0.2)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5, help="Ignore slowdowns smaller than this (default: 0.5)")
+    args = parser.parse_args(argv)
+
+    sizes = [s.strip() for s in args.sizes.split(",") if s.strip()]
+    unknown = [s for s in sizes if s not in SIZES]
+    if unknown:
+        parser.error(f"unknown size(s): {', '.join(unknown)}")
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "repeat": args.repeat,
+        },
+        "results": {},
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in sizes:
+            print(f"{size} tasks")
+            report["results"][size] = bench_size(SIZES[size], Path(workdir), args.repeat, cli=not args.no_cli)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        regressions = compare(report, baseline, args.threshold, args.min_delta_ms / 1000)
+        if regressions:
+            print(f"{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+from array import array
+from collections.abc import Iterable, Iterator
+from datetime import datetime, date
+from typing import Optional
+
+from todo.binary import EPOCH, MICROSECOND, NO_STRING
+from todo.codec import STATUSES, STATUS_CODES, STATUS_CODES_BY_VALUE
+from todo.models import Recurrence, Task, Status
+
+
+class StringTable:
+    def __init__(self) -> None:
+        self.strings: list[str] = []
+        self._index: dict[str, int] = {}
+
+    def intern(self, s: Optional[str]) -> int:
+        if s is None:
+            return NO_STRING
+        idx = self._index.get(s)
+        if idx is None:
+            idx = self._index[s] = len(self.strings)
+            self.strings.append(s)
+        return idx
+
+    def get(self, idx: int) -> Optional[str]:
+        return None if idx == NO_STRING else self.strings[idx]
+
+
+# Column-per-field task store: ids, ordinal dates, creation timestamps and
+# status codes sit in typed arrays and titles/descriptions are interned, so a
+# task costs a few machine words instead of a Task object with its own
+# datetime, date and string references. Series are rare, so their rules are
+# kept per row in a dict rather than in a column.
+#
+# The columnar option measured by bench_representation.py, kept here rather
+# than in todo/: at 100k tasks it takes ~28% less memory than slotted Tasks
+# but loads 1.5-2x slower, and every reader of the storage API would pay for a
+# TaskView per access, so no backend uses it. Rows are only appended: there's
+# no delete and no date index, and rows_between() doesn't expand series into
+# their occurrences.
+class TaskColumns:
+    def __init__(self) -> None:
+        self.ids = array("q")
+        self.dates = array("i")         # date.toordinal()
+        self.created = array("q")       # microseconds since EPOCH
+        self.statuses = array("B")      # index into STATUSES
+        self.titles = array("q")        # index into strings
+        self.descriptions = array("q")  # index into strings, or NO_STRING
+        self.recurrences: dict[int, Recurrence] = {}  # row -> rule of a series
+        self.strings = StringTable()
+
+    @classmethod
+    def from_tasks(cls, tasks: Iterable[Task]) -> "TaskColumns":
+        columns = cls()
+        for task in tasks:
+            columns.append(task)
+        return columns
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict]) -> "TaskColumns":
+        # Straight from task dicts (see todo.lazy.iter_task_records), without
+        # building intermediate Task objects.
+        columns = cls()
+        intern = columns.strings.intern
+        ordinals: dict[str, int] = {}  # task dates repeat heavily
+        for r in records:
+            day = r["task_date"]
+            ordinal = ordinals.get(day)
+            if ordinal is None:
+                ordinal = ordinals[day] = date.fromisoformat(day).toordinal()
+            columns.ids.append(r["id"])
+            columns.dates.append(ordinal)
+            columns.created.append((datetime.fromisoformat(r["created_at"]) - EPOCH) // MICROSECOND)
+            columns.statuses.append(STATUS_CODES_BY_VALUE[r.get("status", "active")])
+            columns.titles.append(intern(r["title"]))
+            columns.descriptions.append(intern(r.get("description")))
+            if r.get("recurrence"):
+                columns.recurrences[len(columns.ids) - 1] = Recurrence.from_dict(r["recurrence"])
+        return columns
+
+    def append(self, task: Task) -> "TaskView":
+        self.ids.append(task.id)
+        self.dates.append(task.task_date.toordinal())
+        self.created.append((task.created_at - EPOCH) // MICROSECOND)
+        self.statuses.append(STATUS_CODES[task.status])
+        self.titles.append(self.strings.intern(task.title))
+        self.descriptions.append(self.strings.intern(task.description))
+        if task.recurrence is not None:
+            self.recurrences[len(self.ids) - 1] = task.recurrence
+        return TaskView(self, len(self.ids) - 1)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, row: int) -> "TaskView":
+        if not -len(self.ids) <= row < len(self.ids):
+            raise IndexError(row)
+        return TaskView(self, row % len(self.ids))
+
+    def __iter__(self) -> Iterator["TaskView"]:
+        for row in range(len(self.ids)):
+            yield TaskView(self, row)
+
+    def rows_between(self, start: date, end: date) -> list[int]:
+        lo, hi = start.toordinal(), end.toordinal()
+        return [row for row, day in enumerate(self.dates) if lo <= day <= hi]
+
+
+# Task-compatible view of one row; reads and writes go to the columns.
+class TaskView:
+    __slots__ = ("_columns", "_row")
+
+    def __init__(self, columns: TaskColumns, row: int) -> None:
+        self._columns = columns
+        self._row = row
+
+    @property
+    def id(self) -> int:
+        return self._columns.ids[self._row]
+
+    @property
+    def title(self) -> str:
+        return self._columns.strings.get(self._columns.titles[self._row])
+
+    @title.setter
+    def title(self, value: str) -> None:
+        self._columns.titles[self._row] = self._columns.strings.intern(value)
+
+    @property
+    def description(self) -> Optional[str]:
+        return self._columns.strings.get(self._columns.descriptions[self._row])
+
+    @description.setter
+    def description(self, value: Optional[str]) -> None:
+        self._columns.descriptions[self._row] = self._columns.strings.intern(value)
+
+    @property
+    def created_at(self) -> datetime:
+        return EPOCH + self._columns.created[self._row] * MICROSECOND
+
+    @property
+    def task_date(self) -> date:
+        return date.fromordinal(self._columns.dates[self._row])
+
+    @task_date.setter
+    def task_date(self, value: date) -> None:
+        self._columns.dates[self._row] = value.toordinal()
+
+    @property
+    def status(self) -> Status:
+        return STATUSES[self._columns.statuses[self._row]]
+
+    @status.setter
+    def status(self, value: Status) -> None:
+        self._columns.statuses[self._row] = STATUS_CODES[value]
+
+    @property
+    def recurrence(self) -> Optional[Recurrence]:
+        return self._columns.recurrences.get(self._row)
+
+    @recurrence.setter
+    def recurrence(self, value: Optional[Recurrence]) -> None:
+        if value is None:
+            self._columns.recurrences.pop(self._row, None)
+        else:
+            self._columns.recurrences[self._row] = value
+
+    def to_task(self) -> Task:
+        return Task(
+            id=self.id,
+            title=self.title,
+            created_at=self.created_at,
+            task_date=self.task_date,
+            status=self.status,
+            description=self.description,
+            recurrence=self.recurrence,
+        )
+
+    def to_dict(self) -> dict:
+        return self.to_task().to_dict()
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (TaskView, Task)):
+            return self.to_task() == (other.to_task() if isinstance(other, TaskView) else other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"TaskView({self.to_task()!r})"
@@ -0,0 +1,43 @@
+# Deterministic synthetic task histories for the benchmarks.
+
+from datetime import date, datetime, timedelta
+from pathlib import Path
+import random
+
+from todo import codec
+from todo.models import Task, Status
+
+START = date(2020, 1, 1)
+CREATED = datetime(2020, 1, 1, 9, 0)
+WORDS = [
+    "call", "email", "review", "write", "plan", "buy", "fix", "book", "pay", "clean",
+    "report", "meeting", "groceries", "dentist", "invoice", "budget", "garden", "car",
+    "birthday", "taxes", "draft", "release", "backup", "laundry", "flight", "doctor",
+]
+
+
+def make_tasks(count: int, seed: int = 0, days: int = 2000) -> list[Task]:
+    # Spread over `days` days from START, a few words per title, a quarter
+    # of the tasks with a description
+    rng = random.Random(seed)
+    statuses = list(Status)
+    return [
+        Task(
+            id=i,
+            title=" ".join(rng.choices(WORDS, k=3)) + f" {i % 500}",
+            created_at=CREATED + timedelta(minutes=i),
+            task_date=START + timedelta(days=rng.randrange(days)),
+            status=statuses[i % 3],
+            description=None if i % 4 else " ".join(rng.choices(WORDS, k=8)),
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def make_records(count: int, seed: int = 0) -> list[dict]:
+    return [t.to_dict() for t in make_tasks(count, seed)]
+
+
+def write_task_file(path: Path, count: int, seed: int = 0) -> None:
+    # Same layout as TaskStorage.save_tasks
+    Path(path).write_text(codec.dumps(count, codec.encode_tasks(make_tasks(count, seed))), encoding="utf-8")
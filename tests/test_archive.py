@@ -0,0 +1,99 @@
+import sys
+from datetime import date, timedelta
+
+import pytest
+
+from todo.archive import Archive, ArchivedStorage, archive_tasks
+from todo.cli import main
+from todo.config import Config
+from todo.lazy import LazyTaskStorage
+from todo.models import Status, TaskStorage
+from todo.sqlite import SqliteTaskStorage
+from todo.storage import open_storage
+
+
+def titles(tasks):
+    return [t.title for t in tasks]
+
+
+@pytest.mark.parametrize("backend", [TaskStorage, LazyTaskStorage, SqliteTaskStorage])
+def test_archived_tasks_stay_visible_in_windows(tmp_path, backend):
+    storage = backend(tmp_path / "tasks.db")
+    for day, title, status in [
+        (date(2026,1,5), "Old done", Status.DONE),
+        (date(2026,1,6), "Old active", None),
+        (date(2026,2,9), "Old canceled", Status.CANCELED),
+        (date(2026,3,2), "Recent done", Status.DONE),
+    ]:
+        task = storage.add_task(title, day)
+        if status:
+            storage.update_task(task.id, status=status)
+    archive = Archive(tmp_path / "archive")
+    storage = ArchivedStorage(storage, archive)
+
+    assert archive_tasks(storage, archive, date(2026,3,1)) == (2, 2)
+    assert sorted(p.name for p in archive.directory.iterdir()) == ["2026-01.json.gz", "2026-02.json.gz"]
+    assert titles(storage.storage.tasks) == ["Old active", "Recent done"]
+    assert storage.get_task(1) is None
+
+    assert titles(storage.tasks_between(date(2026,1,1), date(2026,1,31))) == ["Old done", "Old active"]
+    assert titles(storage.list_tasks(archived=True)) == ["Old done", "Old active", "Old canceled", "Recent done"]
+    assert titles(storage.iter_tasks(status=Status.DONE, limit=1, archived=True)) == ["Old done"]
+    assert titles(storage.iter_tasks(end=date(2026,1,31))) == ["Old done", "Old active"]
+    assert sorted(storage.date_ordinals(date(2026,2,1), date(2026,3,31))) == [
+        date(2026,2,9).toordinal(), date(2026,3,2).toordinal(),
+    ]
+
+    # Windows outside the archived months, for active tasks, or without
+    # bounds (unless asked for) never open a segment
+    fresh = ArchivedStorage(storage.storage, Archive(archive.directory))
+    fresh.tasks_between(date(2026,3,1), date(2026,3,31))
+    fresh.iter_tasks(status=Status.ACTIVE, archived=True)
+    assert titles(fresh.list_tasks()) == ["Old active", "Recent done"]
+    assert fresh.archive._segments == {}
+    # Bounded: just the segments inside the window
+    assert titles(fresh.iter_tasks(start=date(2026,2,1))) == ["Old canceled", "Recent done"]
+    assert list(fresh.archive._segments) == [(2026, 2)]
+
+    # Archiving is idempotent
+    assert archive_tasks(storage, archive, date(2026,3,1)) == (0, 0)
+
+
+def test_policy_archives_at_most_once_a_day(tmp_path):
+    config = Config(tmp_path / "config.toml")
+    config.task_file = tmp_path / "tasks.json"
+    config.lazy_load = False
+    config.archive_after_days = 30
+    storage = TaskStorage(config.task_file)
+    old = storage.add_task("Old", date.today() - timedelta(days=40))
+    storage.update_task(old.id, status=Status.DONE)
+
+    storage = open_storage(config)
+    assert titles(storage.storage.tasks) == []
+    assert titles(storage.list_tasks(archived=True)) == ["Old"]
+
+    another = storage.add_task("Another", date.today() - timedelta(days=40))
+    storage.update_task(another.id, status=Status.DONE)
+    storage = open_storage(config)
+    assert titles(storage.storage.tasks) == ["Another"]
+
+
+def test_cli_archive(tmp_path, monkeypatch, capsys):
+    task_file = tmp_path / "tasks.json"
+    monkeypatch.setenv("TODO_TASK_FILE", str(task_file))
+    storage = TaskStorage(task_file)
+    task = storage.add_task("Shipped", date(2026,1,7))
+    storage.update_task(task.id, status=Status.DONE)
+
+    def run(*args):
+        monkeypatch.setattr(sys, "argv", ["todo", *args])
+        main()
+        return capsys.readouterr().out
+
+    assert "Archived 1 tasks into 1 segment(s)" in run("archive", "--before", "2026-02-01")
+    assert "Nothing to archive." in run("archive", "--before", "2026-02-01")
+    assert TaskStorage(task_file).tasks == []
+    assert "Shipped" in run("week", "--date", "2026-01-07")
+    assert "Tasks not found." in run("list")
+    assert "Shipped" in run("list", "--archived")
+    assert "Shipped" in run("list", "--from", "2026-01-01")
@@ -0,0 +1,28 @@
+import json
+
+from benchmarks.bench_suite import compare, main
+
+
+def result(best):
+    return {"best": best, "median": best, "runs": [best]}
+
+
+def test_compare_flags_only_real_regressions():
+    baseline = {"results": {"10k": {"load": result(0.100), "tiny": result(0.0001), "gone": result(1.0)}}}
+    current = {"results": {"10k": {"load": result(0.150), "tiny": result(0.0003), "new": result(1.0)}}}
+
+    assert compare(current, baseline, threshold=0.2, min_delta=0.0005) == ["10k/load"]
+    assert compare(current, baseline, threshold=0.6, min_delta=0.0005) == []
+
+
+def test_suite_writes_json_and_fails_on_regression(tmp_path, monkeypatch):
+    monkeypatch.setattr("benchmarks.bench_suite.SIZES", {"tiny": 50})
+    out = tmp_path / "results.json"
+    assert main(["--sizes", "tiny", "--repeat", "1", "--no-cli", "--output", str(out)]) == 0
+    report = json.loads(out.read_text())
+    assert "load_tasks" in report["results"]["tiny"]
+
+    for r in report["results"]["tiny"].values():
+        r["best"] = 1e-9
+    out.write_text(json.dumps(report))
+    assert main(["--sizes", "tiny", "--repeat", "1", "--no-cli", "--compare", str(out), "--min-delta-ms", "0"]) == 1
@@ -0,0 +1,69 @@
+import json
+from datetime import date
+
+import pytest
+
+from todo.binary import BinarySnapshot, BinaryTaskStorage, binary_to_json, json_to_binary
+from todo.models import TaskFileError, TaskStorage, Status
+
+def make_json(tmp_path):
+    task_file = tmp_path / "tasks.json"
+    storage = TaskStorage(task_file)
+    storage.add_task(title="Late", task_date=date(2026,3,2), description="Ünïcode")
+    storage.add_task(title="Early", task_date=date(2026,2,16))
+    storage.add_task(title="Middle", task_date=date(2026,2,18))
+    storage.update_task(3, status=Status.DONE)
+    storage.add_task(title="Deleted", task_date=date(2026,2,18))
+    storage.delete_task(4)
+    return task_file
+
+def test_snapshot_round_trip(tmp_path):
+    task_file = make_json(tmp_path)
+    binary_file = tmp_path / "tasks.bin"
+
+    assert json_to_binary(task_file, binary_file) == 3
+
+    snapshot = BinarySnapshot(binary_file)
+    assert list(snapshot.dates) == sorted(snapshot.dates)
+    assert snapshot.last_id == 4
+    snapshot.close()
+
+    back = tmp_path / "back.json"
+    assert binary_to_json(binary_file, back) == 3
+    original = {t[0]: t for t in json.loads(task_file.read_text())["tasks"]}
+    converted = json.loads(back.read_text())
+    assert converted["last_id"] == 4
+    assert {t[0]: t for t in converted["tasks"]} == original
+
+def test_binary_window_query_without_load(tmp_path):
+    binary_file = tmp_path / "tasks.bin"
+    json_to_binary(make_json(tmp_path), binary_file)
+
+    storage = BinaryTaskStorage(binary_file)
+    week = storage.tasks_between(date(2026,2,16), date(2026,2,22))
+    assert [t.title for t in week] == ["Early", "Middle"]
+    assert [t.id for t in storage.list_tasks(task_date=date(2026,2,18), status=Status.DONE)] == [3]
+    assert storage._snapshot is not None
+
+def test_binary_mutations(tmp_path):
+    binary_file = tmp_path / "tasks.bin"
+    storage = BinaryTaskStorage(binary_file)
+    storage.add_task(title="First", task_date=date(2026,2,22))
+    storage.add_task(title="Second", task_date=date(2026,2,21))
+    storage.update_task(1, status=Status.CANCELED)
+    storage.close()
+
+    reloaded = BinaryTaskStorage(binary_file)
+    assert [t.title for t in reloaded.list_tasks()] == ["Second", "First"]
+    assert reloaded.get_task(1).status == Status.CANCELED
+    assert reloaded.add_task(title="Third", task_date=date(2026,2,23)).id == 3
+
+def test_corrupt_snapshot_is_reported(tmp_path):
+    binary_file = tmp_path / "tasks.bin"
+    json_to_binary(make_json(tmp_path), binary_file)
+    data = binary_file.read_bytes()
+
+    for broken in (data[:10], data[:60], data[:-3], b"NOTASNAP" + data[8:]):
+        binary_file.write_bytes(broken)
+        with pytest.raises(TaskFileError, match="is corrupt"):
+            BinaryTaskStorage(binary_file).tasks
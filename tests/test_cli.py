@@ -5,7 +5,8 @@ from pathlib import Path
 import pytest
 
 from todo.cli import main
-from todo.models import TaskStorage
+from todo.journal import JournalTaskStorage
+from todo.models import TaskStorage, Status
 
 def run_cli(monkeypatch,args):
     monkeypatch.setattr(sys, "argv", ["todo"] + args)
@@ -74,6 +75,147 @@ def test_cli_month(tmp_path, monkeypatch, capsys):
     run_cli(monkeypatch, ["month"])
     assert "Mon" in capsys.readouterr().out
 
+def test_cli_year_and_range(tmp_path, monkeypatch, capsys):
+    task_file = tmp_path / "tasks.json"
+    monkeypatch.setenv("TODO_TASK_FILE", str(task_file))
+
+    run_cli(monkeypatch, ["add", "--title", "A", "--date", "2022-02-22"])
+    run_cli(monkeypatch, ["add", "--title", "B", "--date", "2022-11-02"])
+    capsys.readouterr()
+
+    run_cli(monkeypatch, ["year", "--date", "2022-06-01"])
+    out = capsys.readouterr().out
+    assert "2 tasks" in out
+    assert "January 2022" in out and "December 2022" in out
+
+    run_cli(monkeypatch, ["range", "--from", "2022-02-01", "--to", "2022-03-31"])
+    out = capsys.readouterr().out
+    assert "1 task" in out
+    assert "March 2022" in out and "April 2022" not in out
+
+def test_cli_list_pages_with_cursor(tmp_path, monkeypatch, capsys):
+    task_file = tmp_path / "tasks.json"
+    monkeypatch.setenv("TODO_TASK_FILE", str(task_file))
+    for day in ["2022-02-24", "2022-02-22", "2022-02-23"]:
+        run_cli(monkeypatch, ["add", "--title", f"Task {day}", "--date", day])
+    capsys.readouterr()
+
+    run_cli(monkeypatch, ["list", "--limit", "2"])
+    captured = capsys.readouterr()
+    assert captured.out.index("2022-02-22") < captured.out.index("2022-02-23")
+    assert "2022-02-24" not in captured.out
+    assert "--after 2022-02-23:3" in captured.err
+
+    run_cli(monkeypatch, ["list", "--after", "2022-02-23:3"])
+    captured = capsys.readouterr()
+    assert "Task 2022-02-24" in captured.out and "2022-02-22" not in captured.out
+    assert captured.err == ""
+
+    run_cli(monkeypatch, ["list", "--status", "done"])
+    assert "Tasks not found." in capsys.readouterr().out
+
+    for option in (["--limit", "-3"], ["--offset", "-1"]):
+        with pytest.raises(SystemExit) as exc:
+            run_cli(monkeypatch, ["list", *option])
+        assert exc.value.code == 2
+        assert "use 0 or more" in capsys.readouterr().err
+
+def test_cli_reads_config_once(tmp_path, monkeypatch):
+    from todo import cli
+
+    monkeypatch.setenv("TODO_TASK_FILE", str(tmp_path / "tasks.json"))
+    monkeypatch.delenv("TODO_NO_DAEMON", raising=False)
+    built = []
+    config = cli.Config
+    monkeypatch.setattr(cli, "Config", lambda: built.append(1) or config())
+    run_cli(monkeypatch, ["add", "--title", "Once", "--date", "2022-02-22"])
+    assert len(built) == 1
+
+def test_cli_namespaced_id_without_sources(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("TODO_TASK_FILE", str(tmp_path / "tasks.json"))
+    run_cli(monkeypatch, ["add", "--title", "Plain", "--date", "2022-02-22"])
+    capsys.readouterr()
+
+    for command in (["done", "team:1"], ["edit", "team:1", "--title", "X"], ["delete", "team:1"]):
+        with pytest.raises(SystemExit):
+            run_cli(monkeypatch, command)
+        assert "no task sources configured" in capsys.readouterr().out
+    assert TaskStorage(tmp_path / "tasks.json").get_task(1).title == "Plain"
+
 def test_cli_unknown(monkeypatch):
     with pytest.raises(SystemExit):
-        run_cli(monkeypatch, ["unknown"])
\ No newline at end of file
+        run_cli(monkeypatch, ["unknown"])
+
+def test_cli_done_with_journal_storage(tmp_path, monkeypatch, capsys):
+    task_file = tmp_path / "tasks.json"
+    monkeypatch.setenv("TODO_TASK_FILE", str(task_file))
+    monkeypatch.setenv("TODO_STORAGE", "journal")
+
+    run_cli(
+        monkeypatch,
+        ["add", "--title", "CLI Task", "--date", "2022-02-22"],
+    )
+    run_cli(monkeypatch, ["done", "1"])
+
+    storage = JournalTaskStorage(task_file)
+    assert storage.get_task(1).status == Status.DONE
+
+def test_cli_week_with_sqlite_storage(tmp_path, monkeypatch, capsys):
+    task_file = tmp_path / "tasks.json"
+    monkeypatch.setenv("TODO_TASK_FILE", str(task_file))
+    monkeypatch.setenv("TODO_STORAGE", "sqlite")
+
+    run_cli(
+        monkeypatch,
+        ["add", "--title", "CLI Task", "--date", "2022-02-22"],
+    )
+    run_cli(monkeypatch, ["week", "--date", "2022-02-22"])
+
+    assert "CLI Task" in capsys.readouterr().out
+    assert (tmp_path / "tasks.db").exists()
+
+def test_cli_binary_storage_imports_json(tmp_path, monkeypatch, capsys):
+    task_file = tmp_path / "tasks.json"
+    monkeypatch.setenv("TODO_TASK_FILE", str(task_file))
+
+    run_cli(
+        monkeypatch,
+        ["add", "--title", "CLI Task", "--date", "2022-02-22"],
+    )
+    monkeypatch.setenv("TODO_STORAGE", "binary")
+    run_cli(monkeypatch, ["week", "--date", "2022-02-22"])
+
+    assert "CLI Task" in capsys.readouterr().out
+    assert (tmp_path / "tasks.bin").exists()
+
+def test_cli_batch_applies_operations_in_one_write(tmp_path, monkeypatch, capsys):
+    task_file = tmp_path / "tasks.json"
+    monkeypatch.setenv("TODO_TASK_FILE", str(task_file))
+    ops = tmp_path / "ops.txt"
+    ops.write_text(
+        'add --title "First task" --date 2022-02-22\n'
+        '{"op": "add", "title": "Second", "date": "2022-02-23", "description": "JSON"}\n'
+        '\n'
+        'done 1\n'
+        '{"op": "edit", "id": 2, "title": "Second!"}\n'
+        'add --title Bad --date nope\n'
+        'week\n'
+    )
+    saves = []
+    original_save = TaskStorage.save_tasks
+    monkeypatch.setattr(TaskStorage, "save_tasks", lambda self: (saves.append(1), original_save(self)))
+
+    with pytest.raises(SystemExit):
+        run_cli(monkeypatch, ["batch", str(ops)])
+
+    out = capsys.readouterr().out
+    assert "1: ok Task created with ID 1" in out
+    assert "6: FAILED Invalid date format" in out
+    assert "7: FAILED Unsupported operation" in out
+    assert "Applied 4/6 operations" in out
+    assert len(saves) == 1
+
+    storage = TaskStorage(task_file)
+    assert storage.get_task(1).status == Status.DONE
+    assert storage.get_task(2).title == "Second!"
+    assert storage.get_task(2).description == "JSON"
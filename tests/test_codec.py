@@ -0,0 +1,64 @@
+import json
+from datetime import date, datetime
+
+import pytest
+
+from todo import codec
+from todo.lazy import LazyTaskStorage, iter_task_records
+from todo.models import Frequency, Recurrence, Status, Task, TaskFileError, TaskStorage
+
+LEGACY = {
+    "last_id": 9,
+    "tasks": [
+        {"id": 7, "title": "Old", "description": None, "created_at": "2026-02-01T10:00:00",
+         "task_date": "2026-02-22", "status": "done"},
+        {"id": 9, "title": "Weekly", "description": "Notes", "created_at": "2026-02-01T10:00:00",
+         "task_date": "2026-02-02", "recurrence": {"freq": "weekly", "until": "2026-02-16"}},
+    ],
+}
+
+
+def test_rows_round_trip():
+    created = datetime(2026, 3, 1, 9, 30, 15, 250)
+    tasks = [
+        Task(1, "Plain", created, date(2026,3,2)),
+        Task(2, "Ünïcode “quotes”", created, date(2026,3,2), Status.CANCELED, "two\nlines"),
+        Task(3, "Series", datetime(2026,3,1), date(2026,3,3), Status.DONE,
+             recurrence=Recurrence(Frequency.MONTHLY, 2, exceptions=frozenset({date(2026,5,3)}))),
+    ]
+    rows = codec.encode_tasks(tasks)
+    assert rows[0] == [1, "Plain", None, "2026-03-01T09:30:15.000250", "2026-03-02", 0]
+    assert rows == [codec.encode_task(t) for t in tasks]
+
+    text = codec.dumps(3, rows)
+    assert "\n" not in text and "Ünïcode" in text
+    assert codec.loads(json.loads(text)) == (3, tasks)
+    assert [codec.decode_task(r) for r in rows] == tasks
+    assert [codec.row_from_dict(codec.row_to_dict(r)) for r in rows] == rows
+
+
+@pytest.mark.parametrize("backend", [TaskStorage, LazyTaskStorage])
+def test_legacy_file_loads_and_is_rewritten(tmp_path, backend):
+    task_file = tmp_path / "tasks.json"
+    task_file.write_text(json.dumps(LEGACY, indent=2))
+
+    storage = backend(task_file)
+    assert [(t.id, t.status) for t in storage.tasks_between(date(2026,2,16), date(2026,2,22))] == [
+        (9, Status.ACTIVE), (7, Status.DONE),
+    ]
+    assert storage.add_task("New", date(2026,2,23)).id == 10
+
+    data = json.loads(task_file.read_text())
+    assert (data["format"], data["last_id"]) == (codec.FORMAT, 10)
+    assert [r[codec.ID] for r in data["tasks"]] == [7, 9, 10]
+    records = list(iter_task_records(task_file))
+    assert records[0] == LEGACY["tasks"][0]
+    assert (records[1]["status"], records[1]["recurrence"]["until"]) == ("active", "2026-02-16")
+
+
+@pytest.mark.parametrize("backend", [TaskStorage, LazyTaskStorage])
+def test_newer_format_is_refused(tmp_path, backend):
+    task_file = tmp_path / "tasks.json"
+    task_file.write_text('{"format": 3, "last_id": 0, "tasks": []}')
+    with pytest.raises(TaskFileError, match="format 3"):
+        backend(task_file).list_tasks()
@@ -0,0 +1,49 @@
+from datetime import date, datetime
+
+from benchmarks.columnar import TaskColumns
+from todo.models import Frequency, Recurrence, Task, Status
+from todo.week import render_week
+
+def make_tasks():
+    return [
+        Task(id=1, title="Shared", created_at=datetime(2026,2,1,9,30,15,123), task_date=date(2026,2,16)),
+        Task(id=2, title="Shared", created_at=datetime(2026,2,2), task_date=date(2026,2,18),
+             status=Status.DONE, description="Notes"),
+        Task(id=5, title="Later", created_at=datetime(2026,2,3), task_date=date(2026,3,1),
+             status=Status.CANCELED),
+        Task(id=6, title="Standup", created_at=datetime(2026,2,3), task_date=date(2026,2,16),
+             recurrence=Recurrence(Frequency.WEEKLY, until=date(2026,3,30))),
+    ]
+
+def test_columns_round_trip():
+    tasks = make_tasks()
+    columns = TaskColumns.from_tasks(tasks)
+
+    assert len(columns) == 4
+    assert [view.to_task() for view in columns] == tasks
+    assert columns.strings.strings == ["Shared", "Notes", "Later", "Standup"]
+
+    from_records = TaskColumns.from_records(t.to_dict() for t in tasks)
+    assert [view.to_dict() for view in from_records] == [t.to_dict() for t in tasks]
+
+def test_view_writes_through():
+    columns = TaskColumns.from_tasks(make_tasks())
+    view = columns[2]
+
+    view.status = Status.ACTIVE
+    view.task_date = date(2026,2,17)
+    view.title = "Moved"
+
+    assert columns[2].status == Status.ACTIVE
+    assert columns.rows_between(date(2026,2,16), date(2026,2,22)) == [0, 1, 2, 3]
+    assert columns[2].title == "Moved"
+
+    columns[3].recurrence = None
+    assert columns[3].to_task().recurrence is None
+
+def test_views_render():
+    columns = TaskColumns.from_tasks(make_tasks())
+
+    week_str = render_week(list(columns), reference_date=date(2026,2,18))
+
+    assert "[2] Shared" in week_str
@@ -0,0 +1,91 @@
+import multiprocessing
+from datetime import date
+
+import pytest
+
+from todo.journal import JournalTaskStorage
+from todo.lazy import LazyTaskStorage
+from todo.models import TaskStorage, TaskFileError, Status
+from todo.sqlite import SqliteTaskStorage
+
+WORKERS = 6
+TASKS_PER_WORKER = 15
+
+BACKENDS = {
+    "json": lambda path: TaskStorage(path, durable=False),
+    "lazy": lambda path: LazyTaskStorage(path, durable=False),
+    "journal": lambda path: JournalTaskStorage(path, compact_threshold=2048, durable=False),
+    "sqlite": lambda path: SqliteTaskStorage(path.with_suffix(".db"), durable=False),
+}
+
+def hammer(backend, path, worker):
+    storage = BACKENDS[backend](path)
+    for i in range(TASKS_PER_WORKER):
+        task = storage.add_task(title=f"w{worker}-{i}", task_date=date(2026,2,1 + i))
+        if i % 3 == 0:
+            storage.update_task(task.id, status=Status.DONE)
+    if hasattr(storage, "close"):
+        storage.close()
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+def test_no_lost_updates_across_processes(tmp_path, backend):
+    path = tmp_path / "tasks.json"
+    ctx = multiprocessing.get_context("spawn")
+    procs = [ctx.Process(target=hammer, args=(backend, path, w)) for w in range(WORKERS)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    assert all(p.exitcode == 0 for p in procs)
+
+    tasks = BACKENDS[backend](path).tasks
+    assert len(tasks) == WORKERS * TASKS_PER_WORKER
+    assert len({t.id for t in tasks}) == len(tasks)
+    assert {t.title for t in tasks} == {f"w{w}-{i}" for w in range(WORKERS) for i in range(TASKS_PER_WORKER)}
+    assert sum(t.status == Status.DONE for t in tasks) == WORKERS * 5
+
+def test_transaction_writes_once(tmp_path, monkeypatch):
+    storage = TaskStorage(tmp_path / "tasks.json")
+    saves = []
+    monkeypatch.setattr(storage, "save_tasks", lambda: saves.append(1))
+
+    with storage.transaction():
+        for i in range(10):
+            storage.add_task(title=f"Task {i}", task_date=date(2026,2,22))
+
+    assert len(saves) == 1
+
+def test_stale_instance_sees_other_writes(tmp_path):
+    task_file = tmp_path / "tasks.json"
+    first = TaskStorage(task_file)
+    second = TaskStorage(task_file)
+
+    first.add_task(title="From first", task_date=date(2026,2,22))
+    second.add_task(title="From second", task_date=date(2026,2,22))
+
+    assert [t.title for t in TaskStorage(task_file).tasks] == ["From first", "From second"]
+
+def test_corrupt_file_is_reported(tmp_path):
+    task_file = tmp_path / "tasks.json"
+    task_file.write_text('{"last_id": 1, "tasks": [{"id": 1,')
+
+    with pytest.raises(TaskFileError):
+        TaskStorage(task_file)
+    with pytest.raises(TaskFileError):
+        LazyTaskStorage(task_file).add_task(title="New", task_date=date(2026,2,22))
+    assert task_file.read_text() == '{"last_id": 1, "tasks": [{"id": 1,'
+
+@pytest.mark.parametrize("backend", ["json", "lazy", "journal"])
+def test_failed_transaction_leaves_memory_as_the_file(tmp_path, backend):
+    storage = BACKENDS[backend](tmp_path / "tasks.json")
+    storage.add_task(title="Kept", task_date=date(2026,2,22))
+
+    with pytest.raises(RuntimeError):
+        with storage.transaction():
+            storage.update_task(1, title="Changed", task_date=date(2026,3,1))
+            storage.add_task(title="Dropped", task_date=date(2026,2,23))
+            raise RuntimeError
+
+    on_disk = BACKENDS[backend](tmp_path / "tasks.json")
+    assert [(t.id, t.title) for t in storage.list_tasks()] == [(t.id, t.title) for t in on_disk.list_tasks()]
+    assert [t.id for t in storage.tasks_between(date(2026,2,22), date(2026,3,1))] == [t.id for t in on_disk.tasks_between(date(2026,2,22), date(2026,3,1))]
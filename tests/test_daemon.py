@@ -0,0 +1,76 @@
+import socket
+import threading
+import time
+from datetime import date
+
+import pytest
+
+from todo import daemon
+from todo.config import Config
+from todo.models import TaskStorage, Status
+
+def start_daemon(tmp_path, monkeypatch):
+    monkeypatch.setenv("TODO_TASK_FILE", str(tmp_path / "tasks.json"))
+    config = Config()
+    thread = threading.Thread(target=daemon.serve, args=(config,))
+    thread.start()
+    path = daemon.socket_path(config)
+    while not path.exists():
+        time.sleep(0.01)
+    return config, thread
+
+def test_daemon_serves_commands(tmp_path, monkeypatch):
+    config, thread = start_daemon(tmp_path, monkeypatch)
+    path = daemon.socket_path(config)
+    try:
+        added = daemon.request(path, ["add", "--title", "Daemon Task", "--date", "2022-02-22"])
+        assert added["exit"] == 0
+        assert "created" in added["stdout"].lower()
+
+        assert daemon.request(path, ["done", "1"])["exit"] == 0
+        week = daemon.request(path, ["week", "--date", "2022-02-22"])
+        assert "Daemon Task" in week["stdout"]
+
+        bad = daemon.request(path, ["add", "--title", "Bad", "--date", "nope"])
+        assert bad["exit"] == 1
+    finally:
+        assert daemon.stop(config)
+        thread.join()
+
+    assert not path.exists()
+    assert TaskStorage(config.task_file).get_task(1).status == Status.DONE
+
+def test_daemon_sees_direct_writes(tmp_path, monkeypatch):
+    config, thread = start_daemon(tmp_path, monkeypatch)
+    try:
+        TaskStorage(config.task_file).add_task(title="Direct", task_date=date(2022,2,22))
+        listed = daemon.request(daemon.socket_path(config), ["list"])
+        assert "Direct" in listed["stdout"]
+    finally:
+        daemon.stop(config)
+        thread.join()
+
+def test_cli_falls_back_without_daemon(tmp_path, monkeypatch):
+    monkeypatch.setenv("TODO_TASK_FILE", str(tmp_path / "tasks.json"))
+    config = Config()
+    daemon.socket_path(config).touch()  # stale socket file
+
+    assert daemon.forward(config, ["list"]) is None
+
+def test_daemon_outlives_stalled_clients_and_second_start(tmp_path, monkeypatch):
+    monkeypatch.setattr(daemon, "CLIENT_TIMEOUT", 0.2)
+    config, thread = start_daemon(tmp_path, monkeypatch)
+    path = daemon.socket_path(config)
+    stalled = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        # Connected, never sends: dropped after the timeout
+        stalled.connect(str(path))
+        assert daemon.request(path, ["list"])["exit"] == 0
+
+        with pytest.raises(daemon.DaemonRunning):
+            daemon.serve(config)
+        assert daemon.request(path, ["list"])["exit"] == 0
+    finally:
+        stalled.close()
+        daemon.stop(config)
+        thread.join()
@@ -0,0 +1,139 @@
+import sys
+from datetime import date
+
+import pytest
+
+from todo import history
+from todo.cli import main
+from todo.history import History, HistoryConflict, RecordedStorage
+from todo.lazy import LazyTaskStorage
+from todo.models import Frequency, Recurrence, Status, TaskStorage
+
+
+def todo(monkeypatch, capsys, *argv):
+    monkeypatch.setattr(sys, "argv", ["todo", *argv])
+    main()
+    return capsys.readouterr().out
+
+
+@pytest.mark.parametrize("backend", ["json", "journal", "sqlite", "sharded"])
+def test_cli_undo_redo_and_history(tmp_path, monkeypatch, capsys, backend):
+    monkeypatch.setenv("TODO_TASK_FILE", str(tmp_path / "tasks.json"))
+    monkeypatch.setenv("TODO_STORAGE", backend)
+    monkeypatch.setenv("TODO_NO_DAEMON", "1")
+    todo(monkeypatch, capsys, "add", "--title", "Pay rent", "--date", "2026-03-01", "--description", "Online")
+    todo(monkeypatch, capsys, "add", "--title", "Call mom", "--date", "2026-03-02")
+    todo(monkeypatch, capsys, "done", "1")
+    todo(monkeypatch, capsys, "edit", "2", "--date", "2026-04-02", "--title", "Call dad")
+    todo(monkeypatch, capsys, "delete", "1")
+
+    out = todo(monkeypatch, capsys, "history", "--limit", "3")
+    assert [line.split("  ", 1)[1] for line in out.splitlines()] == [
+        "done 1  [1: status]",
+        "edit 2 --date 2026-04-02 --title Call dad  [2: task_date, title]",
+        "delete 1  [deleted 1]",
+    ]
+
+    assert todo(monkeypatch, capsys, "undo") == "Undid: delete 1\n"
+    assert todo(monkeypatch, capsys, "undo") == "Undid: edit 2 --date 2026-04-02 --title Call dad\n"
+    out = todo(monkeypatch, capsys, "list")
+    assert "1    2026-03-01   done       Pay rent" in out
+    assert "2    2026-03-02   active     Call mom" in out
+    assert "(undone)" in todo(monkeypatch, capsys, "history")
+
+    assert todo(monkeypatch, capsys, "redo") == "Redid: edit 2 --date 2026-04-02 --title Call dad\n"
+    # A new change drops what's left to redo
+    todo(monkeypatch, capsys, "cancel", "2")
+    assert todo(monkeypatch, capsys, "redo") == "Nothing to redo.\n"
+    for _ in range(3):
+        todo(monkeypatch, capsys, "undo")
+    out = todo(monkeypatch, capsys, "list")
+    assert "1    2026-03-01   active     Pay rent" in out
+    assert "2    2026-03-02   active     Call mom" in out
+
+
+@pytest.mark.parametrize("backend", [TaskStorage, LazyTaskStorage])
+def test_undo_touches_only_the_recorded_fields(tmp_path, backend):
+    storage = RecordedStorage(backend(tmp_path / "tasks.json"), History(tmp_path / "tasks.json.history"))
+    storage.add_task("Water plants", date(2026,3,2), recurrence=Recurrence(Frequency.WEEKLY))
+    storage.add_task("Read", date(2026,3,3), description="Chapter 4")
+    storage.update_occurrence(1, date(2026,3,9), status=Status.DONE)
+    storage.update_task(2, status=Status.DONE)
+
+    # Changed since, through the backend alone: fields the entry didn't touch
+    # don't matter, ones it did make the undo refuse
+    storage.storage.update_task(2, title="Read more")
+    assert storage.undo()["command"] == "update 2"
+    assert (storage.get_task(2).title, storage.get_task(2).status) == ("Read more", Status.ACTIVE)
+    storage.storage.update_task(1, recurrence=Recurrence(Frequency.DAILY))
+    with pytest.raises(HistoryConflict):
+        storage.undo()
+    assert storage.get_task(1).recurrence == Recurrence(Frequency.DAILY)
+
+    storage.storage.update_task(1, recurrence=Recurrence(Frequency.WEEKLY).with_occurrence(date(2026,3,9), Status.DONE))
+    storage.undo()
+    assert storage.get_task(1).recurrence == Recurrence(Frequency.WEEKLY)
+    # An added task that has been edited since isn't deleted either
+    with pytest.raises(HistoryConflict):
+        storage.undo()
+    storage.storage.update_task(2, title="Read")
+    storage.undo()
+    assert storage.get_task(2) is None
+    storage.redo()
+    assert storage.get_task(2).description == "Chapter 4"
+    assert backend(tmp_path / "tasks.json").get_task(2).description == "Chapter 4"
+
+
+def test_command_groups_changes_and_log_stays_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr("todo.history.COMPACT_BYTES", 0)
+    log = History(tmp_path / "tasks.json.history", limit=3)
+    storage = RecordedStorage(TaskStorage(tmp_path / "tasks.json"), log)
+
+    with history.command("plan"), storage.transaction():
+        for day in range(1, 6):
+            storage.add_task(f"Task {day}", date(2026,3,day))
+        storage.update_task(1, title="First")
+        storage.delete_task(5)
+    done, undone = log.stacks()
+    assert [e["command"] for e in done] == ["plan"]
+    assert [change[0] for change in done[0]["changes"]] == [1, 2, 3, 4]
+    assert done[0]["changes"][0][2]["title"] == "First"
+
+    for task_id in (2, 3, 4):
+        storage.update_task(task_id, status=Status.DONE)
+    storage.undo()
+    # Compacted on every write: just the last three, one of them undone
+    assert len(log.path.read_text().splitlines()) == 4
+    done, undone = log.stacks()
+    assert [e["command"] for e in done] == ["update 2", "update 3"]
+    assert [e["command"] for e in undone] == ["update 4"]
+
+    storage.undo()
+    storage.undo()
+    assert storage.undo() is None
+    assert [(t.title, t.status) for t in storage.tasks][:2] == [("First", Status.ACTIVE), ("Task 2", Status.ACTIVE)]
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_imports_undo_and_archive_runs_are_a_barrier(tmp_path, monkeypatch, capsys, backend):
+    monkeypatch.setenv("TODO_TASK_FILE", str(tmp_path / "tasks.json"))
+    monkeypatch.setenv("TODO_STORAGE", backend)
+    monkeypatch.setenv("TODO_NO_DAEMON", "1")
+    todo(monkeypatch, capsys, "add", "--title", "Old", "--date", "2020-01-01")
+    todo(monkeypatch, capsys, "done", "1")
+    todo(monkeypatch, capsys, "archive", "--before", "2021-01-01")
+    todo(monkeypatch, capsys, "add", "--title", "Kept", "--date", "2026-03-01")
+    (tmp_path / "in.csv").write_text("title,date\nOne,2026-03-02\nTwo,2026-03-03\n")
+    todo(monkeypatch, capsys, "import", str(tmp_path / "in.csv"))
+
+    assert todo(monkeypatch, capsys, "undo").startswith("Undid: import ")
+    assert [line.split()[3] for line in todo(monkeypatch, capsys, "list", "--status", "active").splitlines()[2:]] == ["Kept"]
+    assert todo(monkeypatch, capsys, "redo").startswith("Redid: import ")
+    assert "One" in todo(monkeypatch, capsys, "list")
+
+    todo(monkeypatch, capsys, "undo")
+    todo(monkeypatch, capsys, "undo")
+    with pytest.raises(SystemExit):
+        todo(monkeypatch, capsys, "undo")
+    assert "`archive before 2021-01-01` can't be undone" in capsys.readouterr().out
+    assert "archive before 2021-01-01  [can't be undone]\n" in todo(monkeypatch, capsys, "history")
@@ -0,0 +1,92 @@
+import sys
+from datetime import date
+
+import pytest
+
+from todo import fileio
+from todo.cli import main
+from todo.importer import import_files
+from todo.models import Status, TaskStorage
+from todo.sqlite import SqliteTaskStorage
+
+CSV = """Title,Date,Status,Notes
+Pay rent,2026-03-01,open,
+"Call, then email",2026-03-02,completed,"two
+lines"
+,2026-03-03,,
+Bad date,2026-13-40,,
+Pay rent,2026-03-01,,
+"""
+
+ICS = """BEGIN:VCALENDAR
+BEGIN:VTODO
+SUMMARY:Renew passport\\, soon
+DUE;VALUE=DATE:20260310
+STATUS:NEEDS-ACTION
+DESCRIPTION:Photos first
+END:VTODO
+BEGIN:VEVENT
+SUMMARY:Dentist appoint
+ ment
+DTSTART:20260311T090000Z
+STATUS:CANCELLED
+END:VEVENT
+END:VCALENDAR
+"""
+
+
+def test_import_formats_dedupes_and_writes_once(tmp_path, monkeypatch):
+    (tmp_path / "a.csv").write_text(CSV)
+    (tmp_path / "b.ics").write_text(ICS)
+    (tmp_path / "c.jsonl").write_text(
+        '{"title": "Water plants", "date": "2026-03-04"}\n\n[1]\n{"summary": "Renew passport, soon", "due": "2026-03-10"}\n'
+    )
+    storage = TaskStorage(tmp_path / "tasks.json")
+    storage.add_task("Existing", date(2026,3,1))
+
+    writes = []
+    atomic_write = fileio.atomic_write
+    monkeypatch.setattr("todo.models.atomic_write", lambda *a, **k: (writes.append(a[0]), atomic_write(*a, **k)))
+    stats = import_files(storage, [tmp_path / "a.csv", tmp_path / "b.ics", tmp_path / "c.jsonl"], workers=1)
+
+    assert (stats.rows, stats.imported, stats.duplicates, stats.invalid) == (10, 5, 2, 3)
+    assert [e.split(": ")[1] for e in stats.errors] == ["line 5", "line 6", "line 3"]
+    assert stats.errors[0].endswith("missing title")
+    assert len(writes) == 1
+    tasks = TaskStorage(tmp_path / "tasks.json").tasks
+    assert [(t.id, t.title, t.status) for t in tasks] == [
+        (1, "Existing", Status.ACTIVE),
+        (2, "Pay rent", Status.ACTIVE),
+        (3, "Call, then email", Status.DONE),
+        (4, "Renew passport, soon", Status.ACTIVE),
+        (5, "Dentist appointment", Status.CANCELED),
+        (6, "Water plants", Status.ACTIVE),
+    ]
+    assert tasks[2].description == "two\nlines"
+    assert tasks[4].task_date == date(2026,3,11)
+
+
+@pytest.mark.parametrize("backend", [TaskStorage, SqliteTaskStorage])
+def test_import_with_worker_processes(tmp_path, monkeypatch, backend):
+    lines = [f'{{"title": "Task {i}", "date": "2026-04-{i % 28 + 1:02d}"}}' for i in range(500)]
+    (tmp_path / "tasks.jsonl").write_text("\n".join(lines))
+    storage = backend(tmp_path / "tasks.db")
+
+    monkeypatch.setattr("todo.importer.PARALLEL_MIN_BYTES", 0)
+    stats = import_files(storage, [tmp_path / "tasks.jsonl"], workers=2, chunk_rows=64)
+    assert stats.imported == 500
+    assert [t.title for t in storage.tasks][:3] == ["Task 0", "Task 1", "Task 2"]
+    assert storage._next_id() == 501
+
+
+def test_cli_import(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("TODO_TASK_FILE", str(tmp_path / "tasks.json"))
+    (tmp_path / "in.csv").write_text("title,date\nImported,2026-03-05\n")
+    monkeypatch.setattr(sys, "argv", ["todo", "import", str(tmp_path / "in.csv")])
+    main()
+    assert "Imported 1 tasks from 1 rows (0 duplicates, 0 invalid)" in capsys.readouterr().out
+
+    monkeypatch.setattr(sys, "argv", ["todo", "import", str(tmp_path / "in.txt")])
+    with pytest.raises(SystemExit):
+        main()
+    assert "File not found" in capsys.readouterr().out
@@ -0,0 +1,96 @@
+import json
+from datetime import date
+
+from todo.journal import JournalTaskStorage
+from todo.models import TaskStorage, Status
+
+def test_journal_replays_mutations(tmp_path):
+    task_file = tmp_path / "tasks.json"
+    storage = JournalTaskStorage(task_file)
+
+    first = storage.add_task(title="First", task_date=date(2026,2,22))
+    second = storage.add_task(title="Second", task_date=date(2026,2,23))
+    storage.update_task(first.id, status=Status.DONE, title="First!")
+    storage.delete_task(second.id)
+
+    assert not task_file.exists()
+    assert len(storage.journal_file.read_text().splitlines()) == 4
+
+    storage2 = JournalTaskStorage(task_file)
+    tasks = storage2.list_tasks()
+    assert len(tasks) == 1
+    assert tasks[0].title == "First!"
+    assert tasks[0].status == Status.DONE
+
+def test_journal_imports_existing_task_file(tmp_path):
+    task_file = tmp_path / "tasks.json"
+    TaskStorage(task_file).add_task(title="Legacy", task_date=date(2026,2,22))
+
+    storage = JournalTaskStorage(task_file)
+    assert storage.get_task(1).title == "Legacy"
+
+    storage.add_task(title="New", task_date=date(2026,2,23))
+    assert [t.title for t in JournalTaskStorage(task_file).list_tasks()] == ["Legacy", "New"]
+
+def test_journal_compacts_past_threshold(tmp_path):
+    task_file = tmp_path / "tasks.json"
+    storage = JournalTaskStorage(task_file, compact_threshold=1)
+
+    storage.add_task(title="Compacted", task_date=date(2026,2,22))
+    storage.close()
+
+    assert not storage.journal_file.exists()
+    assert not storage.compacting_file.exists()
+    assert json.loads(task_file.read_text())["tasks"][0][1] == "Compacted"
+    assert JournalTaskStorage(task_file).get_task(1).title == "Compacted"
+
+def test_journal_ignores_torn_last_record(tmp_path):
+    task_file = tmp_path / "tasks.json"
+    storage = JournalTaskStorage(task_file)
+    storage.add_task(title="Kept", task_date=date(2026,2,22))
+
+    with storage.journal_file.open("a") as f:
+        f.write('{"op": "add", "task": {"id"')
+
+    assert [t.title for t in JournalTaskStorage(task_file).list_tasks()] == ["Kept"]
+
+def test_journal_append_after_torn_record_survives_reload(tmp_path):
+    task_file = tmp_path / "tasks.json"
+    JournalTaskStorage(task_file).add_task(title="Kept", task_date=date(2026,2,22))
+    with (tmp_path / "tasks.json.journal").open("a") as f:
+        f.write('{"op": "add", "task": {"id"')
+
+    JournalTaskStorage(task_file).add_task(title="After crash", task_date=date(2026,2,23))
+    assert [t.title for t in JournalTaskStorage(task_file).list_tasks()] == ["Kept", "After crash"]
+
+def test_journal_keeps_high_water_mark(tmp_path):
+    task_file = tmp_path / "tasks.json"
+    storage = JournalTaskStorage(task_file)
+    storage.add_task(title="One", task_date=date(2026,2,22))
+    storage.delete_task(1)
+
+    assert JournalTaskStorage(task_file).add_task(title="Two", task_date=date(2026,2,22)).id == 2
+
+def test_journal_refresh_replays_only_appended_records(tmp_path):
+    task_file = tmp_path / "tasks.json"
+    reader = JournalTaskStorage(task_file)
+    writer = JournalTaskStorage(task_file)
+    writer.add_task(title="Kept", task_date=date(2026,2,22))
+    reader.refresh()
+    epoch = reader._epoch
+
+    writer.update_task(1, status=Status.DONE)
+    writer.add_task(title="Added", task_date=date(2026,2,24))
+    with writer.journal_file.open("a") as f:
+        f.write('{"op": "delete", "id"')
+    reader.refresh()
+    assert reader._epoch == epoch
+    assert [(t.title, t.status) for t in reader.tasks] == [("Kept", Status.DONE), ("Added", Status.ACTIVE)]
+    assert reader.day_version(date(2026,2,23)) == (epoch, 0)
+
+    # The torn record is read once it's complete
+    with writer.journal_file.open("a") as f:
+        f.write(': 2}\n')
+    reader.refresh()
+    assert [t.title for t in reader.tasks] == ["Kept"]
+    assert reader._epoch == epoch
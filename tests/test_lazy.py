@@ -0,0 +1,109 @@
+import json
+from datetime import date
+
+from todo import lazy
+from todo.lazy import LazyTaskStorage, iter_task_records, read_header
+from todo.models import TaskStorage, Status
+
+def make_file(tmp_path, count):
+    task_file = tmp_path / "tasks.json"
+    storage = TaskStorage(task_file)
+    for i in range(count):
+        storage.add_task(title=f"Task {i}", task_date=date(2026,2,1 + i % 28))
+    return task_file
+
+def test_iter_task_records_across_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(lazy, "CHUNK_SIZE", 7)
+    task_file = make_file(tmp_path, 30)
+
+    header = {}
+    records = list(iter_task_records(task_file, header))
+    assert [r["id"] for r in records] == list(range(1, 31))
+    assert header["last_id"] == 30
+    assert read_header(task_file) == {"format": 2, "last_id": 30}
+
+def test_lazy_single_task_commands_do_not_load(tmp_path):
+    task_file = make_file(tmp_path, 5)
+    storage = LazyTaskStorage(task_file)
+
+    assert storage.add_task(title="New", task_date=date(2026,3,1)).id == 6
+    assert storage.update_task(2, status=Status.DONE).status == Status.DONE
+    assert storage.delete_task(3)
+    assert not storage.delete_task(3)
+    assert storage.get_task(6).title == "New"
+    assert [t.id for t in storage.tasks_between(date(2026,2,1), date(2026,2,3))] == [1, 2]
+    assert not storage._loaded
+
+    reloaded = TaskStorage(task_file)
+    assert [t.id for t in reloaded.tasks] == [1, 2, 4, 5, 6]
+    assert reloaded.get_task(2).status == Status.DONE
+
+def test_lazy_matches_eager_after_load(tmp_path):
+    task_file = make_file(tmp_path, 10)
+    storage = LazyTaskStorage(task_file)
+
+    assert [t.id for t in storage.list_tasks()] == [t.id for t in TaskStorage(task_file).list_tasks()]
+    assert storage._loaded
+    storage.add_task(title="Loaded", task_date=date(2026,3,1))
+    assert json.loads(task_file.read_text())["last_id"] == 11
+
+def test_lazy_legacy_list_file(tmp_path):
+    task_file = tmp_path / "tasks.json"
+    task_file.write_text(
+        '[{"id": 7, "title": "Old", "description": null, '
+        '"created_at": "2026-02-01T10:00:00", "task_date": "2026-02-22", "status": "done"}]'
+    )
+
+    storage = LazyTaskStorage(task_file)
+    assert storage.add_task(title="New", task_date=date(2026,2,22)).id == 8
+    assert [t.title for t in TaskStorage(task_file).tasks] == ["Old", "New"]
+
+def test_lazy_missing_id_leaves_file_alone(tmp_path, monkeypatch):
+    task_file = make_file(tmp_path, 5)
+    storage = LazyTaskStorage(task_file)
+    storage.delete_task(3)
+    before = task_file.stat().st_mtime_ns, task_file.stat().st_ino
+    files = sorted(tmp_path.iterdir())
+
+    writes = []
+    monkeypatch.setattr(lazy, "atomic_write", lambda *a, **k: writes.append(a))
+    assert storage.update_task(99, title="Nope") is None
+    assert not storage.delete_task(99)
+    assert writes == []
+    monkeypatch.undo()
+    # In range but gone: streamed, then abandoned
+    assert storage.update_task(3, title="Nope") is None
+    assert not storage.delete_task(3)
+    assert (task_file.stat().st_mtime_ns, task_file.stat().st_ino) == before
+    assert sorted(tmp_path.iterdir()) == files
+
+def test_lazy_writes_copy_other_records_as_they_are(tmp_path, monkeypatch):
+    task_file = make_file(tmp_path, 0)
+    # Records another writer encoded differently: escaped, spaced out
+    task_file.write_text(
+        '{"format":2,"last_id":2,"tasks":['
+        '[1, "Caf\\u00e9", null, "2026-02-01T10:00:00", "2026-02-01", 0],'
+        '[2,"Tea",null,"2026-02-01T10:00:00","2026-02-02",0]]}'
+    )
+    storage = LazyTaskStorage(task_file)
+
+    # Past the header, add doesn't parse the records at all
+    def unread(*args, **kwargs):
+        raise AssertionError("records parsed")
+
+    assert storage._next_id() == 3
+    with monkeypatch.context() as m:
+        m.setattr(lazy, "_walk", unread)
+        assert storage.add_task(title="Juice", task_date=date(2026,2,3)).id == 3
+    assert storage.update_task(2, title="Green tea")
+    assert '[1, "Caf\\u00e9", null, "2026-02-01T10:00:00", "2026-02-01", 0]' in task_file.read_text()
+    assert [(t.id, t.title) for t in TaskStorage(task_file).tasks] == [(1, "Café"), (2, "Green tea"), (3, "Juice")]
+    assert read_header(task_file)["last_id"] == 3
+
+def test_lazy_unbounded_listing_sorts_in_runs(tmp_path, monkeypatch):
+    monkeypatch.setattr(lazy, "SORT_RUN", 4)
+    task_file = make_file(tmp_path, 30)
+    expected = [t.id for t in TaskStorage(task_file).iter_tasks()]
+
+    assert [t.id for t in LazyTaskStorage(task_file).iter_tasks()] == expected
+    assert [t.id for t in LazyTaskStorage(task_file).iter_tasks(offset=5, status=Status.ACTIVE)] == expected[5:]
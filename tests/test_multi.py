@@ -0,0 +1,80 @@
+import sys
+from datetime import date
+
+import pytest
+
+from todo.cli import main
+from todo.config import Config
+from todo.models import Status, TaskStorage
+from todo.multi import MultiTaskStorage
+from todo.sqlite import SqliteTaskStorage
+
+
+def make_sources(tmp_path):
+    team = TaskStorage(tmp_path / "team.json")
+    team.add_task("Standup", date(2026,3,2))
+    team.add_task("Retro", date(2026,3,6))
+    team.add_task("Planning", date(2026,3,2))
+    project = SqliteTaskStorage(tmp_path / "project.db")
+    project.add_task("Ship", date(2026,3,2))
+    project.add_task("Kickoff", date(2026,3,1))
+    return MultiTaskStorage({"team": team, "project": project})
+
+
+def test_views_merge_sources_on_date(tmp_path):
+    storage = make_sources(tmp_path)
+
+    week = storage.tasks_between(date(2026,3,1), date(2026,3,7))
+    assert [t.id for t in week] == ["project:2", "team:1", "team:3", "project:1", "team:2"]
+    assert sorted(storage.date_ordinals(date(2026,3,2), date(2026,3,2))) == [date(2026,3,2).toordinal()] * 3
+    assert [t.id for t in storage.search("ship")] == ["project:1"]
+
+    # Paging resumes within and across sources
+    first = list(storage.iter_tasks(limit=2))
+    rest = list(storage.iter_tasks(after=(first[-1].task_date, first[-1].id)))
+    assert [t.id for t in first + rest] == [t.id for t in week]
+    assert [t.id for t in storage.iter_tasks(after=(date(2026,3,2), "project:1"))] == ["team:2"]
+
+
+def test_ids_route_to_their_source(tmp_path):
+    storage = make_sources(tmp_path)
+
+    assert storage.update_task("project:1", status=Status.DONE).id == "project:1"
+    assert SqliteTaskStorage(tmp_path / "project.db").get_task(1).status == Status.DONE
+    assert TaskStorage(tmp_path / "team.json").get_task(1).status == Status.ACTIVE
+    assert storage.get_task(2).title == "Retro"  # bare ids: the first source
+    assert storage.delete_task("team:3")
+    assert not storage.delete_task("nowhere:1")
+    assert storage.add_task("Demo", date(2026,3,5), source="project").id == "project:3"
+
+
+def test_cli_with_sources(tmp_path, monkeypatch, capsys):
+    config = Config(tmp_path / "config.toml")
+    config.lazy_load = False
+    config.sources = {"team": tmp_path / "team.json", "home": tmp_path / "home.json"}
+    config.save()
+    monkeypatch.setattr("todo.config.DEFAULT_CONFIG_PATH", config.path)
+    monkeypatch.delenv("TODO_TASK_FILE", raising=False)
+    monkeypatch.setenv("TODO_NO_DAEMON", "1")
+    TaskStorage(tmp_path / "team.json").add_task("Standup", date(2026,3,2))
+
+    def run(*args):
+        monkeypatch.setattr(sys, "argv", ["todo", *args])
+        main()
+        return capsys.readouterr().out
+
+    assert "Task created with ID home:1" in run("add", "--title", "Laundry", "--date", "2026-03-02", "--source", "home")
+    assert "Task home:1 marked as done." in run("done", "home:1")
+    assert TaskStorage(tmp_path / "home.json").get_task(1).status == Status.DONE
+    out = run("list")
+    assert out.index("team:1") < out.index("home:1")
+    # Namespaced ids keep the columns under the header
+    lines = out.splitlines()
+    assert {line.index("2026-03-02") for line in lines[2:]} == {lines[0].index("Date")}
+    monkeypatch.setattr("todo.cli.LIST_CHUNK", 1)
+    assert run("list") == out
+    assert "[home:1] Laundry" in run("week", "--date", "2026-03-02")
+
+    with pytest.raises(SystemExit):
+        run("list", "--after", "2026-03-02:bogus:2")
+    assert "Unknown task source 'bogus'; configured: team, home" in capsys.readouterr().out
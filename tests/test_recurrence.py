@@ -0,0 +1,113 @@
+import sys
+from datetime import date
+
+import pytest
+
+from todo.binary import BinaryTaskStorage, json_to_binary
+from todo.cli import main
+from todo.journal import JournalTaskStorage
+from todo.lazy import LazyTaskStorage
+from todo.models import Frequency, Recurrence, Status, TaskStorage
+from todo.render_cache import ViewCache
+from todo.sqlite import SqliteTaskStorage
+
+
+def dates(tasks):
+    return [t.task_date for t in tasks]
+
+
+def test_rule_dates():
+    weekly = Recurrence(Frequency.WEEKLY, interval=2, exceptions=frozenset({date(2026,3,16)}))
+    assert list(weekly.dates(date(2026,3,2), date(2026,3,10), date(2026,4,1))) == [date(2026,3,30)]
+
+    # Day 31 is clamped to each month's last day, without drifting
+    monthly = Recurrence(Frequency.MONTHLY, until=date(2026,4,30))
+    assert list(monthly.dates(date(2026,1,31), date(2026,1,1), date(2026,12,31))) == [
+        date(2026,1,31), date(2026,2,28), date(2026,3,31), date(2026,4,30),
+    ]
+    assert monthly.occurs_on(date(2026,1,31), date(2026,2,28))
+    assert not monthly.occurs_on(date(2026,1,31), date(2026,5,31))
+
+
+@pytest.mark.parametrize("backend", ["json", "journal", "lazy", "binary", "sqlite"])
+def test_series_expands_per_window(tmp_path, backend):
+    task_file = tmp_path / "tasks.json"
+    storage = TaskStorage(task_file)
+    storage.add_task("Plain", date(2026,3,4))
+    series = storage.add_task("Standup", date(2026,3,2), recurrence=Recurrence(Frequency.DAILY, interval=2))
+    storage.update_occurrence(series.id, date(2026,3,4), status=Status.DONE)
+    storage.update_occurrence(series.id, date(2026,3,6), skip=True)
+    assert storage.update_occurrence(series.id, date(2026,3,5), status=Status.DONE) is None
+
+    if backend == "journal":
+        storage = JournalTaskStorage(task_file)
+    elif backend == "lazy":
+        storage = LazyTaskStorage(task_file)
+    elif backend == "binary":
+        json_to_binary(task_file, tmp_path / "tasks.bin")
+        storage = BinaryTaskStorage(tmp_path / "tasks.bin")
+    elif backend == "sqlite":
+        storage = SqliteTaskStorage(tmp_path / "tasks.db")
+        storage.import_json(task_file)
+
+    week = storage.tasks_between(date(2026,3,1), date(2026,3,8))
+    assert [(t.title, t.task_date.day, t.status) for t in week] == [
+        ("Standup", 2, Status.ACTIVE),
+        ("Plain", 4, Status.ACTIVE),
+        ("Standup", 4, Status.DONE),
+        ("Standup", 8, Status.ACTIVE),
+    ]
+    assert dates(storage.tasks_between(date(2026,3,1), date(2026,3,8), status=Status.DONE)) == [date(2026,3,4)]
+    assert sorted(storage.date_ordinals(date(2026,3,3), date(2026,3,10))) == [
+        d.toordinal() for d in [date(2026,3,4), date(2026,3,4), date(2026,3,8), date(2026,3,10)]
+    ]
+    # Paged listing of a bounded window merges occurrences in order
+    assert dates(storage.iter_tasks(end=date(2026,3,10), offset=1, limit=3)) == [
+        date(2026,3,4), date(2026,3,4), date(2026,3,8),
+    ]
+    # Unbounded, the series is listed once, on its first day
+    assert [t.title for t in storage.list_tasks()] == ["Standup", "Plain"]
+
+    storage.update_occurrence(series.id, date(2026,3,8), status=Status.CANCELED)
+    assert storage.tasks_between(date(2026,3,8), date(2026,3,8))[0].status == Status.CANCELED
+
+
+def test_occurrence_change_rerenders_only_its_day(tmp_path):
+    storage = TaskStorage(tmp_path / "tasks.json")
+    day = date(2026,3,4)
+    series = storage.add_task("Standup", day, recurrence=Recurrence(Frequency.DAILY))
+    cache = ViewCache(storage)
+
+    cache.week(day, color_enabled=False)
+    assert cache.columns_rendered == 7
+    storage.update_occurrence(series.id, day, status=Status.DONE)
+    cache.week(day, color_enabled=False)
+    assert cache.columns_rendered == 8
+
+    # Changing the series itself redraws everything
+    storage.update_task(series.id, title="Daily standup")
+    assert "Daily standup" in cache.week(day, color_enabled=False)
+    assert cache.columns_rendered == 15
+
+
+def test_cli_repeat_and_occurrences(tmp_path, monkeypatch, capsys):
+    task_file = tmp_path / "tasks.json"
+    monkeypatch.setenv("TODO_TASK_FILE", str(task_file))
+
+    def run(*args):
+        monkeypatch.setattr(sys, "argv", ["todo", *args])
+        main()
+        return capsys.readouterr().out
+
+    run("add", "--title", "Report", "--date", "2026-03-02", "--repeat", "weekly", "--until", "2026-03-30")
+    assert "pick an occurrence" in run("done", "1")
+    assert "marked as done" in run("done", "1", "--on", "2026-03-09")
+    assert "does not repeat" in run("cancel", "1", "--on", "2026-03-10")
+    assert "deleted" in run("delete", "1", "--on", "2026-03-16")
+
+    out = run("list", "--from", "2026-03-01", "--to", "2026-04-30")
+    assert [line.split()[1:3] for line in out.splitlines()[2:]] == [
+        ["2026-03-02", "active"], ["2026-03-09", "done"], ["2026-03-23", "active"], ["2026-03-30", "active"],
+    ]
+    # One stored task, not one per occurrence
+    assert len(TaskStorage(task_file).tasks) == 1
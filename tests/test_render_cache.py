@@ -0,0 +1,73 @@
+from datetime import date, timedelta
+
+from todo.lazy import LazyTaskStorage
+from todo.models import TaskStorage
+from todo.month import render_month
+from todo.render_cache import ViewCache
+from todo.sqlite import SqliteTaskStorage
+from todo.week import render_week, week_bounds
+
+
+def test_week_served_from_cache_until_changed(tmp_path):
+    storage = TaskStorage(tmp_path / "tasks.json")
+    day = date(2026, 2, 18)
+    storage.add_task("Wed task", day)
+    cache = ViewCache(storage)
+
+    first = cache.week(day, color_enabled=False)
+    assert first == render_week(storage.tasks, day, color_enabled=False)
+    assert cache.week(day, color_enabled=False) is first
+    assert cache.hits == 1
+
+    # A change outside the window leaves the week alone
+    storage.add_task("Later", day + timedelta(days=30))
+    assert cache.week(day, color_enabled=False) is first
+
+    storage.add_task("Thu task", day + timedelta(days=1))
+    assert "Thu task" in cache.week(day, color_enabled=False)
+
+
+def test_only_touched_day_is_rerendered(tmp_path):
+    storage = TaskStorage(tmp_path / "tasks.json")
+    day = date(2026, 2, 18)
+    task = storage.add_task("Wed task", day)
+    cache = ViewCache(storage)
+
+    cache.week(day, color_enabled=False)
+    assert cache.columns_rendered == 7
+
+    storage.update_task(task.id, title="Renamed")
+    text = cache.week(day, color_enabled=False)
+    assert cache.columns_rendered == 8
+    monday, sunday = week_bounds(day)
+    assert text == render_week(storage.tasks_between(monday, sunday), day, color_enabled=False)
+
+
+def test_moving_a_task_invalidates_both_days(tmp_path):
+    storage = LazyTaskStorage(tmp_path / "tasks.json")
+    day = date(2026, 2, 18)
+    task = storage.add_task("Wed task", day)
+    cache = ViewCache(storage)
+    cache.week(day, color_enabled=False)
+
+    storage.update_task(task.id, task_date=day + timedelta(days=2))
+    text = cache.week(day, color_enabled=False)
+    assert cache.columns_rendered == 9
+    assert text == render_week(storage.tasks, day, color_enabled=False)
+
+
+def test_month_cache_tracks_sqlite_writes(tmp_path):
+    storage = SqliteTaskStorage(tmp_path / "tasks.db")
+    storage.add_task("Task", date(2026, 2, 3))
+    cache = ViewCache(storage)
+
+    first = cache.month(2026, 2, color_enabled=False)
+    assert cache.month(2026, 2, color_enabled=False) is first
+
+    # Written through another connection
+    other = SqliteTaskStorage(tmp_path / "tasks.db")
+    other.add_task("Other", date(2026, 2, 4))
+    other.close()
+    assert cache.month(2026, 2, color_enabled=True) == render_month(storage.tasks, 2026, 2)
+    assert cache.month(2026, 2, color_enabled=False) is not first
+    storage.close()
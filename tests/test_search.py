@@ -0,0 +1,108 @@
+from datetime import date
+
+from todo.lazy import LazyTaskStorage
+from todo.models import TaskStorage
+from todo.search import SearchIndex, log_path
+from todo.sqlite import SqliteTaskStorage
+
+
+def titles(tasks):
+    return [t.title for t in tasks]
+
+
+def test_prefix_matching_and_ranking(tmp_path):
+    storage = TaskStorage(tmp_path / "tasks.json")
+    storage.add_task("Buy milk", date(2026,2,1), description="at the market")
+    storage.add_task("Market research", date(2026,2,2))
+    storage.add_task("Marketing plan", date(2026,2,3))
+
+    # Whole word in the title first, then prefix in a title, then description
+    assert titles(storage.search("market")) == ["Market research", "Marketing plan", "Buy milk"]
+    assert titles(storage.search("mar mil")) == ["Buy milk"]
+    assert storage.search("nothing") == []
+    assert storage.search("...") == []
+
+
+def test_index_follows_mutations(tmp_path):
+    storage = TaskStorage(tmp_path / "tasks.json")
+    first = storage.add_task("Call the bank", date(2026,2,1))
+    assert titles(storage.search("bank")) == ["Call the bank"]
+
+    storage.add_task("Bank statement", date(2026,2,2))
+    storage.update_task(first.id, title="Call the dentist")
+    assert titles(storage.search("bank")) == ["Bank statement"]
+    assert titles(storage.search("dent")) == ["Call the dentist"]
+
+    storage.delete_task(first.id)
+    assert storage.search("dentist") == []
+
+
+def test_saved_index_is_kept_current_by_other_processes(tmp_path, monkeypatch):
+    task_file = tmp_path / "tasks.json"
+    storage = TaskStorage(task_file)
+    storage.add_task("Water plants", date(2026,2,1))
+    storage.search("water")
+    assert storage.search_file.exists()
+
+    # Another process changes tasks without ever searching: it only logs
+    other = LazyTaskStorage(task_file)
+    other.add_task("Water the garden", date(2026,2,2))
+    other.update_task(1, title="Feed the cat")
+    assert log_path(storage.search_file).exists()
+
+    monkeypatch.setattr(SearchIndex, "build", lambda tasks: (_ for _ in ()).throw(AssertionError("rebuilt")))
+    assert titles(LazyTaskStorage(task_file).search("water")) == ["Water the garden"]
+    assert titles(TaskStorage(task_file).search("cat")) == ["Feed the cat"]
+
+
+def test_stale_index_is_rebuilt(tmp_path):
+    task_file = tmp_path / "tasks.json"
+    storage = TaskStorage(task_file)
+    storage.add_task("Old title", date(2026,2,1))
+    storage.search("old")
+
+    # The saved index no longer matches the file, and the log can't bridge it
+    stamp = repr(storage._seen).encode()
+    storage.search_file.write_bytes(storage.search_file.read_bytes().replace(stamp, b"x" + stamp[1:]))
+    TaskStorage(task_file).update_task(1, title="New title")
+
+    assert titles(TaskStorage(task_file).search("new")) == ["New title"]
+    assert not log_path(storage.search_file).exists()
+
+
+def test_saved_index_reads_postings_on_demand(tmp_path):
+    path = tmp_path / "tasks.json.index"
+    built = SearchIndex()
+    built.add(1, "Call the bank", None)
+    built.add(2, "Bank statement", "monthly")
+    built.add(3, "Banana bread", None)
+    built.save(path, "s1")
+
+    loaded = SearchIndex.load(path, "s1")
+    assert loaded.postings == {}
+    for index in (built, loaded):
+        index.remove(1, "Call the bank", None)
+        index.add(1, "Call the dentist", None)
+        index.remove(3, "Banana bread", None)
+    # Only the tokens changed since the snapshot are held in memory
+    assert sorted(loaded.postings) == ["banana", "bank", "bread", "call", "dentist", "the"]
+    for query in ["ban", "bank", "call", "dent", "month", "bread", "zzz"]:
+        assert loaded.search(query) == built.search(query)
+
+    loaded.save(path, "s2")
+    assert SearchIndex.load(path, "s2").search("ban") == built.search("ban")
+    path.write_bytes(path.read_bytes()[:-3])
+    assert SearchIndex.load(path, "s2") is None
+
+
+def test_sqlite_search_uses_fts(tmp_path):
+    storage = SqliteTaskStorage(tmp_path / "tasks.db")
+    storage.add_task("Buy milk", date(2026,2,1), description="at the market")
+    task = storage.add_task("Market research", date(2026,2,2))
+
+    assert titles(storage.search("mark")) == ["Market research", "Buy milk"]
+    storage.update_task(task.id, title="Quarterly report")
+    storage.delete_task(1)
+    assert storage.search("market") == []
+    assert titles(storage.search("quart rep")) == ["Quarterly report"]
+    storage.close()
@@ -0,0 +1,81 @@
+import sys
+from datetime import date
+
+from todo.cli import main
+from todo.fileio import file_signature
+from todo.models import Frequency, Recurrence, Status, TaskStorage
+from todo.sharded import ShardedTaskStorage, _add_id, _remove_id, migrate_to_shards
+
+
+def titles(tasks):
+    return [t.title for t in tasks]
+
+
+def test_id_runs():
+    runs = []
+    for task_id in [1, 2, 3, 7, 5, 6]:
+        _add_id(runs, task_id)
+    assert runs == [[1, 3], [5, 7]]
+    _add_id(runs, 4)
+    assert runs == [[1, 7]]
+    _remove_id(runs, 3)
+    _remove_id(runs, 7)
+    _remove_id(runs, 9)
+    assert runs == [[1, 2], [4, 6]]
+
+
+def test_migrated_shards_load_and_write_only_what_they_cover(tmp_path):
+    task_file = tmp_path / "tasks.json"
+    source = TaskStorage(task_file)
+    source.add_task("January", date(2026,1,10))
+    source.add_task("Standup", date(2026,1,5), recurrence=Recurrence(Frequency.WEEKLY))
+    source.add_task("February", date(2026,2,3))
+    source.add_task("March", date(2026,3,3))
+    source.delete_task(4)
+
+    assert migrate_to_shards(task_file, tmp_path / "shards") == 3
+    storage = ShardedTaskStorage(tmp_path / "shards")
+    assert storage._next_id() == 5
+
+    # February's shard, plus January's for the series repeating into it
+    assert titles(storage.tasks_between(date(2026,2,1), date(2026,2,7))) == ["Standup", "February"]
+    assert sorted(storage._shards) == ["2026-01", "2026-02"]
+
+    january = file_signature(tmp_path / "shards" / "2026-01.json")
+    storage.update_task(3, status=Status.DONE)
+    assert file_signature(tmp_path / "shards" / "2026-01.json") == january
+
+    # A new date in another month moves the task to that shard
+    storage.update_task(1, task_date=date(2026,3,20))
+    task = storage.add_task("April", date(2026,4,1))
+    assert task.id == 5
+
+    reopened = ShardedTaskStorage(tmp_path / "shards")
+    assert reopened.get_task(1).task_date == date(2026,3,20)
+    assert reopened.get_task(3).status == Status.DONE
+    assert titles(reopened.iter_tasks(start=date(2026,2,1), limit=3)) == ["February", "January", "April"]
+    assert titles(reopened.tasks_between(date(2026,3,1), date(2026,3,31), status=Status.ACTIVE)) == [
+        "Standup", "Standup", "Standup", "January", "Standup", "Standup",
+    ]
+    assert reopened.delete_task(1)
+    assert reopened.get_task(1) is None
+    assert titles(reopened.search("april")) == ["April"]
+
+
+def test_cli_sharded_storage_migrates_task_file(tmp_path, monkeypatch, capsys):
+    task_file = tmp_path / "tasks.json"
+    TaskStorage(task_file).add_task("Existing", date(2026,2,18))
+    monkeypatch.setenv("TODO_TASK_FILE", str(task_file))
+    monkeypatch.setenv("TODO_STORAGE", "sharded")
+
+    def run(*args):
+        monkeypatch.setattr(sys, "argv", ["todo", *args])
+        main()
+        return capsys.readouterr().out
+
+    assert "Task created with ID 2" in run("add", "--title", "New", "--date", "2026-03-01")
+    assert "marked as done" in run("done", "1")
+    assert sorted(p.name for p in (tmp_path / "tasks.shards").glob("*.json")) == [
+        "2026-02.json", "2026-03.json", "manifest.json",
+    ]
+    assert "Existing" in run("week", "--date", "2026-02-18")
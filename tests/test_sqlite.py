@@ -0,0 +1,58 @@
+from datetime import date
+
+from todo.models import TaskStorage, Status
+from todo.sqlite import SqliteTaskStorage
+
+def test_sqlite_crud(tmp_path):
+    storage = SqliteTaskStorage(tmp_path / "tasks.db")
+
+    task = storage.add_task(title="Test Task", task_date=date(2026,2,22))
+    assert task.id == 1
+
+    storage.update_task(task.id, status=Status.DONE, title="Renamed")
+    updated = storage.get_task(task.id)
+    assert updated.status == Status.DONE
+    assert updated.title == "Renamed"
+
+    assert storage.delete_task(task.id)
+    assert storage.get_task(task.id) is None
+    assert not storage.delete_task(task.id)
+
+def test_sqlite_persistance(tmp_path):
+    db_file = tmp_path / "tasks.db"
+    SqliteTaskStorage(db_file).add_task(title="Persistant", task_date=date(2026,2,22))
+
+    storage = SqliteTaskStorage(db_file)
+    assert [t.title for t in storage.list_tasks()] == ["Persistant"]
+
+def test_sqlite_tasks_between(tmp_path):
+    storage = SqliteTaskStorage(tmp_path / "tasks.db")
+    for day in (25, 20, 23, 16):
+        storage.add_task(title=f"Day {day}", task_date=date(2026,2,day))
+    storage.update_task(3, status=Status.DONE)
+
+    week = storage.tasks_between(date(2026,2,16), date(2026,2,22))
+    assert [t.title for t in week] == ["Day 16", "Day 20"]
+
+    done = storage.tasks_between(date(2026,2,1), date(2026,2,28), status=Status.DONE)
+    assert [t.title for t in done] == ["Day 23"]
+
+def test_sqlite_imports_json(tmp_path):
+    task_file = tmp_path / "tasks.json"
+    TaskStorage(task_file).add_task(title="Legacy", task_date=date(2026,2,22))
+
+    storage = SqliteTaskStorage(tmp_path / "tasks.db")
+    assert storage.import_json(task_file) == 1
+    assert storage.get_task(1).title == "Legacy"
+    assert storage.add_task(title="New", task_date=date(2026,2,23)).id == 2
+
+def test_sqlite_import_keeps_json_high_water_mark(tmp_path):
+    task_file = tmp_path / "tasks.json"
+    legacy = TaskStorage(task_file)
+    for day in range(1, 4):
+        legacy.add_task(title=f"Legacy {day}", task_date=date(2026,2,day))
+    legacy.delete_task(3)
+
+    storage = SqliteTaskStorage(tmp_path / "tasks.db")
+    storage.import_json(task_file)
+    assert storage.add_task(title="New", task_date=date(2026,2,23)).id == 4
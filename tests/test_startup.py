@@ -0,0 +1,53 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from todo.startup import parse_importtime
+
+PROJECT_ROOT = Path(__file__).parent.parent
+# Generous default so slow CI machines don't flake; tighten locally to track
+# regressions, e.g. TODO_STARTUP_BUDGET_MS=150.
+STARTUP_BUDGET_MS = float(os.getenv("TODO_STARTUP_BUDGET_MS", "2000"))
+
+DEFERRED_MODULES = {
+    "toml", "todo.week", "todo.month", "todo.sqlite", "todo.binary",
+    "todo.daemon", "sqlite3", "socket", "mmap", "tempfile",
+}
+
+def run_todo(tmp_path, *args, importtime=False):
+    env = dict(os.environ, TODO_TASK_FILE=str(tmp_path / "tasks.json"), TODO_NO_DAEMON="1")
+    flags = ["-X", "importtime"] if importtime else []
+    return subprocess.run(
+        [sys.executable, *flags, "-m", "todo.cli", *args],
+        capture_output=True, text=True, env=env, cwd=PROJECT_ROOT, check=True,
+    )
+
+def imported_modules(stderr):
+    return {name.strip() for name, _, _ in parse_importtime(stderr)}
+
+def test_add_defers_unneeded_imports(tmp_path):
+    # Whatever the bare interpreter (site, .pth hooks) imports isn't ours
+    bare = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "pass"],
+        capture_output=True, text=True, check=True,
+    )
+    proc = run_todo(tmp_path, "add", "--title", "Task", "--date", "2026-02-22", importtime=True)
+
+    imported = imported_modules(proc.stderr) - imported_modules(bare.stderr)
+    assert "todo.models" in imported
+    assert not imported & DEFERRED_MODULES
+
+def test_startup_latency(tmp_path):
+    run_todo(tmp_path, "add", "--title", "Warm up", "--date", "2026-02-22")
+    timings = []
+    for _ in range(5):
+        t0 = time.perf_counter()
+        run_todo(tmp_path, "add", "--title", "Task", "--date", "2026-02-22")
+        timings.append((time.perf_counter() - t0) * 1000)
+
+    median = statistics.median(timings)
+    print(f"todo add cold start: median {median:.1f} ms over {len(timings)} runs")
+    assert median < STARTUP_BUDGET_MS
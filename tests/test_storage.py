@@ -63,4 +63,75 @@ def test_delete_task(tmp_path):
 
     storage.delete_task(task.id)
 
-    assert storage.get_task(task.id) is None
\ No newline at end of file
+    assert storage.get_task(task.id) is None
+
+def test_tasks_between(tmp_path):
+    storage = TaskStorage(tmp_path / "tasks.json")
+    for day in (25, 20, 23, 16):
+        storage.add_task(title=f"Day {day}", task_date=date(2026,2,day))
+
+    week = storage.tasks_between(date(2026,2,16), date(2026,2,22))
+    assert [t.title for t in week] == ["Day 16", "Day 20"]
+
+def test_ids_not_reused_after_delete(tmp_path):
+    task_file = tmp_path / "tasks.json"
+    storage = TaskStorage(task_file)
+    storage.add_task(title="One", task_date=date(2026,2,22))
+    two = storage.add_task(title="Two", task_date=date(2026,2,22))
+    storage.delete_task(two.id)
+
+    assert storage.add_task(title="Three", task_date=date(2026,2,22)).id == 3
+
+    storage2 = TaskStorage(task_file)
+    storage2.delete_task(3)
+    assert TaskStorage(task_file).add_task(title="Four", task_date=date(2026,2,22)).id == 4
+
+def test_loads_legacy_list_file(tmp_path):
+    task_file = tmp_path / "tasks.json"
+    task_file.write_text(
+        '[{"id": 7, "title": "Old", "description": null, '
+        '"created_at": "2026-02-01T10:00:00", "task_date": "2026-02-22", "status": "done"}]'
+    )
+
+    storage = TaskStorage(task_file)
+    assert storage.get_task(7).status == Status.DONE
+    assert storage.add_task(title="New", task_date=date(2026,2,22)).id == 8
+
+def test_date_index_follows_updates(tmp_path):
+    storage = TaskStorage(tmp_path / "tasks.json")
+    moved = storage.add_task(title="Moved", task_date=date(2026,2,16))
+    storage.add_task(title="Stays", task_date=date(2026,2,18))
+    storage.add_task(title="Gone", task_date=date(2026,2,17))
+    storage.delete_task(3)
+
+    storage.update_task(moved.id, task_date=date(2026,3,2))
+
+    assert [t.title for t in storage.tasks_between(date(2026,2,16), date(2026,2,22))] == ["Stays"]
+    assert [t.title for t in storage.list_tasks(task_date=date(2026,3,2))] == ["Moved"]
+    assert [t.title for t in storage.list_tasks()] == ["Stays", "Moved"]
+    assert storage.tasks_between(date(2026,2,16), date(2026,2,22), status=Status.DONE) == []
+
+def test_iter_tasks_pages_in_date_order(tmp_path):
+    from todo.binary import BinaryTaskStorage, json_to_binary
+    from todo.lazy import LazyTaskStorage
+    from todo.sqlite import SqliteTaskStorage
+
+    task_file = tmp_path / "tasks.json"
+    storage = TaskStorage(task_file)
+    for i in range(12):
+        task = storage.add_task(title=f"Task {i}", task_date=date(2026,3,12 - i % 6))
+        if i % 4 == 0:
+            storage.update_task(task.id, status=Status.DONE)
+    json_to_binary(task_file, tmp_path / "tasks.bin")
+    sqlite = SqliteTaskStorage(tmp_path / "tasks.db")
+    sqlite.import_json(task_file)
+
+    expected = sorted(storage.tasks, key=lambda t: (t.task_date, t.id))
+    for backend in [storage, LazyTaskStorage(task_file), BinaryTaskStorage(tmp_path / "tasks.bin"), sqlite]:
+        assert list(backend.iter_tasks()) == expected
+        assert list(backend.iter_tasks(offset=3, limit=4)) == expected[3:7]
+        cursor = (expected[4].task_date, expected[4].id)
+        assert list(backend.iter_tasks(after=cursor, limit=3)) == expected[5:8]
+        assert list(backend.iter_tasks(start=date(2026,3,9), end=date(2026,3,10), status=Status.ACTIVE)) == [
+            t for t in expected if date(2026,3,9) <= t.task_date <= date(2026,3,10) and t.status == Status.ACTIVE
+        ]
@@ -0,0 +1,59 @@
+import json
+import sys
+
+from todo import trace
+from todo.cli import main
+
+
+def test_disabled_tracing_records_nothing():
+    trace.enable()
+    trace.disable()
+    with trace.span("load"):
+        trace.count("tasks_loaded", 3)
+    assert trace.span("a") is trace.span("b")
+    data = trace.snapshot()
+    assert data["spans"] == [] and data["counters"] == {}
+
+
+def test_spans_nest_and_counters_add_up():
+    trace.enable()
+    try:
+        with trace.span("open"):
+            for _ in range(3):
+                with trace.span("load"):
+                    trace.count("tasks_loaded", 2)
+    finally:
+        trace.disable()
+    data = trace.snapshot()
+    assert [(s["name"], s["calls"]) for s in data["spans"]] == [("open", 1), ("open/load", 3)]
+    assert data["counters"] == {"tasks_loaded": 6}
+    assert 'todo_span_calls_total{span="open/load"} 3' in trace.format_prometheus(data)
+    assert "todo_tasks_loaded_total 6" in trace.format_prometheus(data)
+
+
+def test_cli_trace_writes_stage_breakdown(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("TODO_TASK_FILE", str(tmp_path / "tasks.json"))
+    monkeypatch.setenv("TODO_STORAGE", "json")
+    monkeypatch.setattr(sys, "argv", ["todo", "add", "--title", "Task", "--date", "2026-02-22"])
+    main()
+
+    out = tmp_path / "trace.json"
+    monkeypatch.setattr(sys, "argv", ["todo", "week", "--date", "2026-02-22", f"--trace={out}"])
+    main()
+    assert "Task" in capsys.readouterr().out
+    assert not trace.enabled
+
+    data = json.loads(out.read_text())
+    names = {s["name"] for s in data["spans"]}
+    assert {"parse args", "week", "week/config", "week/open storage"} <= names
+    assert data["counters"]["bytes_read"] > 0
+
+    monkeypatch.setenv("TODO_TRACE", "1")
+    monkeypatch.setattr(sys, "argv", ["todo", "list"])
+    main()
+    assert "Trace: todo list" in capsys.readouterr().err
+
+    monkeypatch.delenv("TODO_TRACE")
+    monkeypatch.setattr(sys, "argv", ["todo", "add", "--trace", "--title", "Traced", "--date", "2026-02-23"])
+    main()
+    assert "Trace: todo add --title Traced --date 2026-02-23" in capsys.readouterr().err
@@ -3,6 +3,7 @@ from calendar import monthrange
 import pytest
 from todo.week import render_week
 from todo.month import render_month
+from todo.heatmap import day_counts, heat_levels, render_heatmap
 from todo.models import Task, Status
 import re
 
@@ -48,4 +49,18 @@ def test_render_month_density():
     for i in range(1, monthrange(today.year, today.month)[1]+1):
         assert str(i) in no_ANSI.split()
 
-    assert "\033[" in month_str
\ No newline at end of file
+    assert "\033[" in month_str
+
+def test_heatmap_matches_month_view():
+    start, end = date(2025, 1, 1), date(2026, 12, 31)
+    tasks = [make_task(f"Task {i}", start + timedelta(days=i * 7 % 700)) for i in range(300)]
+
+    counts = day_counts([t.task_date.toordinal() for t in tasks], start, end)
+    assert len(counts) == 730
+    assert sum(counts) == 300
+
+    heatmap = render_heatmap(counts, start, end)
+    for line in render_month(tasks, 2026, 2).splitlines()[2:]:
+        assert line in heatmap
+
+    assert heat_levels([0, 1, 2, 3, 4, 1000]) == bytes([0, 1, 2, 2, 3, 3])
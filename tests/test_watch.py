@@ -0,0 +1,48 @@
+import io
+import threading
+import time
+from datetime import date
+
+import pytest
+
+from todo import watch as watch_module
+from todo.journal import JournalTaskStorage
+from todo.render_cache import view_cache
+from todo.watch import watch, watched_directories
+
+
+@pytest.mark.parametrize("watcher", ["inotify", "poll"])
+def test_watch_redraws_only_when_the_view_changes(tmp_path, monkeypatch, watcher):
+    def no_inotify(directories):
+        raise OSError("no inotify")
+
+    if watcher == "poll":
+        monkeypatch.setattr(watch_module, "Inotify", no_inotify)
+    monkeypatch.setattr(watch_module, "IDLE_WAKEUP", 0.5)
+    task_file = tmp_path / "tasks.json"
+    storage = JournalTaskStorage(task_file)
+    storage.add_task("Standup", date(2026,3,2))
+    cache = view_cache(storage)
+    out = io.StringIO()
+
+    viewer = threading.Thread(
+        target=watch,
+        args=(storage, lambda: cache.week(date(2026,3,2), color_enabled=False), out),
+        kwargs={"interval": 0.02, "frames": 2},
+        daemon=True,
+    )
+    viewer.start()
+    time.sleep(0.2)
+    writer = JournalTaskStorage(task_file)
+    writer.add_task("Elsewhere", date(2026,5,4))
+    time.sleep(0.3)
+    assert out.getvalue().count("Standup") == 1
+    writer.add_task("Review", date(2026,3,4))
+    viewer.join(timeout=5)
+
+    assert not viewer.is_alive()
+    frames = out.getvalue().split("Week 2026-03-02")
+    assert len(frames) == 3 and "Review" in frames[2] and "Elsewhere" not in out.getvalue()
+    # The new record was replayed into the loaded tasks; only its day was redrawn
+    assert cache.columns_rendered == 8
+    assert watched_directories(storage) == {tmp_path}
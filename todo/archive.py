@@ -0,0 +1,234 @@
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from datetime import date, timedelta
+from heapq import merge
+from itertools import islice
+from pathlib import Path
+from typing import Optional
+import json
+import os
+
+from todo import trace
+from todo.fileio import atomic_write, file_signature
+from todo.models import Status, Task, _order
+
+SUFFIX = ".json.gz"
+ARCHIVED = (Status.DONE, Status.CANCELED)
+
+Month = tuple[int, int]
+
+
+def _month(day: date) -> Month:
+    return day.year, day.month
+
+
+# Finished tasks moved out of the task file: one gzipped JSON segment per
+# month of task_date (2025-03.json.gz), each sorted by (task_date, id). The
+# file names alone say which months are archived, so a query only opens the
+# segments of the months it covers.
+class Archive:
+    def __init__(self, directory: Path, durable: bool = True) -> None:
+        self.directory = Path(directory)
+        self.durable = durable
+        self._listing: Optional[tuple] = None  # (directory signature, sorted months)
+        self._segments: dict[Month, tuple[tuple, list[Task]]] = {}
+
+    def version(self) -> int:
+        # Segments are replaced by rename, which moves the directory's mtime
+        try:
+            return os.stat(self.directory).st_mtime_ns
+        except FileNotFoundError:
+            return 0
+
+    @property
+    def months(self) -> list[Month]:
+        signature = file_signature(self.directory)
+        if self._listing is None or self._listing[0] != signature:
+            months = []
+            if signature is not None:
+                for name in os.listdir(self.directory):
+                    if name.endswith(SUFFIX):
+                        year, _, month = name[:-len(SUFFIX)].partition("-")
+                        months.append((int(year), int(month)))
+            self._listing = (signature, sorted(months))
+        return self._listing[1]
+
+    def _path(self, month: Month) -> Path:
+        return self.directory / f"{month[0]:04d}-{month[1]:02d}{SUFFIX}"
+
+    def _months_between(self, start: date, end: date) -> list[Month]:
+        months = self.months
+        return months[bisect_left(months, _month(start)):bisect_right(months, _month(end))]
+
+    def covers(self, start: date, end: date) -> bool:
+        return bool(self._months_between(start, end))
+
+    def read(self, month: Month) -> list[Task]:
+        import gzip
+
+        path = self._path(month)
+        signature = file_signature(path)
+        cached = self._segments.get(month)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        if signature is None:
+            return []
+        with trace.span("archive read"):
+            data = gzip.decompress(path.read_bytes())
+            tasks = [Task.from_dict(r) for r in json.loads(data)]
+        trace.count("archive_segments_read")
+        self._segments[month] = (signature, tasks)
+        return tasks
+
+    def iter_tasks(
+        self,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        status: Optional[Status] = None,
+        after: Optional[tuple[date, int]] = None,
+    ) -> Iterator[Task]:
+        # Segments are opened one at a time, as the caller gets to them
+        lo = max(start or date.min, after[0] if after else date.min)
+        for month in self._months_between(lo, end or date.max):
+            for task in self.read(month):
+                if task.task_date < lo:
+                    continue
+                if end and task.task_date > end:
+                    break
+                if status and task.status != status:
+                    continue
+                if after and (task.task_date, task.id) <= after:
+                    continue
+                yield task
+
+    def add(self, tasks: Iterable[Task]) -> int:
+        # Merged into the existing segments by id, so adding the same tasks
+        # again (after an interrupted archive run) is harmless.
+        import gzip
+
+        by_month: dict[Month, list[Task]] = {}
+        for task in tasks:
+            by_month.setdefault(_month(task.task_date), []).append(task)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for month, added in by_month.items():
+            merged = {t.id: t for t in self.read(month)}
+            merged.update((t.id, t) for t in added)
+            records = [t.to_dict() for t in sorted(merged.values(), key=_order)]
+            data = gzip.compress(json.dumps(records, separators=(",", ":")).encode("utf-8"), mtime=0)
+            atomic_write(self._path(month), lambda f: f.write(data), binary=True, durable=self.durable)
+        return len(by_month)
+
+
+def archive_tasks(storage, archive: Archive, cutoff: date) -> tuple[int, int]:
+    # Moves done/canceled tasks dated before `cutoff` from `storage` into
+    # `archive`; returns (tasks, segments). Recurring series stay put.
+    # The archive is written first, so a crash in between leaves the tasks
+    # in both places and the next run just finishes the move.
+    with storage.transaction():
+        old = [
+            t for t in storage.tasks
+            if t.task_date < cutoff and t.status in ARCHIVED and t.recurrence is None
+        ]
+        if not old:
+            return 0, 0
+        segments = archive.add(old)
+        storage.delete_tasks([t.id for t in old])
+        # With history kept (todo.history): undo can't bring the tasks back,
+        # the archive has them now
+        if hasattr(storage, "barrier"):
+            storage.barrier(f"archive before {cutoff.isoformat()}")
+    return len(old), segments
+
+
+def apply_policy(storage, archive: Archive, after_days: int) -> None:
+    # Config.archive_after_days: archive automatically, at most once a day.
+    # The marker's mtime says when it last ran; checking it is one stat.
+    marker = archive.directory / ".last_run"
+    today = date.today()
+    try:
+        if date.fromtimestamp(marker.stat().st_mtime) == today:
+            return
+    except FileNotFoundError:
+        pass
+    archive_tasks(storage, archive, today - timedelta(days=after_days))
+    archive.directory.mkdir(parents=True, exist_ok=True)
+    marker.touch()
+
+
+# Wraps a storage backend so the date-window queries also return archived
+# tasks. The archive is only consulted when the window overlaps an archived
+# month, and never for active tasks; everything else goes to the backend.
+# A listing without bounds leaves the archive out unless asked to include
+# it (`todo list --archived`): that would read every segment.
+class ArchivedStorage:
+    def __init__(self, storage, archive: Archive) -> None:
+        self.storage = storage
+        self.archive = archive
+
+    def __getattr__(self, name: str):
+        return getattr(self.storage, name)
+
+    @contextmanager
+    def transaction(self) -> Iterator["ArchivedStorage"]:
+        with self.storage.transaction():
+            yield self
+
+    def _consult(
+        self,
+        start: Optional[date],
+        end: Optional[date],
+        status: Optional[Status],
+        archived: bool = False
+    ) -> bool:
+        if start is None and end is None and not archived:
+            return False
+        return (status is None or status in ARCHIVED) and self.archive.covers(start or date.min, end or date.max)
+
+    def list_tasks(
+        self,
+        status: Optional[Status] = None,
+        task_date: Optional[date] = None,
+        archived: bool = False
+    ) -> list[Task]:
+        if task_date:
+            return self.tasks_between(task_date, task_date, status)
+        return list(self.iter_tasks(status=status, archived=archived))
+
+    def tasks_between(self, start: date, end: date, status: Optional[Status] = None) -> list[Task]:
+        tasks = self.storage.tasks_between(start, end, status)
+        if not self._consult(start, end, status):
+            return tasks
+        return list(merge(tasks, self.archive.iter_tasks(start, end, status), key=_order))
+
+    def iter_tasks(
+        self,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        status: Optional[Status] = None,
+        after: Optional[tuple[date, int]] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        archived: bool = False,
+    ) -> Iterator[Task]:
+        if not self._consult(start, end, status, archived):
+            return self.storage.iter_tasks(start, end, status, after, offset, limit)
+        stop = None if limit is None else offset + limit
+        tasks = merge(
+            self.storage.iter_tasks(start, end, status, after, 0, stop),
+            self.archive.iter_tasks(start, end, status, after),
+            key=_order,
+        )
+        return islice(tasks, offset, stop)
+
+    def date_ordinals(self, start: date, end: date) -> list[int]:
+        ordinals = self.storage.date_ordinals(start, end)
+        if self._consult(start, end, None):
+            ordinals += [t.task_date.toordinal() for t in self.archive.iter_tasks(start, end)]
+        return ordinals
+
+    def day_version(self, day: date) -> tuple:
+        return (*self.storage.day_version(day), self.archive.version())
+
+    def window_version(self, start: date, end: date) -> tuple:
+        return (*self.storage.window_version(start, end), self.archive.version())
@@ -0,0 +1,62 @@
+from collections.abc import Iterable
+import json
+import shlex
+import sys
+
+from todo.config import Config
+
+BATCH_COMMANDS = {"add", "edit", "delete", "done", "cancel"}
+
+
+def parse_operation(line: str) -> list[str]:
+    # Either a JSON object such as {"op": "done", "id": 3} or the arguments of
+    # a CLI call such as `add --title "Buy milk" --date 2026-02-22`.
+    if line.startswith("{"):
+        op = json.loads(line)
+        argv = [op.pop("op")]
+        if "id" in op:
+            argv.append(str(op.pop("id")))
+        for key, value in op.items():
+            if value is not None:
+                argv += [f"--{key}", str(value)]
+        return argv
+    argv = shlex.split(line)
+    if argv[:1] == ["todo"]:
+        argv = argv[1:]
+    return argv
+
+
+def run_batch(storage, config: Config, lines: Iterable[str], json_output: bool = False) -> bool:
+    from todo import cli
+
+    results = []
+    # All operations share one loaded storage and one locked transaction,
+    # so the task file is read once and written once.
+    with storage.transaction(), cli.resident(storage, config):
+        for lineno, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                argv = parse_operation(line)
+            except (ValueError, KeyError) as e:
+                results.append((lineno, {"exit": 1, "stdout": "", "stderr": f"Invalid operation: {e}"}))
+                continue
+            if argv[:1] and argv[0] in BATCH_COMMANDS:
+                results.append((lineno, cli.run_captured(argv)))
+            else:
+                results.append((lineno, {"exit": 1, "stdout": "", "stderr": f"Unsupported operation: {line}"}))
+
+    out = []
+    for lineno, result in results:
+        ok = result["exit"] == 0
+        message = (result["stdout"] if ok else result["stderr"] or result["stdout"]).strip()
+        if json_output:
+            out.append(json.dumps({"line": lineno, "ok": ok, "output": message}))
+        else:
+            out.append(f"{lineno}: {'ok' if ok else 'FAILED'} {message}")
+    failed = sum(result["exit"] != 0 for _, result in results)
+    if not json_output:
+        out.append(f"Applied {len(results) - failed}/{len(results)} operations")
+    sys.stdout.write("\n".join(out) + "\n")
+    return failed == 0
@@ -0,0 +1,315 @@
+from bisect import bisect_left
+from collections.abc import Iterable, Iterator
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Optional
+import json
+import mmap
+import struct
+
+from todo import trace
+from todo.codec import STATUSES, STATUS_CODES
+from todo.fileio import atomic_write
+from todo.models import Task, TaskFileError, Status, TaskStorage
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+NO_STRING = -1
+
+MAGIC = b"TODOSNAP"
+VERSION = 2
+HEADER = struct.Struct("<8sIIq")  # magic, version, count, last_id
+TRAILER = struct.Struct("<q")  # length of the series JSON before it (version 2)
+
+# Fixed-width fields are stored one section per field, in this order, each
+# section padded to 8 bytes. Keeping a field contiguous lets readers cast a
+# section of the mapping straight to a typed memoryview (e.g. all dates) with
+# no per-record decoding. Strings live in a UTF-8 heap after the sections.
+# Recurring tasks (series) don't fit the fixed-width rows; version 2 appends
+# them after the heap as a JSON list of task dicts, followed by its length.
+SECTIONS = [
+    ("ids", "q"),
+    ("created", "q"),          # microseconds since EPOCH
+    ("title_offsets", "q"),    # into the heap
+    ("desc_offsets", "q"),     # into the heap, or NO_STRING
+    ("title_lengths", "I"),
+    ("desc_lengths", "I"),
+    ("dates", "i"),            # date.toordinal()
+    ("statuses", "B"),         # index into STATUSES
+]
+
+
+def _align(n: int) -> int:
+    return (n + 7) & ~7
+
+
+def _layout(count: int) -> tuple[dict[str, tuple[int, str]], int]:
+    offsets = {}
+    pos = HEADER.size
+    for name, fmt in SECTIONS:
+        offsets[name] = (pos, fmt)
+        pos = _align(pos + count * struct.calcsize(fmt))
+    return offsets, pos
+
+
+def write_snapshot(path: Path, tasks: Iterable[Task], last_id: int, durable: bool = True) -> None:
+    # Records are written in (task_date, id) order so that readers can bisect
+    # the dates section.
+    path = Path(path)
+    tasks = sorted(tasks, key=lambda t: (t.task_date, t.id))
+    series = [t.to_dict() for t in tasks if t.recurrence is not None]
+    if series:
+        tasks = [t for t in tasks if t.recurrence is None]
+    count = len(tasks)
+    layout, heap_start = _layout(count)
+
+    heap = bytearray()
+    heap_index: dict[str, int] = {}
+
+    def put(s: Optional[str]) -> tuple[int, int]:
+        if s is None:
+            return NO_STRING, 0
+        offset = heap_index.get(s)
+        data = s.encode("utf-8")
+        if offset is None:
+            offset = heap_index[s] = len(heap)
+            heap.extend(data)
+        return offset, len(data)
+
+    columns: dict[str, list] = {name: [] for name, _ in SECTIONS}
+    for t in tasks:
+        title_offset, title_length = put(t.title)
+        desc_offset, desc_length = put(t.description)
+        columns["ids"].append(t.id)
+        columns["created"].append((t.created_at - EPOCH) // MICROSECOND)
+        columns["title_offsets"].append(title_offset)
+        columns["desc_offsets"].append(desc_offset)
+        columns["title_lengths"].append(title_length)
+        columns["desc_lengths"].append(desc_length)
+        columns["dates"].append(t.task_date.toordinal())
+        columns["statuses"].append(STATUS_CODES[t.status])
+
+    buf = bytearray(heap_start)
+    HEADER.pack_into(buf, 0, MAGIC, VERSION, count, last_id)
+    for name, (offset, fmt) in layout.items():
+        struct.pack_into(f"<{count}{fmt}", buf, offset, *columns[name])
+    buf.extend(heap)
+    trailer = json.dumps(series, separators=(",", ":")).encode("utf-8")
+    buf.extend(trailer)
+    buf.extend(TRAILER.pack(len(trailer)))
+
+    atomic_write(path, lambda f: f.write(buf), binary=True, durable=durable)
+
+
+class BinarySnapshot:
+    # Raises ValueError for a file that isn't a snapshot, or is one cut short
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        with trace.span("mmap"), self.path.open("rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        trace.count("bytes_mapped", len(self._mm))
+        self._views: list[memoryview] = []
+        try:
+            self._map()
+        except BaseException:
+            self.close()
+            raise
+
+    def _map(self) -> None:
+        size = len(self._mm)
+        if size < HEADER.size:
+            raise ValueError("snapshot is truncated")
+        magic, version, self.count, self.last_id = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version not in (1, VERSION):
+            raise ValueError("not a task snapshot")
+        layout, self._heap_start = _layout(self.count)
+        heap_end = size
+        self.series: list[Task] = []
+        if version >= 2:
+            if size < self._heap_start + TRAILER.size:
+                raise ValueError("snapshot is truncated")
+            (length,) = TRAILER.unpack_from(self._mm, size - TRAILER.size)
+            heap_end = size - TRAILER.size - length
+            if not self._heap_start <= heap_end:
+                raise ValueError("snapshot is truncated")
+            try:
+                self.series = [Task.from_dict(r) for r in json.loads(self._mm[heap_end:heap_end + length])]
+            except (KeyError, TypeError) as e:
+                raise ValueError("corrupt series section") from e
+        elif size < self._heap_start:
+            raise ValueError("snapshot is truncated")
+        view = memoryview(self._mm)
+        self._views.append(view)
+        for name, (offset, fmt) in layout.items():
+            size = self.count * struct.calcsize(fmt)
+            section = view[offset:offset + size].cast(fmt)
+            self._views.append(section)
+            setattr(self, name, section)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _string(self, offset: int, length: int) -> Optional[str]:
+        if offset == NO_STRING:
+            return None
+        start = self._heap_start + offset
+        return self._mm[start:start + length].decode("utf-8")
+
+    def task(self, row: int) -> Task:
+        return Task(
+            id=self.ids[row],
+            title=self._string(self.title_offsets[row], self.title_lengths[row]),
+            created_at=EPOCH + self.created[row] * MICROSECOND,
+            task_date=date.fromordinal(self.dates[row]),
+            status=STATUSES[self.statuses[row]],
+            description=self._string(self.desc_offsets[row], self.desc_lengths[row]),
+        )
+
+    def rows_between(self, start: date, end: date) -> range:
+        lo = bisect_left(self.dates, start.toordinal())
+        hi = bisect_left(self.dates, end.toordinal() + 1, lo)
+        return range(lo, hi)
+
+    def close(self) -> None:
+        for view in reversed(self._views):
+            view.release()
+        self._mm.close()
+
+
+def json_to_binary(json_path: Path, binary_path: Path) -> int:
+    storage = TaskStorage(json_path)
+    write_snapshot(binary_path, storage.tasks, storage._next_id() - 1)
+    return len(storage.tasks)
+
+
+def binary_to_json(binary_path: Path, json_path: Path) -> int:
+    storage = BinaryTaskStorage(binary_path)
+    target = TaskStorage(json_path)
+    target._last_id = storage._next_id() - 1
+    target._set_tasks(storage.tasks)
+    target.save_tasks()
+    return len(target.tasks)
+
+
+# Reads go straight to the mapped snapshot: date-window queries bisect the
+# dates section and decode only the rows inside the window. The first
+# mutation materializes every task and the snapshot is rewritten on save.
+class BinaryTaskStorage(TaskStorage):
+    def _open_snapshot(self) -> BinarySnapshot:
+        try:
+            return BinarySnapshot(self.filename)
+        except ValueError as e:
+            raise TaskFileError(f"{self.filename} is corrupt: {e}") from e
+
+    def _load(self) -> None:
+        self._snapshot: Optional[BinarySnapshot] = None
+        if self.filename.exists() and self.filename.stat().st_size:
+            self._snapshot = self._open_snapshot()
+            self._last_id = self._snapshot.last_id
+            self._series = {t.id: t for t in self._snapshot.series}
+        else:
+            self._set_tasks([])
+
+    def _reload(self) -> None:
+        self.close()
+        self._set_tasks(self.load_tasks())
+
+    def _ensure_loaded(self) -> None:
+        if self._snapshot is None:
+            return
+        snapshot, self._snapshot = self._snapshot, None
+        self._set_tasks([snapshot.task(row) for row in range(len(snapshot))] + snapshot.series)
+        snapshot.close()
+
+    def load_tasks(self) -> list[Task]:
+        if not self.filename.exists() or not self.filename.stat().st_size:
+            return []
+        snapshot = self._open_snapshot()
+        try:
+            self._last_id = max(self._last_id, snapshot.last_id)
+            return [snapshot.task(row) for row in range(len(snapshot))] + snapshot.series
+        finally:
+            snapshot.close()
+
+    def save_tasks(self) -> None:
+        self._ensure_loaded()
+        write_snapshot(self.filename, self._tasks.values(), self._last_id, durable=self.durable)
+
+    @property
+    def tasks(self) -> list[Task]:
+        self._ensure_loaded()
+        return super().tasks
+
+    def add_task(self, *args, **kwargs) -> Task:
+        self._ensure_loaded()
+        return super().add_task(*args, **kwargs)
+
+    def insert_tasks(self, tasks) -> int:
+        self._ensure_loaded()
+        return super().insert_tasks(tasks)
+
+    def get_task(self, task_id: int) -> Optional[Task]:
+        self._ensure_loaded()
+        return super().get_task(task_id)
+
+    def update_task(self, *args, **kwargs) -> Optional[Task]:
+        self._ensure_loaded()
+        return super().update_task(*args, **kwargs)
+
+    def delete_task(self, task_id: int) -> bool:
+        self._ensure_loaded()
+        return super().delete_task(task_id)
+
+    def delete_tasks(self, task_ids) -> int:
+        self._ensure_loaded()
+        return super().delete_tasks(task_ids)
+
+    def list_tasks(self, status: Optional[Status] = None, task_date: Optional[date] = None) -> list[Task]:
+        if task_date:
+            return self.tasks_between(task_date, task_date, status)
+        self._ensure_loaded()
+        return super().list_tasks(status, task_date)
+
+    def tasks_between(self, start: date, end: date, status: Optional[Status] = None) -> list[Task]:
+        snapshot = self._snapshot
+        if snapshot is None:
+            return super().tasks_between(start, end, status)
+        rows = snapshot.rows_between(start, end)
+        if status:
+            code = STATUS_CODES[status]
+            rows = [row for row in rows if snapshot.statuses[row] == code]
+        return self._with_occurrences([snapshot.task(row) for row in rows], start, end, status)
+
+    def _iter_index(
+        self,
+        start: Optional[date],
+        end: Optional[date],
+        status: Optional[Status],
+        after: Optional[tuple[date, int]],
+    ) -> Iterator[Task]:
+        snapshot = self._snapshot
+        if snapshot is None:
+            yield from super()._iter_index(start, end, status, after)
+            return
+        rows = snapshot.rows_between(start or date.min, end or date.max)
+        if after:
+            rows = range(max(rows.start, bisect_left(snapshot.dates, after[0].toordinal())), rows.stop)
+        code = STATUS_CODES[status] if status else None
+        cursor = (after[0].toordinal(), after[1]) if after else None
+        for row in rows:
+            if cursor and (snapshot.dates[row], snapshot.ids[row]) <= cursor:
+                continue
+            if code is None or snapshot.statuses[row] == code:
+                yield snapshot.task(row)
+
+    def date_ordinals(self, start: date, end: date) -> list[int]:
+        snapshot = self._snapshot
+        if snapshot is None:
+            return super().date_ordinals(start, end)
+        rows = snapshot.rows_between(start, end)
+        return snapshot.dates[rows.start:rows.stop].tolist() + self._occurrence_ordinals(start, end)
+
+    def close(self) -> None:
+        if self._snapshot is not None:
+            self._snapshot.close()
+            self._snapshot = None
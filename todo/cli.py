@@ -1,12 +1,20 @@
 import argparse
+from collections.abc import Iterator
+from contextlib import contextmanager, redirect_stderr, redirect_stdout
 from datetime import date, datetime, timedelta
+from functools import cache
 from pathlib import Path
+from typing import Optional
+import io
+import os
 import sys
 
-from todo.models import TaskStorage, Status
+from todo import trace
+from todo.models import Frequency, Recurrence, Status, TaskFileError
 from todo.config import Config
-from todo.week import render_week
-from todo.month import render_month
+
+# Storage backends and views are imported by the handlers that need them,
+# so e.g. `todo add` doesn't pay for the calendar renderers.
 
 # UTILITIES
 
@@ -17,42 +25,138 @@ def parse_date(date_str: str) -> date:
         print("Invalid date format. Use YYYY-MM-DD")
         sys.exit(1)
 
+def parse_task_id(value: str):
+    # 12, or team:12 for task 12 of the task source named "team"
+    name, sep, number = value.rpartition(":")
+    if not number.isdigit() or (sep and not name):
+        raise argparse.ArgumentTypeError(f"invalid task id {value!r}; use ID or SOURCE:ID")
+    return f"{name}:{int(number)}" if sep else int(number)
+
+def parse_count(value: str) -> int:
+    if not value.isdigit():
+        raise argparse.ArgumentTypeError(f"invalid count {value!r}; use 0 or more")
+    return int(value)
+
+# Set by `todo daemon`, which serves every command from one storage object
+_resident = None
+
+def set_resident(storage, config) -> None:
+    global _resident
+    _resident = (storage, config) if storage is not None else None
+
+@contextmanager
+def resident(storage, config) -> Iterator[None]:
+    previous = _resident
+    set_resident(storage, config)
+    try:
+        yield
+    finally:
+        set_resident(*(previous or (None, None)))
+
+_config = None  # read once per main(), for the daemon check and the command
+
+def get_config() -> Config:
+    global _config
+    if _resident is not None:
+        return _resident[1]
+    if _config is None:
+        with trace.span("config"):
+            _config = Config()
+    return _config
+
 def get_storage_and_config():
-    config = Config()
-    storage = TaskStorage(config.task_file)
+    if _resident is not None:
+        return _resident
+    config = get_config()
+    with trace.span("open storage"):
+        from todo.storage import open_storage
+
+        storage = open_storage(config)
     return storage, config
 
+def _source(storage, name: Optional[str]):
+    # The task source a command writes into: the storage itself, unless
+    # several sources are configured (see todo.multi)
+    if not hasattr(storage, "sources"):
+        if name:
+            print("--source needs task sources in the config")
+            sys.exit(1)
+        return storage
+    try:
+        return storage.source(name)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+
+def _storage_for_id(task_id):
+    # A SOURCE:ID only means something with several sources configured
+    storage, _ = get_storage_and_config()
+    if isinstance(task_id, str) and not hasattr(storage, "sources"):
+        print(f"Task id {task_id}: no task sources configured, use a plain ID")
+        sys.exit(1)
+    return storage
+
 def handle_add(args):
     storage, _ = get_storage_and_config()
     task_date = parse_date(args.date)
+    recurrence = None
+    if args.repeat:
+        if args.every < 1:
+            print("--every must be at least 1")
+            sys.exit(1)
+        recurrence = Recurrence(
+            Frequency(args.repeat),
+            interval=args.every,
+            until=parse_date(args.until) if args.until else None,
+        )
 
+    # Only a storage with several task sources knows --source
+    where = {"source": args.source} if _source(storage, args.source) is not storage else {}
     task = storage.add_task(
         title=args.title,
         description=args.description,
         task_date=task_date,
+        recurrence=recurrence,
+        **where,
     )
     print(f"Task created with ID {task.id}")
 
 def handle_edit(args):
-    storage, _ = get_storage_and_config()
-    task = storage.get_task(args.id)
+    storage = _storage_for_id(args.id)
+    task = storage.update_task(
+        args.id,
+        title=args.title or None,
+        description=args.description,
+        task_date=parse_date(args.date) if args.date else None,
+    )
 
     if not task:
         print(f"Task {args.id} not found.")
         return
-    
-    if args.title:
-        task.title = args.title
-    if args.description is not None:
-        task.description = args.description
-    if args.date:
-        task.task_date = parse_date(args.date)
-
-    storage.save_tasks()
+
     print(f"Task {task.id} updated")
 
+def _update_occurrence(storage, args, status=None, skip=False) -> bool:
+    # For --on: change just that occurrence of a recurring task
+    day = parse_date(args.on)
+    if storage.update_occurrence(args.id, day, status=status, skip=skip) is None:
+        print(f"Task {args.id} does not repeat on {day.isoformat()}.")
+        return False
+    return True
+
+def _is_series(storage, task_id: int) -> bool:
+    task = storage.get_task(task_id)
+    if task is not None and task.recurrence is not None:
+        print(f"Task {task_id} repeats; pick an occurrence with --on YYYY-MM-DD.")
+        return True
+    return False
+
 def handle_delete(args):
-    storage, _ = get_storage_and_config()
+    storage = _storage_for_id(args.id)
+    if args.on:
+        if _update_occurrence(storage, args, skip=True):
+            print(f"Task {args.id} on {args.on} deleted.")
+        return
     if not storage.delete_task(args.id):
         print(f"Task {args.id} not found.")
         return
@@ -60,58 +164,158 @@ def handle_delete(args):
     print(f"Task {args.id} deleted.")
 
 def handle_done(args):
-    storage, _ = get_storage_and_config()
-    task = storage.get_task(args.id)
+    storage = _storage_for_id(args.id)
+    if args.on:
+        if _update_occurrence(storage, args, status=Status.DONE):
+            print(f"Task {args.id} on {args.on} marked as done.")
+        return
+    if _is_series(storage, args.id):
+        return
+    task = storage.update_task(args.id, status=Status.DONE)
     if not task:
         print(f"Task {args.id} not found.")
         return
-    task.status = Status.DONE
-    storage.save_tasks()
     print(f"Task {args.id} marked as done.")
 
 def handle_cancel(args):
-    storage, _ = get_storage_and_config()
-    task = storage.get_task(args.id)
+    storage = _storage_for_id(args.id)
+    if args.on:
+        if _update_occurrence(storage, args, status=Status.CANCELED):
+            print(f"Task {args.id} on {args.on} canceled.")
+        return
+    if _is_series(storage, args.id):
+        return
+    task = storage.update_task(args.id, status=Status.CANCELED)
     if not task:
         print(f"Task {args.id} not found.")
         return
-    task.status = Status.CANCELED
-    storage.save_tasks()
     print(f"Task {args.id} canceled.")
 
+def parse_cursor(cursor: str) -> tuple[date, int]:
+    day, _, task_id = cursor.partition(":")
+    try:
+        return parse_date(day), parse_task_id(task_id)
+    except argparse.ArgumentTypeError:
+        print("Invalid cursor. Use YYYY-MM-DD:ID")
+        sys.exit(1)
+
+LIST_CHUNK = 256  # rows per write to stdout
+
+def _list_header(width: int) -> str:
+    return f"{'ID':<{width}} {'Date':<12} {'Status':<10} Title\n{'-' * (width + 46)}\n"
+
+def _task_row(t, width: int) -> str:
+    return f"{t.id:<{width}} {t.task_date.isoformat():12} {t.status.value:<10} {t.title}\n"
+
+def _id_width(tasks) -> int:
+    # The ID column: the longest id (team:12 with several sources), and
+    # never narrower than it always was
+    return max(4, max((len(str(t.id)) for t in tasks), default=0))
+
+def _widest_id(storage) -> int:
+    # The longest id the storage can hand back: its highest id, behind the
+    # longest source name if there are several
+    if hasattr(storage, "sources"):
+        return max(len(name) + 1 + len(str(s._next_id() - 1)) for name, s in storage.sources.items())
+    return len(str(storage._next_id() - 1))
+
 def handle_list(args):
     storage, _ = get_storage_and_config()
-    tasks = storage.list_tasks()
+    # One past the limit, to know whether to print a cursor for the next page
+    try:
+        tasks = storage.iter_tasks(
+            start=parse_date(args.start) if args.start else None,
+            end=parse_date(args.end) if args.end else None,
+            status=Status(args.status) if args.status else None,
+            after=parse_cursor(args.after) if args.after else None,
+            offset=args.offset,
+            limit=None if args.limit is None else args.limit + 1,
+            # Only ArchivedStorage (and several sources of them) take the flag
+            **({"archived": True} if args.archived else {}),
+        )
+    except ValueError as e:  # a cursor in an unknown task source
+        print(e)
+        sys.exit(1)
+
+    out = sys.stdout
+    shown = 0
+    last = None
+    more = False
+    chunk: list[str] = []
+    # The first chunk's tasks, held back to size the ID column: from just
+    # them if that's all there is, otherwise for any id the storage has
+    width = 0
+    head = []
+    try:
+        for t in tasks:
+            if shown == args.limit:
+                more = True
+                break
+            shown += 1
+            last = t
+            if width:
+                chunk.append(_task_row(t, width))
+            else:
+                head.append(t)
+                if len(head) < LIST_CHUNK:
+                    continue
+                width = max(_id_width(head), _widest_id(storage))
+                chunk.append(_list_header(width))
+                chunk.extend(_task_row(h, width) for h in head)
+                head.clear()
+            if len(chunk) >= LIST_CHUNK:
+                out.write("".join(chunk))
+                chunk.clear()
+        if head:
+            width = _id_width(head)
+            chunk.append(_list_header(width))
+            chunk.extend(_task_row(h, width) for h in head)
+        if not shown:
+            chunk.append("Tasks not found.\n")
+        out.write("".join(chunk))
+        out.flush()
+        if more:
+            print(f"More: todo list --after {last.task_date.isoformat()}:{last.id}", file=sys.stderr)
+    except BrokenPipeError:
+        # The reader went away (e.g. `todo list | head`). Point stdout at
+        # devnull so the interpreter's final flush doesn't raise again.
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, out.fileno())
+        sys.exit(1)
 
+def handle_search(args):
+    storage, _ = get_storage_and_config()
+    tasks = storage.search(" ".join(args.query), limit=args.limit)
     if not tasks:
         print("Tasks not found.")
         return
+    width = _id_width(tasks)
+    sys.stdout.write(_list_header(width) + "".join(_task_row(t, width) for t in tasks))
 
-    print(f"{'ID':<4} {'Date':<12} {'Status':<10} Title")
-    print("-" * 50)
+def _show(storage, render, args) -> None:
+    # Once, or with --watch again on every change until interrupted
+    if args.watch:
+        from todo.watch import watch
 
-    for t in tasks:
-        print(
-            f"{t.id:<4} {t.task_date.isoformat():12} "
-            f"{t.status.value:<10} {t.title}"
-        )
+        watch(storage, render)
+        return
+    print(render())
 
 def handle_week(args):
     storage, config = get_storage_and_config()
-    tasks = storage.list_tasks()
+    from todo.render_cache import view_cache
 
-    if args.date:
-        reference_date = parse_date(args.date)
-    else:
-        reference_date = date.today()
-    
-    reference_date += timedelta(days=args.shift * 7)
-    result = render_week(
-        tasks,
-        reference_date=reference_date,
-        color_enabled=config.color_enabled,
-    )
-    print(result)
+    def render() -> str:
+        # Without --date, a watched view moves on to the next week by itself
+        if args.date:
+            reference_date = parse_date(args.date)
+        else:
+            reference_date = date.today()
+
+        reference_date += timedelta(days=args.shift * 7)
+        return view_cache(storage).week(reference_date, color_enabled=config.color_enabled)
+
+    _show(storage, render, args)
 
 
 def shift_month(base_date: date, months: int) -> tuple[int, int]:
@@ -130,27 +334,204 @@ def shift_month(base_date: date, months: int) -> tuple[int, int]:
 
 def handle_month(args):
     storage, config = get_storage_and_config()
-    tasks = storage.list_tasks()
-    
-    if  args.date:
-        reference_date = parse_date(args.date)
-    else:
-        reference_date = date.today()
+    from todo.render_cache import view_cache
+
+    def render() -> str:
+        if args.date:
+            reference_date = parse_date(args.date)
+        else:
+            reference_date = date.today()
+
+        year, month = shift_month(reference_date, args.shift)
+        return view_cache(storage).month(year, month, color_enabled=config.color_enabled)
 
-    year, month = shift_month(reference_date, args.shift)
+    _show(storage, render, args)
 
-    result = render_month(
-        tasks,
-        year,
-        month,
-        color_enabled=config.color_enabled,
+def _print_heatmap(storage, config, start: date, end: date) -> None:
+    from todo.heatmap import day_counts, render_heatmap
+
+    counts = day_counts(storage.date_ordinals(start, end), start, end)
+    print(render_heatmap(counts, start, end, color_enabled=config.color_enabled))
+
+def handle_year(args):
+    storage, config = get_storage_and_config()
+    reference_date = parse_date(args.date) if args.date else date.today()
+    year = reference_date.year + args.shift
+    _print_heatmap(storage, config, date(year, 1, 1), date(year, 12, 31))
+
+def handle_range(args):
+    storage, config = get_storage_and_config()
+    start, end = parse_date(args.start), parse_date(args.end)
+    if start > end:
+        print("--from must not be after --to")
+        sys.exit(1)
+    _print_heatmap(storage, config, start, end)
+
+def handle_import(args):
+    from todo.importer import import_files
+
+    storage, _ = get_storage_and_config()
+    storage = _source(storage, args.source)
+    paths = [Path(p) for p in args.files]
+    missing = [str(p) for p in paths if not p.exists()]
+    if missing:
+        print(f"File not found: {', '.join(missing)}")
+        sys.exit(1)
+
+    def progress(stats) -> None:
+        sys.stderr.write(f"\r{stats.rows} rows read, {stats.rows_per_second:,.0f} rows/s")
+        sys.stderr.flush()
+
+    try:
+        stats = import_files(
+            storage, paths, fmt=args.format, workers=args.workers, chunk_rows=args.chunk_rows,
+            dedupe=not args.keep_duplicates, progress=progress if sys.stderr.isatty() else None,
+        )
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    if sys.stderr.isatty():
+        sys.stderr.write("\n")
+    for error in stats.errors:
+        print(error, file=sys.stderr)
+    print(
+        f"Imported {stats.imported} tasks from {stats.rows} rows"
+        f" ({stats.duplicates} duplicates, {stats.invalid} invalid)"
+        f" in {stats.seconds:.2f}s, {stats.rows_per_second:,.0f} rows/s"
     )
-    print(result)
+    if stats.invalid:
+        sys.exit(1)
+
+def _recorded(storage, name: Optional[str]):
+    storage = _source(storage, name)
+    if not hasattr(storage, "history"):
+        print("No history is kept (history_limit = 0)")
+        sys.exit(1)
+    return storage
+
+def _undo_step(args, op: str) -> None:
+    from todo.history import HistoryConflict
+
+    storage = _recorded(get_storage_and_config()[0], args.source)
+    try:
+        entry = storage.undo() if op == "undo" else storage.redo()
+    except HistoryConflict as e:
+        print(f"Can't {op}: {e}")
+        sys.exit(1)
+    if entry is None:
+        print(f"Nothing to {op}.")
+        return
+    print(f"{'Undid' if op == 'undo' else 'Redid'}: {entry['command']}")
+
+def handle_undo(args):
+    _undo_step(args, "undo")
+
+def handle_redo(args):
+    _undo_step(args, "redo")
+
+def handle_history(args):
+    from todo.history import describe
+
+    storage = _recorded(get_storage_and_config()[0], args.source)
+    done, undone = storage.history.stacks()
+    # Oldest first; the undone ones came last, newest at the bottom
+    entries = [(e, "") for e in done] + [(e, "  (undone)") for e in reversed(undone)]
+    if args.limit is not None:
+        entries = entries[-args.limit:] if args.limit > 0 else []
+    if not entries:
+        print("No history.")
+        return
+    for entry, mark in entries:
+        print(f"{entry['at'].replace('T', ' ')[:16]}  {entry['command']}  [{describe(entry['changes'])}]{mark}")
+
+DEFAULT_ARCHIVE_DAYS = 30
+
+def handle_archive(args):
+    from todo.archive import archive_tasks
+
+    storage, config = get_storage_and_config()
+    if args.before:
+        cutoff = parse_date(args.before)
+    else:
+        days = args.older_than if args.older_than is not None else config.archive_after_days or DEFAULT_ARCHIVE_DAYS
+        cutoff = date.today() - timedelta(days=days)
+    # Each task source has its own archive
+    sources = storage.sources.values() if hasattr(storage, "sources") else [storage]
+    archived = False
+    for source in sources:
+        count, segments = archive_tasks(source, source.archive, cutoff)
+        if count:
+            archived = True
+            print(f"Archived {count} tasks into {segments} segment(s) in {source.archive.directory}")
+    if not archived:
+        print("Nothing to archive.")
+
+def handle_convert(args):
+    from todo.binary import binary_to_json, json_to_binary
+
+    config = get_config()
+    if args.format == "sharded":
+        from todo.sharded import migrate_to_shards
+
+        shard_dir = config.task_file.with_suffix(".shards")
+        count = migrate_to_shards(config.task_file, shard_dir, args.granularity or config.shard_granularity)
+        print(f"Converted {count} tasks to shards in {shard_dir}")
+        return
+    binary_file = config.task_file.with_suffix(".bin")
+    if args.format == "binary":
+        count = json_to_binary(config.task_file, binary_file)
+        print(f"Converted {count} tasks to {binary_file}")
+    else:
+        count = binary_to_json(binary_file, config.task_file)
+        print(f"Converted {count} tasks to {config.task_file}")
+
+def handle_daemon(args):
+    from todo import daemon
+
+    config = get_config()
+    if args.stop:
+        if daemon.stop(config):
+            print("Daemon stopped.")
+        else:
+            print("Daemon is not running.")
+        return
+    if daemon.running(config):
+        print(f"A daemon is already listening on {daemon.socket_path(config)}")
+        sys.exit(1)
+    print(f"Listening on {daemon.socket_path(config)}")
+    sys.stdout.flush()
+    daemon.serve(config)
+
+def handle_batch(args):
+    from todo.batch import run_batch
+
+    storage, config = get_storage_and_config()
+    if args.file == "-":
+        ok = run_batch(storage, config, sys.stdin, json_output=args.json)
+    else:
+        with open(args.file, encoding="utf-8") as f:
+            ok = run_batch(storage, config, f, json_output=args.json)
+    if not ok:
+        sys.exit(1)
 
 # PARSER
 
 def build_parser():
     parser = argparse.ArgumentParser(prog="todo")
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="Run the command with -X importtime and report where startup time goes",
+    )
+    # Taken out of the command line by main() (see pop_trace); listed here
+    # for --help
+    parser.add_argument(
+        "--trace",
+        action="store_true",
+        help="Report time per stage and counters to stderr; --trace=FILE writes them to FILE "
+             "as JSON (*.json) or Prometheus text instead. Accepted anywhere on the command "
+             "line (todo add --trace ...). Also enabled by TODO_TRACE=1 or TODO_TRACE=FILE",
+    )
     subparsers = parser.add_subparsers(dest="command", required=True)
 
     # ADD
@@ -158,11 +539,15 @@ def build_parser():
     add.add_argument("--title", required=True)
     add.add_argument("--date", required=True)
     add.add_argument("--description")
+    add.add_argument("--repeat", choices=[f.value for f in Frequency], help="Repeat the task from --date on")
+    add.add_argument("--every", type=int, default=1, help="With --repeat: every N days/weeks/months (default: 1)")
+    add.add_argument("--until", help="With --repeat: last day YYYY-MM-DD")
+    add.add_argument("--source", help="Task source to add to, with several configured (default: the first)")
     add.set_defaults(func=handle_add)
 
     # EDIT
     edit = subparsers.add_parser("edit")
-    edit.add_argument("id", type=int)
+    edit.add_argument("id", type=parse_task_id)
     edit.add_argument("--title")
     edit.add_argument("--date")
     edit.add_argument("--description")
@@ -170,41 +555,196 @@ def build_parser():
 
     # DELETE
     delete = subparsers.add_parser("delete")
-    delete.add_argument("id", type=int)
+    delete.add_argument("id", type=parse_task_id)
+    delete.add_argument("--on", help="Only this occurrence of a recurring task (YYYY-MM-DD)")
     delete.set_defaults(func=handle_delete)
 
     # DONE
     done = subparsers.add_parser("done")
-    done.add_argument("id", type=int)
+    done.add_argument("id", type=parse_task_id)
+    done.add_argument("--on", help="Only this occurrence of a recurring task (YYYY-MM-DD)")
     done.set_defaults(func=handle_done)
 
     # CANCEL
     cancel = subparsers.add_parser("cancel")
-    cancel.add_argument("id", type=int)
+    cancel.add_argument("id", type=parse_task_id)
+    cancel.add_argument("--on", help="Only this occurrence of a recurring task (YYYY-MM-DD)")
     cancel.set_defaults(func=handle_cancel)
 
     # LIST
     list_cmd = subparsers.add_parser("list")
+    list_cmd.add_argument("--status", choices=[s.value for s in Status], help="Only tasks with this status")
+    list_cmd.add_argument("--from", dest="start", help="First day YYYY-MM-DD")
+    list_cmd.add_argument("--to", dest="end", help="Last day YYYY-MM-DD")
+    list_cmd.add_argument("--limit", type=parse_count, help="Show at most this many tasks")
+    list_cmd.add_argument("--offset", type=parse_count, default=0, help="Skip this many tasks first")
+    list_cmd.add_argument("--after", help="Continue after this cursor (YYYY-MM-DD:ID, printed when --limit cuts the list)")
+    list_cmd.add_argument("--archived", action="store_true", help="Also list archived tasks outside --from/--to (reads the whole archive)")
     list_cmd.set_defaults(func=handle_list)
 
+    # SEARCH
+    search = subparsers.add_parser("search", help="Find tasks by words in the title or description")
+    search.add_argument("query", nargs="+", help="Words to look for; each also matches as a prefix")
+    search.add_argument("--limit", type=parse_count, default=20, help="Show at most this many tasks (default: 20)")
+    search.set_defaults(func=handle_search)
+
     # WEEK
     week = subparsers.add_parser("week")
     week.add_argument("shift", nargs="?", type=int, default=0, help="Shift weeks relative to reference date (e.g., -1, +2)")
     week.add_argument("--date", help="Reference date YYYY-MM-DD")
+    week.add_argument("--watch", action="store_true", help="Stay open and redraw when the tasks change")
     week.set_defaults(func=handle_week)
 
     # MONTH
     month = subparsers.add_parser("month")
     month.add_argument("shift", nargs="?", type=int, default=0, help="Shift months relative to reference date (e.g., -1, +2)")
     month.add_argument("--date", help="Reference date YYYY-MM-DD")
+    month.add_argument("--watch", action="store_true", help="Stay open and redraw when the tasks change")
     month.set_defaults(func=handle_month)
 
+    # YEAR
+    year = subparsers.add_parser("year", help="Task heatmap for a whole year")
+    year.add_argument("shift", nargs="?", type=int, default=0, help="Shift years relative to reference date (e.g., -1, +2)")
+    year.add_argument("--date", help="Reference date YYYY-MM-DD")
+    year.set_defaults(func=handle_year)
+
+    # RANGE
+    range_cmd = subparsers.add_parser("range", help="Task heatmap for an arbitrary span of days")
+    range_cmd.add_argument("--from", dest="start", required=True, help="First day YYYY-MM-DD")
+    range_cmd.add_argument("--to", dest="end", required=True, help="Last day YYYY-MM-DD")
+    range_cmd.set_defaults(func=handle_range)
+
+    # IMPORT
+    import_cmd = subparsers.add_parser("import", help="Create tasks in bulk from CSV, iCalendar or JSON-lines files")
+    import_cmd.add_argument("files", nargs="+", help="Files to import (.csv, .ics, .jsonl)")
+    import_cmd.add_argument("--format", choices=["csv", "ics", "jsonl"], help="Input format (default: from the file suffix)")
+    import_cmd.add_argument("--workers", type=int, help="Parser processes (default: one per CPU)")
+    import_cmd.add_argument("--chunk-rows", type=int, default=5000, help="Rows per parser work unit (default: 5000)")
+    import_cmd.add_argument("--source", help="Task source to import into, with several configured (default: the first)")
+    import_cmd.add_argument("--keep-duplicates", action="store_true",
+                            help="Also import rows whose title and date match an existing task")
+    import_cmd.set_defaults(func=handle_import)
+
+    # ARCHIVE
+    archive = subparsers.add_parser("archive", help="Move old done/canceled tasks into compressed monthly archives")
+    archive.add_argument("--older-than", type=int, metavar="DAYS",
+                         help=f"Tasks dated more than DAYS ago (default: archive_after_days, or {DEFAULT_ARCHIVE_DAYS})")
+    archive.add_argument("--before", help="Tasks dated before this day YYYY-MM-DD")
+    archive.set_defaults(func=handle_archive)
+
+    # CONVERT
+    convert = subparsers.add_parser("convert")
+    convert.add_argument("format", choices=["binary", "json", "sharded"], help="Format to convert the task file to")
+    convert.add_argument("--granularity", choices=["week", "month", "year"],
+                         help="With sharded: one shard per week, month or year (default: shard_granularity)")
+    convert.set_defaults(func=handle_convert)
+
+    # BATCH
+    batch = subparsers.add_parser("batch", help="Apply many operations in one load/save cycle")
+    batch.add_argument("file", nargs="?", default="-", help="Operations file, one per line (default: stdin)")
+    batch.add_argument("--json", action="store_true", help="Report results as JSON lines")
+    batch.set_defaults(func=handle_batch)
+
+    # UNDO / REDO / HISTORY
+    undo = subparsers.add_parser("undo", help="Take back the last command that changed tasks")
+    undo.add_argument("--source", help="Task source, with several configured (default: the first)")
+    undo.set_defaults(func=handle_undo)
+
+    redo = subparsers.add_parser("redo", help="Apply an undone command again")
+    redo.add_argument("--source", help="Task source, with several configured (default: the first)")
+    redo.set_defaults(func=handle_redo)
+
+    history = subparsers.add_parser("history", help="Commands that can be undone, oldest first")
+    history.add_argument("--limit", type=int, help="Show only the last N")
+    history.add_argument("--source", help="Task source, with several configured (default: the first)")
+    history.set_defaults(func=handle_history)
+
+    # DAEMON
+    daemon = subparsers.add_parser("daemon", help="Keep tasks loaded and serve commands over a local socket")
+    daemon.add_argument("--stop", action="store_true", help="Stop the running daemon")
+    daemon.set_defaults(func=handle_daemon)
+
     return parser
 
+@cache
+def _cached_parser() -> argparse.ArgumentParser:
+    # Batch and daemon runs parse many command lines in one process
+    return build_parser()
+
+def run(argv: list[str]) -> None:
+    from todo import history
+
+    with trace.span("parse args"):
+        args = _cached_parser().parse_args(argv)
+    try:
+        # Whatever the command changes is one entry for `todo undo`
+        with trace.span(args.command), history.command(" ".join(argv)):
+            args.func(args)
+    except TaskFileError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+
+def run_captured(argv: list[str]) -> dict:
+    out, err = io.StringIO(), io.StringIO()
+    code = 0
+    with redirect_stdout(out), redirect_stderr(err):
+        try:
+            run(argv)
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except Exception as e:
+            print(f"{type(e).__name__}: {e}", file=sys.stderr)
+            code = 1
+    return {"exit": code, "stdout": out.getvalue(), "stderr": err.getvalue()}
+
+# Commands that must run in this process: they read stdin or local files, or
+# manage the daemon
+LOCAL_COMMANDS = {"daemon", "batch", "import"}
+
+def pop_trace(argv: list[str]) -> Optional[str]:
+    # --trace[=FILE] goes with the whole command line, so it's accepted in
+    # any position, which argparse only allows before the command. Removed
+    # from argv; returns FILE, "-" for stderr, or None if not given.
+    for i, arg in enumerate(argv):
+        if arg == "--":
+            break
+        if arg == "--trace" or arg.startswith("--trace="):
+            del argv[i]
+            return arg.partition("=")[2] or "-"
+    return None
+
 def main():
-    parser = build_parser()
-    args = parser.parse_args()
-    args.func(args)
+    global _config
+    _config = None
+    argv = sys.argv[1:]
+    if argv[:1] == ["--profile-startup"]:
+        from todo.startup import profile_startup
+
+        sys.exit(profile_startup(argv[1:]))
+    trace_to = pop_trace(argv) or os.getenv("TODO_TRACE", "0")
+    if trace_to != "0":
+        # Traced commands run here rather than in the daemon, so the
+        # numbers describe this process
+        trace.enable()
+        try:
+            run(argv)
+        finally:
+            trace.disable()
+            trace.emit(trace_to, " ".join(["todo", *argv]))
+        return
+    # A watched view stays resident itself
+    if argv[:1] and argv[0] not in LOCAL_COMMANDS and "--watch" not in argv and not os.getenv("TODO_NO_DAEMON"):
+        config = get_config()
+        # Only pay for the socket machinery when a daemon may be listening
+        if config.daemon_socket.exists():
+            from todo.daemon import forward
+
+            code = forward(config, argv)
+            if code is not None:
+                if code:
+                    sys.exit(code)
+                return
+    run(argv)
 
 
 
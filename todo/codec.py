@@ -0,0 +1,147 @@
+from collections.abc import Iterable
+from datetime import date, datetime
+import json
+
+from todo.models import Recurrence, Status, Task
+
+# Task file layout, format 2: compact JSON, one positional array per task
+#
+#   {"format":2,"last_id":N,"tasks":[[id,title,description,created_at,task_date,status],...]}
+#
+# status is a code (an index into STATUSES) and a series carries its rule
+# as a seventh element. Files without "format" hold one dict per task (see
+# Task.to_dict); they still load, and are written in this format on the
+# next save.
+FORMAT = 2
+ID, TITLE, DESCRIPTION, CREATED_AT, TASK_DATE, STATUS, RECURRENCE = range(7)
+
+# Status codes, shared with the binary snapshot (todo.binary)
+STATUSES = list(Status)
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+STATUS_CODES_BY_VALUE = {status.value: code for code, status in enumerate(STATUSES)}
+
+_encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+
+def check_format(version: int) -> None:
+    if version > FORMAT:
+        raise ValueError(f"format {version} is newer than this version of todo reads")
+
+
+# ENCODING
+
+def encode_task(task: Task) -> list:
+    row = [
+        task.id,
+        task.title,
+        task.description,
+        task.created_at.isoformat(),
+        task.task_date.isoformat(),
+        STATUS_CODES[task.status],
+    ]
+    if task.recurrence is not None:
+        row.append(task.recurrence.to_dict())
+    return row
+
+
+def encode_tasks(tasks: Iterable[Task]) -> list[list]:
+    # Task dates repeat heavily, so each is formatted once
+    days: dict[date, str] = {}
+    codes = STATUS_CODES
+    rows = []
+    append = rows.append
+    for t in tasks:
+        day = days.get(t.task_date)
+        if day is None:
+            day = days[t.task_date] = t.task_date.isoformat()
+        row = [t.id, t.title, t.description, t.created_at.isoformat(), day, codes[t.status]]
+        if t.recurrence is not None:
+            row.append(t.recurrence.to_dict())
+        append(row)
+    return rows
+
+
+def dumps(last_id: int, rows: list[list]) -> str:
+    return _encode({"format": FORMAT, "last_id": last_id, "tasks": rows})
+
+
+def encode_rows(rows: list[list]) -> str:
+    # Comma-separated, without the brackets, for writers streaming a file
+    return _encode(rows)[1:-1]
+
+
+# DECODING
+
+def decode_task(row: list) -> Task:
+    return Task(
+        row[ID],
+        row[TITLE],
+        datetime.fromisoformat(row[CREATED_AT]),
+        date.fromisoformat(row[TASK_DATE]),
+        STATUSES[row[STATUS]],
+        row[DESCRIPTION],
+        Recurrence.from_dict(row[RECURRENCE]) if len(row) > RECURRENCE else None,
+    )
+
+
+def decode_tasks(rows: Iterable[list]) -> list[Task]:
+    # Dates are parsed once each; creation times only when they differ from
+    # the previous task's, as they do not after a bulk import
+    days: dict[str, date] = {}
+    statuses = STATUSES
+    created_text = created = None
+    tasks = []
+    append = tasks.append
+    for r in rows:
+        day = days.get(r[TASK_DATE])
+        if day is None:
+            day = days[r[TASK_DATE]] = date.fromisoformat(r[TASK_DATE])
+        if r[CREATED_AT] != created_text:
+            created_text = r[CREATED_AT]
+            created = datetime.fromisoformat(created_text)
+        append(Task(r[ID], r[TITLE], created, day, statuses[r[STATUS]], r[DESCRIPTION],
+                    Recurrence.from_dict(r[RECURRENCE]) if len(r) > RECURRENCE else None))
+    return tasks
+
+
+def loads(data) -> tuple[int, list[Task]]:
+    # Parsed JSON of a task file in any layout -> (last_id, tasks)
+    if isinstance(data, list):
+        # Older files are a bare list of tasks without the header
+        return 0, [Task.from_dict(r) for r in data]
+    check_format(data.get("format", 1))
+    if "format" in data:
+        tasks = decode_tasks(data["tasks"])
+    else:
+        tasks = [Task.from_dict(r) for r in data["tasks"]]
+    return data.get("last_id", 0), tasks
+
+
+# Format 1 records, for readers of either layout
+
+def row_from_dict(record: dict) -> list:
+    row = [
+        record["id"],
+        record["title"],
+        record.get("description"),
+        record["created_at"],
+        record["task_date"],
+        STATUS_CODES_BY_VALUE[record.get("status", "active")],
+    ]
+    if record.get("recurrence"):
+        row.append(record["recurrence"])
+    return row
+
+
+def row_to_dict(row: list) -> dict:
+    record = {
+        "id": row[ID],
+        "title": row[TITLE],
+        "description": row[DESCRIPTION],
+        "created_at": row[CREATED_AT],
+        "task_date": row[TASK_DATE],
+        "status": STATUSES[row[STATUS]].value,
+    }
+    if len(row) > RECURRENCE:
+        record["recurrence"] = row[RECURRENCE]
+    return record
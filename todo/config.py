@@ -1,10 +1,10 @@
 from pathlib import Path
-import toml
 import os
 
+# No filesystem work at import time: the directory is created by whoever
+# first writes into it (TaskStorage, Config.save).
 PROJECT_ROOT = Path(__file__).parent.parent.resolve()
 TODO_DIR = PROJECT_ROOT / ".todo"
-TODO_DIR.mkdir(parents=True, exist_ok=True)
 
 DEFAULT_CONFIG_PATH = TODO_DIR / "config.toml"
 DEFAULT_TASK_FILE = TODO_DIR / "tasks.json"
@@ -15,6 +15,19 @@ class Config:
 
         self.color_enabled: bool = True
         self.task_file: Path = DEFAULT_TASK_FILE
+        self.storage: str = "json"
+        self.journal_compact_bytes: int = 1024 * 1024
+        self.lazy_load: bool = True
+        self.fsync: bool = True
+        # Archive done/canceled tasks older than this many days; 0 = never
+        self.archive_after_days: int = 0
+        # storage = "sharded": one task file per week, month or year
+        self.shard_granularity: str = "month"
+        # Commands that `todo undo` can take back; 0 = keep no history
+        self.history_limit: int = 100
+        # Several task files shown as one (todo.multi): name -> task file.
+        # When set, these are used instead of task_file.
+        self.sources: dict[str, Path] = {}
         
         self._load_from_file()
 
@@ -26,6 +39,8 @@ class Config:
     def _load_from_file(self) -> None:
         if not self.path.exists():
             return
+        import toml
+
         data = toml.loads(self.path.read_text())
 
         self.color_enabled = data.get("color_enabled", self.color_enabled)
@@ -34,17 +49,55 @@ class Config:
         if task_file_str:
             self.task_file = Path(task_file_str)
 
+        self.storage = data.get("storage", self.storage)
+        self.journal_compact_bytes = data.get("journal_compact_bytes", self.journal_compact_bytes)
+        self.lazy_load = data.get("lazy_load", self.lazy_load)
+        self.fsync = data.get("fsync", self.fsync)
+        self.archive_after_days = data.get("archive_after_days", self.archive_after_days)
+        self.shard_granularity = data.get("shard_granularity", self.shard_granularity)
+        self.history_limit = data.get("history_limit", self.history_limit)
+        self.sources = {name: Path(path) for name, path in data.get("sources", {}).items()}
+
     def _apply_env_overrides(self) -> None:
         env_task_file = os.getenv("TODO_TASK_FILE")
         if env_task_file:
+            # A single file asked for explicitly
             self.task_file = Path(env_task_file)
+            self.sources = {}
+
+        env_storage = os.getenv("TODO_STORAGE")
+        if env_storage:
+            self.storage = env_storage
+
+    @property
+    def daemon_socket(self) -> Path:
+        return self.task_file.with_name(self.task_file.name + ".sock")
+
+    @property
+    def archive_dir(self) -> Path:
+        return self.task_file.with_name(self.task_file.name + ".archive")
+
+    @property
+    def history_file(self) -> Path:
+        return self.task_file.with_name(self.task_file.name + ".history")
 
     def save(self) -> None:
+        import toml
+
         self.path.parent.mkdir(parents=True, exist_ok=True)
         
         data = {
             "color_enabled": self.color_enabled,
-            "task_file": str(self.task_file)
+            "task_file": str(self.task_file),
+            "storage": self.storage,
+            "journal_compact_bytes": self.journal_compact_bytes,
+            "lazy_load": self.lazy_load,
+            "fsync": self.fsync,
+            "archive_after_days": self.archive_after_days,
+            "shard_granularity": self.shard_granularity,
+            "history_limit": self.history_limit,
         }
+        if self.sources:
+            data["sources"] = {name: str(path) for name, path in self.sources.items()}
 
         self.path.write_text(toml.dumps(data))
\ No newline at end of file
@@ -0,0 +1,130 @@
+from pathlib import Path
+from typing import Optional
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+
+from todo.config import Config
+
+STOP = "__stop__"
+CLIENT_TIMEOUT = 5.0  # seconds a client may take to send its request or read the reply
+
+
+class DaemonRunning(RuntimeError):
+    pass
+
+
+def socket_path(config: Config) -> Path:
+    return config.daemon_socket
+
+
+def _recv_all(conn: socket.socket) -> bytes:
+    chunks = []
+    while chunk := conn.recv(65536):
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def request(path: Path, argv: list[str]) -> dict:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.connect(str(path))
+        conn.sendall(json.dumps({"argv": argv}).encode("utf-8"))
+        conn.shutdown(socket.SHUT_WR)
+        return json.loads(_recv_all(conn))
+
+
+def forward(config: Config, argv: list[str]) -> Optional[int]:
+    # Runs the command in a running daemon and returns its exit code, or
+    # None when there is no daemon to talk to.
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    path = socket_path(config)
+    if not path.exists():
+        return None
+    try:
+        response = request(path, argv)
+    except (ConnectionRefusedError, FileNotFoundError):
+        # Stale socket left by a daemon that died
+        return None
+    sys.stdout.write(response["stdout"])
+    sys.stderr.write(response["stderr"])
+    return response["exit"]
+
+
+def running(config: Config, path: Optional[Path] = None) -> bool:
+    # A daemon listening on the socket, rather than a socket file left behind
+    path = path or socket_path(config)
+    if not path.exists():
+        return False
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(str(path))
+        except (ConnectionRefusedError, FileNotFoundError):
+            return False
+    return True
+
+
+def _handle(conn: socket.socket, storage) -> bool:
+    # One client; False once asked to stop. A client that stalls, hangs up
+    # or sends garbage is dropped, so it can't hold up the ones behind it.
+    from todo import cli
+
+    conn.settimeout(CLIENT_TIMEOUT)
+    try:
+        argv = json.loads(_recv_all(conn))["argv"]
+        if argv == [STOP]:
+            conn.sendall(json.dumps({"exit": 0, "stdout": "", "stderr": ""}).encode("utf-8"))
+            return False
+        # Other processes may still write the task file directly
+        storage.refresh()
+        conn.sendall(json.dumps(cli.run_captured(argv)).encode("utf-8"))
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return True
+
+
+def serve(config: Config, path: Optional[Path] = None) -> None:
+    from todo import cli
+    from todo.storage import open_storage
+
+    path = path or socket_path(config)
+    if running(config, path):
+        raise DaemonRunning(f"A daemon is already listening on {path}")
+    # The daemon keeps every task resident, so stream-on-demand buys nothing
+    config.lazy_load = False
+    storage = open_storage(config)
+    cli.set_resident(storage, config)
+
+    # Bind under a temporary name and rename once listening, so clients never
+    # find a socket that refuses connections.
+    pending = path.with_name(path.name + ".tmp")
+    pending.unlink(missing_ok=True)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(str(pending))
+    server.listen()
+    os.replace(pending, path)
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        while True:
+            conn, _ = server.accept()
+            with conn:
+                if not _handle(conn, storage):
+                    break
+    finally:
+        server.close()
+        path.unlink(missing_ok=True)
+        cli.set_resident(None, None)
+        if hasattr(storage, "close"):
+            storage.close()
+
+
+def stop(config: Config, path: Optional[Path] = None) -> bool:
+    try:
+        request(path or socket_path(config), [STOP])
+    except (ConnectionRefusedError, FileNotFoundError):
+        return False
+    return True
@@ -0,0 +1,83 @@
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from itertools import count
+from pathlib import Path
+from typing import IO
+import os
+
+from todo import trace
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; locking becomes a no-op
+    fcntl = None
+
+
+def fsync_dir(path: Path) -> None:
+    if os.name == "nt":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+_temp_counter = count()
+
+
+def temp_file(path: Path) -> tuple[int, Path]:
+    # Like tempfile.mkstemp next to `path`, without importing tempfile
+    # (and random, shutil, ...) on the CLI's startup path.
+    while True:
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{next(_temp_counter)}.tmp")
+        try:
+            return os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644), tmp
+        except FileExistsError:
+            continue
+
+
+def atomic_write(path: Path, write: Callable[[IO], None], binary: bool = False, durable: bool = True) -> None:
+    # Write into a temp file in the same directory and rename it over `path`,
+    # so readers see either the old or the new file, never a partial one.
+    path = Path(path)
+    fd, tmp = temp_file(path)
+    try:
+        with os.fdopen(fd, "wb" if binary else "w", **({} if binary else {"encoding": "utf-8"})) as f:
+            with trace.span("write"):
+                write(f)
+                f.flush()
+            if trace.enabled:
+                trace.count("bytes_written", os.fstat(f.fileno()).st_size)
+            if durable:
+                with trace.span("fsync"):
+                    os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+    if durable:
+        fsync_dir(path.parent)
+
+
+def file_signature(path: Path) -> tuple[int, int, int] | None:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+@contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    # Advisory lock on a sidecar file; the data file itself gets replaced on
+    # every save, so it can't carry the lock.
+    if fcntl is None:
+        yield
+        return
+    with open(path, "a") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
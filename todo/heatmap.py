@@ -0,0 +1,67 @@
+from array import array
+from collections.abc import Sequence
+from datetime import date
+from itertools import zip_longest
+
+from todo.month import HEAT_LEVELS, month_lines, heat_levels as _heat_levels
+
+try:
+    import numpy as np
+except ImportError:  # optional; the array-based path gives the same result
+    np = None
+
+MONTH_WIDTH = 27  # 7 cells of 3 characters, 6 separators
+MONTHS_PER_ROW = 3
+
+
+def day_counts(ordinals: Sequence[int], start: date, end: date) -> Sequence[int]:
+    # Tasks per day for start..end in one pass over the task dates, in a flat
+    # array indexed by (ordinal - start ordinal). Ordinals outside the span
+    # must already be filtered out (see TaskStorage.date_ordinals).
+    base = start.toordinal()
+    span = end.toordinal() - base + 1
+    if np is not None:
+        return np.bincount(np.asarray(ordinals, dtype=np.int64) - base, minlength=span)
+    counts = array("I", bytes(4 * span))
+    for ordinal in ordinals:
+        counts[ordinal - base] += 1
+    return counts
+
+
+def heat_levels(counts: Sequence[int]) -> bytes:
+    if np is not None and isinstance(counts, np.ndarray):
+        return np.minimum(counts, 255).astype(np.uint8).tobytes().translate(HEAT_LEVELS)
+    return _heat_levels(counts)
+
+
+def _months(start: date, end: date) -> list[tuple[int, int]]:
+    months = []
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def render_heatmap(counts: Sequence[int], start: date, end: date, color_enabled: bool = True) -> str:
+    levels = heat_levels(counts)
+    base = start.toordinal()
+    blocks = []
+    for year, month in _months(start, end):
+        first = date(year, month, 1).toordinal()
+        last = date(year + month // 12, month % 12 + 1, 1).toordinal() - 1
+        # Days of the month outside the span are shown uncounted
+        lo, hi = max(first, base), min(last, end.toordinal())
+        month_levels = bytes(lo - first) + levels[lo - base:hi - base + 1] + bytes(last - hi)
+        blocks.append(month_lines(year, month, month_levels, color_enabled))
+
+    total = int(sum(counts))
+    lines = [f"{start:%Y-%m-%d} -> {end:%Y-%m-%d}: {total} task{'s' if total != 1 else ''}"]
+    for i in range(0, len(blocks), MONTHS_PER_ROW):
+        lines.append("")
+        # Only the month titles need padding: every other line of a month is
+        # exactly MONTH_WIDTH visible characters, escapes aside.
+        row = [[block[0].ljust(MONTH_WIDTH)] + block[1:] for block in blocks[i:i + MONTHS_PER_ROW]]
+        for parts in zip_longest(*row, fillvalue=" " * MONTH_WIDTH):
+            lines.append("  ".join(parts).rstrip())
+    return "\n".join(lines)
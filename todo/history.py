@@ -0,0 +1,363 @@
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager, nullcontext
+from datetime import date, datetime
+from pathlib import Path
+from typing import Optional
+import json
+import os
+
+from todo.fileio import atomic_write, file_lock
+from todo.models import Recurrence, Status, Task
+
+HISTORY_LIMIT = 100  # commands that can be undone
+COMPACT_BYTES = 256 * 1024  # past this size the log is cut back to HISTORY_LIMIT
+
+# What update_task can set
+UPDATABLE = {"title", "task_date", "description", "status", "recurrence"}
+
+_encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+# A change to one task: [id, before, after], where before and after hold
+# only the fields (as in Task.to_dict) that the change touched. None stands
+# for no task: before of an add, after of a delete; the other side then
+# holds the whole task.
+Change = list
+
+
+def _delta(before: Optional[dict], after: Optional[dict]) -> tuple[Optional[dict], Optional[dict]]:
+    if before is None or after is None:
+        return before, after
+    fields = sorted(k for k in before.keys() | after.keys() if before.get(k) != after.get(k))
+    return {k: before.get(k) for k in fields}, {k: after.get(k) for k in fields}
+
+
+def _combine(first: tuple, second: tuple) -> tuple:
+    # Two changes to the same task in one command, as one
+    (before, after), (later_before, later_after) = first, second
+    if before is not None:
+        before = {**(later_before or {}), **before}
+    if later_after is not None:
+        later_after = {**(after or {}), **later_after}
+    return before, later_after
+
+
+# The log: JSON lines, appended to. A "do" line records the changes of one
+# command (null for one that can't be undone, see RecordedStorage.barrier);
+# "undo" and "redo" lines move the newest of them between the undone and
+# done stacks, so reading the log back replays the stacks.
+#
+#   {"op":"do","at":"2026-03-02T09:15:00","command":"done 3","changes":[[3,{"status":"active"},{"status":"done"}]]}
+#   {"op":"undo"}
+class History:
+    def __init__(self, path: Path, limit: int = HISTORY_LIMIT, durable: bool = True) -> None:
+        self.path = Path(path)
+        self.lock_file = self.path.with_name(self.path.name + ".lock")
+        self.limit = limit
+        self.durable = durable
+
+    def _read(self) -> Iterator[dict]:
+        if not self.path.exists():
+            return
+        with self.path.open("r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn final write
+                    return
+
+    def stacks(self) -> tuple[list[dict], list[dict]]:
+        # (done, undone) entries; the next undo is done[-1], the next redo
+        # undone[-1]
+        done: list[dict] = []
+        undone: list[dict] = []
+        for record in self._read():
+            op = record.get("op")
+            if op == "do":
+                done.append(record)
+                # A new change makes the undone ones unreachable
+                undone.clear()
+            elif op == "undo" and done:
+                undone.append(done.pop())
+            elif op == "redo" and undone:
+                done.append(undone.pop())
+        return done[-self.limit:], undone
+
+    def append(self, records: list[dict]) -> None:
+        with file_lock(self.lock_file):
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write("".join(_encode(r) + "\n" for r in records))
+                f.flush()
+                if self.durable:
+                    os.fsync(f.fileno())
+                size = f.tell()
+            if size >= COMPACT_BYTES:
+                self.compact()
+
+    def compact(self) -> None:
+        # Rewrites the log with just what stacks() returns: the undone
+        # entries as done ones followed by as many undo lines
+        done, undone = self.stacks()
+        records = done + undone[::-1] + [{"op": "undo"}] * len(undone)
+
+        def write(f) -> None:
+            f.write("".join(_encode(r) + "\n" for r in records))
+
+        atomic_write(self.path, write, durable=self.durable)
+
+
+# COMMANDS
+#
+# The CLI runs each command inside command(), so that all of its changes
+# (to any number of tasks) become one entry, labelled with the command line.
+# Outside of one, every call is an entry of its own.
+
+_command: Optional[str] = None
+_pending: list["RecordedStorage"] = []  # storages with changes of the current command
+
+
+@contextmanager
+def command(label: str) -> Iterator[None]:
+    global _command
+    outer, _command = _command, label
+    try:
+        yield
+    finally:
+        _command = outer
+        while _pending:
+            _pending.pop().flush(label)
+
+
+class HistoryConflict(ValueError):
+    pass
+
+
+def describe(changes: Optional[list[Change]]) -> str:
+    if changes is None:
+        return "can't be undone"
+    parts = []
+    for task_id, before, after in changes:
+        if before is None:
+            parts.append(f"added {task_id}")
+        elif after is None:
+            parts.append(f"deleted {task_id}")
+        else:
+            parts.append(f"{task_id}: {', '.join(after)}")
+    return "; ".join(parts)
+
+
+# Wraps a storage backend so that add/update/delete_task, update_occurrence
+# and the bulk insert/delete_tasks log their changes to a History, and
+# undo()/redo() put them back. Undoing costs what the change did: only the
+# tasks in the entry are checked and written, through the backend's own
+# single-task writes.
+class RecordedStorage:
+    def __init__(self, storage, history: History) -> None:
+        self.storage = storage
+        self.history = history
+        self._changes: dict[int, tuple] = {}
+        self._unwritten: list[dict] = []
+        self._depth = 0
+
+    def __getattr__(self, name: str):
+        return getattr(self.storage, name)
+
+    @contextmanager
+    def transaction(self) -> Iterator["RecordedStorage"]:
+        # The log is written once, after the transaction's own commit
+        self._depth += 1
+        try:
+            with self.storage.transaction():
+                yield self
+        finally:
+            self._depth -= 1
+            if not self._depth and self._unwritten:
+                records, self._unwritten = self._unwritten, []
+                self.history.append(records)
+
+    # RECORDING
+
+    def _snapshot(self, task_id: int) -> Optional[dict]:
+        # Before the call: backends change their stored Task in place
+        task = self.storage.get_task(task_id)
+        return task.to_dict() if task is not None else None
+
+    def _record(self, task_id: int, before: Optional[dict], after: Optional[dict]) -> None:
+        before, after = _delta(before, after)
+        if before == after:
+            return
+        if task_id in self._changes:
+            before, after = _combine(self._changes[task_id], (before, after))
+            if before is None and after is None:
+                del self._changes[task_id]
+                return
+        self._changes[task_id] = (before, after)
+
+    def _recorded(self, label: str) -> None:
+        if _command is None:
+            self.flush(label)
+        elif self not in _pending:
+            _pending.append(self)
+
+    def flush(self, label: str) -> None:
+        if not self._changes:
+            return
+        record = {
+            "op": "do",
+            "at": datetime.now().isoformat(timespec="seconds"),
+            "command": label,
+            "changes": [[task_id, before, after] for task_id, (before, after) in self._changes.items()],
+        }
+        self._changes = {}
+        self._write(record)
+
+    def _write(self, record: dict) -> None:
+        self._unwritten.append(record)
+        if not self._depth:
+            records, self._unwritten = self._unwritten, []
+            self.history.append(records)
+
+    def add_task(
+        self,
+        title: str,
+        task_date: date,
+        description: Optional[str] = None,
+        recurrence: Optional[Recurrence] = None
+    ) -> Task:
+        task = self.storage.add_task(title, task_date, description, recurrence)
+        self._record(task.id, None, task.to_dict())
+        self._recorded(f"add {task.id}")
+        return task
+
+    def update_task(
+        self,
+        task_id: int,
+        title: Optional[str] = None,
+        task_date: Optional[date] = None,
+        description: Optional[str] = None,
+        status: Optional[Status] = None,
+        recurrence: Optional[Recurrence] = None
+    ) -> Optional[Task]:
+        before = self._snapshot(task_id)
+        task = self.storage.update_task(task_id, title, task_date, description, status, recurrence)
+        if task is not None:
+            self._record(task_id, before, task.to_dict())
+            self._recorded(f"update {task_id}")
+        return task
+
+    def update_occurrence(
+        self,
+        task_id: int,
+        day: date,
+        status: Optional[Status] = None,
+        skip: bool = False
+    ) -> Optional[Task]:
+        before = self._snapshot(task_id)
+        task = self.storage.update_occurrence(task_id, day, status, skip)
+        if task is not None:
+            self._record(task_id, before, task.to_dict())
+            self._recorded(f"update {task_id} on {day.isoformat()}")
+        return task
+
+    def delete_task(self, task_id: int) -> bool:
+        before = self._snapshot(task_id)
+        deleted = self.storage.delete_task(task_id)
+        if deleted:
+            self._record(task_id, before, None)
+            self._recorded(f"delete {task_id}")
+        return deleted
+
+    # Bulk writes (todo import, archive runs): one entry for all of the tasks
+
+    def _bulk(self):
+        # Snapshots and write in one transaction (one load, one write), unless
+        # the caller already holds one
+        return self.transaction() if not self._depth else nullcontext()
+
+    def insert_tasks(self, tasks: Iterable[Task]) -> int:
+        tasks = list(tasks)
+        with self._bulk():
+            before = {t.id: self._snapshot(t.id) for t in tasks}
+            count = self.storage.insert_tasks(tasks)
+            for task in tasks:
+                self._record(task.id, before[task.id], task.to_dict())
+            self._recorded(f"insert {count} tasks")
+        return count
+
+    def delete_tasks(self, task_ids: Iterable[int]) -> int:
+        with self._bulk():
+            before = {i: b for i in task_ids if (b := self._snapshot(i)) is not None}
+            count = self.storage.delete_tasks(list(before))
+            for task_id, image in before.items():
+                self._record(task_id, image, None)
+            self._recorded(f"delete {count} tasks")
+        return count
+
+    def barrier(self, label: str) -> None:
+        # A change undo can't take back (archiving: the archive keeps its
+        # copies), so it must not step past it either. Replaces whatever
+        # the current command recorded so far.
+        self._changes = {}
+        if self in _pending:
+            _pending.remove(self)
+        self._write({"op": "do", "at": datetime.now().isoformat(timespec="seconds"), "command": label, "changes": None})
+
+    # UNDO / REDO
+
+    def _restore(self, changes: list[tuple[int, Optional[dict], Optional[dict]]]) -> None:
+        # changes: (id, what the task must look like now, what to make it).
+        # All are checked before any is written, so a conflict changes nothing.
+        current = {}
+        for task_id, expected, _ in changes:
+            task = self.storage.get_task(task_id)
+            now = task.to_dict() if task is not None else None
+            if expected is None:
+                ok = now is None
+            else:
+                ok = now is not None and all(now.get(k) == v for k, v in expected.items())
+            if not ok:
+                raise HistoryConflict(f"task {task_id} has changed since")
+            current[task_id] = now
+        deleted, inserted = [], []
+        for task_id, _, image in changes:
+            if image is None:
+                deleted.append(task_id)
+                continue
+            task = Task.from_dict({**(current[task_id] or {}), **image})
+            if current[task_id] is not None and image.keys() <= UPDATABLE and None not in image.values():
+                self.storage.update_task(task_id, **{k: getattr(task, k) for k in image})
+            else:
+                # A deleted task, or a field going back to None, which
+                # update_task can't express: replace the task by id
+                inserted.append(task)
+        # One write each, however many tasks (an undone import)
+        if len(deleted) == 1:
+            self.storage.delete_task(deleted[0])
+        elif deleted:
+            self.storage.delete_tasks(deleted)
+        if inserted:
+            self.storage.insert_tasks(inserted)
+
+    def _step(self, op: str) -> Optional[dict]:
+        # Under the backend's lock, without the full load a transaction may
+        # need (LazyTaskStorage)
+        with self.storage.locked():
+            done, undone = self.history.stacks()
+            stack = done if op == "undo" else undone
+            if not stack:
+                return None
+            entry = stack[-1]
+            if entry["changes"] is None:
+                raise HistoryConflict(f"`{entry['command']}` can't be undone")
+            if op == "undo":
+                self._restore([(i, after, before) for i, before, after in reversed(entry["changes"])])
+            else:
+                self._restore([(i, before, after) for i, before, after in entry["changes"]])
+        self.history.append([{"op": op}])
+        return entry
+
+    def undo(self) -> Optional[dict]:
+        return self._step("undo")
+
+    def redo(self) -> Optional[dict]:
+        return self._step("redo")
@@ -0,0 +1,287 @@
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from pathlib import Path
+from time import perf_counter
+from typing import Optional
+import json
+import os
+
+from todo import trace
+from todo.models import Status, Task
+
+CHUNK_ROWS = 5000
+PARALLEL_MIN_BYTES = 1024 * 1024  # smaller inputs aren't worth starting workers for
+MAX_ERRORS = 20  # invalid rows reported in detail; the rest are only counted
+
+FORMATS = {".csv": "csv", ".ics": "ics", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+
+# Column names accepted in CSV headers and JSON-lines keys
+FIELDS = {
+    "title": ("title", "summary", "name"),
+    "date": ("date", "task_date", "due", "start"),
+    "description": ("description", "notes"),
+    "status": ("status", "state"),
+}
+
+# Other trackers' words for our statuses, iCalendar's among them
+STATUS_NAMES = {
+    "active": Status.ACTIVE, "open": Status.ACTIVE, "todo": Status.ACTIVE,
+    "needs-action": Status.ACTIVE, "in-process": Status.ACTIVE,
+    "done": Status.DONE, "completed": Status.DONE, "closed": Status.DONE,
+    "canceled": Status.CANCELED, "cancelled": Status.CANCELED,
+}
+
+# A parsed row, kept small since it's pickled back from the workers:
+# (title, description, task_date ordinal, status value)
+Record = tuple[str, Optional[str], int, str]
+
+
+@dataclass(slots=True)
+class ImportStats:
+    rows: int = 0
+    imported: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    errors: list[str] = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+# PARSING (runs in the worker processes)
+
+def _record(title, day, description, status, ordinals: dict[str, int]) -> Record:
+    title = (title or "").strip()
+    if not title:
+        raise ValueError("missing title")
+    day = (day or "").strip()[:10]
+    # Imports repeat the same dates heavily
+    ordinal = ordinals.get(day)
+    if ordinal is None:
+        if not day:
+            raise ValueError("missing date")
+        ordinal = ordinals[day] = date.fromisoformat(day).toordinal()
+    name = (status or "active").strip().lower()
+    if name not in STATUS_NAMES:
+        raise ValueError(f"unknown status {status!r}")
+    return title, (description or None), ordinal, STATUS_NAMES[name].value
+
+
+def _ics_unescape(value: str) -> str:
+    return (value.replace("\\n", "\n").replace("\\N", "\n")
+            .replace("\\,", ",").replace("\\;", ";").replace("\\\\", "\\"))
+
+
+def _ics_date(value: str) -> str:
+    # 20260301, 20260301T090000Z, ... -> 2026-03-01
+    return f"{value[:4]}-{value[4:6]}-{value[6:8]}" if len(value) >= 8 else ""
+
+
+def _ics_record(lines: list[str], ordinals: dict[str, int]) -> Record:
+    props: dict[str, str] = {}
+    for line in lines:
+        name, _, value = line.partition(":")
+        props.setdefault(name.split(";", 1)[0].upper(), value)
+    day = props.get("DUE") or props.get("DTSTART") or ""
+    return _record(
+        _ics_unescape(props.get("SUMMARY", "")),
+        _ics_date(day),
+        _ics_unescape(props["DESCRIPTION"]) if "DESCRIPTION" in props else None,
+        props.get("STATUS"),
+        ordinals,
+    )
+
+
+def _pick(data: dict, names: tuple[str, ...]):
+    for name in names:
+        if name in data:
+            return data[name]
+    return None
+
+
+def parse_chunk(fmt: str, columns: dict[str, int], rows: list[tuple[int, object]]) -> tuple[list[Record], list[str]]:
+    # rows are (line number, raw row): a CSV row's cells, a JSON line, or an
+    # iCalendar component's unfolded lines. Returns the valid records and a
+    # message per invalid row.
+    records: list[Record] = []
+    errors: list[str] = []
+    ordinals: dict[str, int] = {}
+    cells = [columns.get(name) for name in FIELDS]
+    for lineno, raw in rows:
+        try:
+            if fmt == "csv":
+                values = [raw[i] if i is not None and i < len(raw) else None for i in cells]
+                records.append(_record(*values, ordinals))
+            elif fmt == "jsonl":
+                data = json.loads(raw)
+                if not isinstance(data, dict):
+                    raise ValueError("not a JSON object")
+                data = {str(k).lower(): v for k, v in data.items()}
+                values = [_pick(data, FIELDS[name]) for name in FIELDS]
+                records.append(_record(*(v if v is None else str(v) for v in values), ordinals))
+            else:
+                records.append(_ics_record(raw, ordinals))
+        except (ValueError, TypeError, AttributeError) as e:
+            errors.append(f"line {lineno}: {e}")
+    return records, errors
+
+
+# READING (in this process): files are cut into chunks of raw rows
+
+def detect_format(path: Path) -> str:
+    fmt = FORMATS.get(path.suffix.lower())
+    if fmt is None:
+        raise ValueError(f"Can't tell the format of {path}; use --format ({', '.join(sorted(set(FORMATS.values())))})")
+    return fmt
+
+
+def _chunked(rows: Iterable, size: int) -> Iterator[list]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _csv_rows(f, columns: dict[str, int]) -> Iterator[tuple[int, list[str]]]:
+    import csv
+
+    reader = csv.reader(f)
+    header = [name.strip().lower() for name in next(reader, [])]
+    for name, aliases in FIELDS.items():
+        for alias in aliases:
+            if alias in header:
+                columns[name] = header.index(alias)
+                break
+    for row in reader:
+        if row:
+            yield reader.line_num, row
+
+
+def _jsonl_rows(f) -> Iterator[tuple[int, str]]:
+    for lineno, line in enumerate(f, 1):
+        if line.strip():
+            yield lineno, line
+
+
+def _ics_rows(f) -> Iterator[tuple[int, list[str]]]:
+    # VTODO/VEVENT components, with folded lines joined back up
+    component: Optional[list[str]] = None
+    start = 0
+    for lineno, line in enumerate(f, 1):
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t"):
+            if component:
+                component[-1] += line[1:]
+            continue
+        upper = line.upper()
+        if upper in ("BEGIN:VTODO", "BEGIN:VEVENT"):
+            component, start = [], lineno
+        elif upper in ("END:VTODO", "END:VEVENT"):
+            if component is not None:
+                yield start, component
+            component = None
+        elif component is not None:
+            component.append(line)
+
+
+def read_chunks(path: Path, fmt: str, chunk_rows: int = CHUNK_ROWS) -> Iterator[tuple[dict[str, int], list]]:
+    columns: dict[str, int] = {}
+    with open(path, encoding="utf-8-sig", newline="" if fmt == "csv" else None) as f:
+        if fmt == "csv":
+            rows = _csv_rows(f, columns)
+        elif fmt == "jsonl":
+            rows = _jsonl_rows(f)
+        else:
+            rows = _ics_rows(f)
+        for chunk in _chunked(rows, chunk_rows):
+            yield columns, chunk
+
+
+def _parsed(chunks: Iterable[tuple[str, str, dict, list]], workers: int) -> Iterator[tuple[str, list[Record], list[str]]]:
+    # In input order. With workers, at most two chunks per worker are in
+    # flight, so memory stays bounded however large the input.
+    if workers <= 1:
+        for label, fmt, columns, rows in chunks:
+            yield label, *parse_chunk(fmt, columns, rows)
+        return
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending: deque = deque()
+        for label, fmt, columns, rows in chunks:
+            pending.append((label, pool.submit(parse_chunk, fmt, columns, rows)))
+            if len(pending) >= workers * 2:
+                label, future = pending.popleft()
+                yield label, *future.result()
+        while pending:
+            label, future = pending.popleft()
+            yield label, *future.result()
+
+
+# IMPORT
+
+def import_files(
+    storage,
+    paths: list[Path],
+    fmt: Optional[str] = None,
+    workers: Optional[int] = None,
+    chunk_rows: int = CHUNK_ROWS,
+    dedupe: bool = True,
+    progress: Optional[Callable[[ImportStats], None]] = None,
+) -> ImportStats:
+    # Parses every file, skips rows matching an existing task (or an
+    # earlier row) by title and date, and stores the rest with ids from a
+    # single allocation, in a single write.
+    stats = ImportStats()
+    started = perf_counter()
+    paths = [Path(p) for p in paths]
+    formats = [fmt or detect_format(p) for p in paths]
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if sum(p.stat().st_size for p in paths) < PARALLEL_MIN_BYTES:
+        workers = 1
+    chunks = (
+        (str(path), path_fmt, columns, rows)
+        for path, path_fmt in zip(paths, formats)
+        for columns, rows in read_chunks(path, path_fmt, chunk_rows)
+    )
+
+    with storage.transaction():
+        seen = {(t.title, t.task_date.toordinal()) for t in storage.tasks} if dedupe else set()
+        next_id = storage._next_id()
+        created_at = datetime.now()
+        days: dict[int, date] = {}
+        tasks: list[Task] = []
+        with trace.span("parse"):
+            for label, records, errors in _parsed(chunks, workers):
+                stats.rows += len(records) + len(errors)
+                stats.invalid += len(errors)
+                room = MAX_ERRORS - len(stats.errors)
+                stats.errors += [f"{label}: {e}" for e in errors[:max(room, 0)]]
+                for title, description, ordinal, status in records:
+                    if dedupe:
+                        key = (title, ordinal)
+                        if key in seen:
+                            stats.duplicates += 1
+                            continue
+                        seen.add(key)
+                    day = days.get(ordinal)
+                    if day is None:
+                        day = days[ordinal] = date.fromordinal(ordinal)
+                    tasks.append(Task(next_id + len(tasks), title, created_at, day, Status(status), description))
+                if progress is not None:
+                    stats.seconds = perf_counter() - started
+                    progress(stats)
+        with trace.span("insert"):
+            stats.imported = storage.insert_tasks(tasks)
+    trace.count("rows_imported", stats.imported)
+    stats.seconds = perf_counter() - started
+    return stats
@@ -0,0 +1,218 @@
+from pathlib import Path
+import json
+import os
+import threading
+
+from todo import trace
+from todo.fileio import atomic_write, file_lock, file_signature, temp_file
+from todo.models import Task, TaskStorage
+
+DEFAULT_COMPACT_THRESHOLD = 1024 * 1024  # bytes of journal before compaction
+
+
+# The snapshot is a regular tasks.json, so an existing task file is picked up
+# as-is. Mutations are appended to <task_file>.journal and replayed on load;
+# past compact_threshold bytes the journal is folded back into the snapshot.
+class JournalTaskStorage(TaskStorage):
+    def __init__(
+        self,
+        filename: Path,
+        compact_threshold: int = DEFAULT_COMPACT_THRESHOLD,
+        durable: bool = True,
+    ) -> None:
+        filename = Path(filename)
+        self.journal_file = filename.with_name(filename.name + ".journal")
+        self.compacting_file = filename.with_name(filename.name + ".journal.compacting")
+        self.compact_threshold = compact_threshold
+        self._compaction: threading.Thread | None = None
+        # Bytes of the journal replayed so far, so a refresh can replay just
+        # what other processes appended since
+        self._journal_offset = 0
+        super().__init__(filename, durable=durable)
+
+    def load_tasks(self) -> list[Task]:
+        tasks = {t.id: t for t in super().load_tasks()}
+        # A leftover .compacting file means a compaction was interrupted;
+        # its records are older than the live journal.
+        replayed = 0
+        self._journal_offset = 0
+        with trace.span("replay"):
+            for path in (self.compacting_file, self.journal_file):
+                for record in self._read_journal(path):
+                    self._apply(tasks, record)
+                    if record["op"] == "add":
+                        self._last_id = max(self._last_id, record["task"]["id"])
+                    replayed += 1
+        trace.count("journal_records", replayed)
+        return list(tasks.values())
+
+    def _read_journal(self, path: Path, offset: int = 0):
+        # Complete records from byte `offset` on. A line without its newline
+        # is a torn write after a crash, or one still in progress.
+        if not path.exists():
+            return
+        with path.open("rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    return
+                try:
+                    record = json.loads(line) if line.strip() else None
+                except json.JSONDecodeError:
+                    return
+                offset += len(line)
+                if path == self.journal_file:
+                    self._journal_offset = offset
+                if record is not None:
+                    yield record
+
+    def _refresh(self) -> None:
+        # When only the journal grew, replay its new records into the loaded
+        # state; that touches just their days, so cached views of the rest
+        # stay valid. Anything else (a compaction, a rewritten snapshot)
+        # means a full reload.
+        signature = self._file_signature()
+        if signature == self._seen:
+            return
+        seen, self._seen = self._seen, signature
+        if seen is None or seen[0] != signature[0] or seen[2] != signature[2] or signature[1] is None:
+            self._reload()
+            return
+        if seen[1] is None:
+            self._journal_offset = 0
+        elif seen[1][0] != signature[1][0] or signature[1][1] < self._journal_offset:
+            self._reload()
+            return
+        replayed = 0
+        with trace.span("replay"):
+            for record in self._read_journal(self.journal_file, self._journal_offset):
+                self._replay(record)
+                replayed += 1
+        trace.count("journal_records", replayed)
+
+    def _replay(self, record: dict) -> None:
+        task_id = record["task"]["id"] if record["op"] == "add" else record["id"]
+        old = self._tasks.get(task_id)
+        changed = {task_id: old} if old is not None else {}
+        self._apply(changed, record)
+        new = changed.get(task_id)
+        if old is not None:
+            self._unindex(old)
+            del self._tasks[task_id]
+        if new is not None:
+            self._tasks[task_id] = new
+            self._index(new)
+            self._last_id = max(self._last_id, task_id)
+        self._touch_task(old, new)
+        # Rebuilt from the tasks on the next search
+        self._search = None
+
+    @staticmethod
+    def _apply(tasks: dict[int, Task], record: dict) -> None:
+        op = record["op"]
+        if op == "add":
+            task = Task.from_dict(record["task"])
+            tasks[task.id] = task
+        elif op == "update":
+            task = tasks.get(record["id"])
+            if task is not None:
+                tasks[task.id] = Task.from_dict({**task.to_dict(), **record["fields"]})
+        elif op == "delete":
+            tasks.pop(record["id"], None)
+
+    def _append(self, record: dict) -> None:
+        with self.journal_file.open("a", encoding="utf-8") as f:
+            # Past the records replayed there can only be a torn write (we
+            # hold the lock): cut it off, or this record would be glued to it
+            if f.tell() > self._journal_offset:
+                f.truncate(self._journal_offset)
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            if self._in_transaction:
+                self._dirty = True
+            elif self.durable:
+                os.fsync(f.fileno())
+            size = f.tell()
+        self._journal_offset = size
+        if size >= self.compact_threshold:
+            self.compact(background=True)
+
+    def _commit(self) -> None:
+        # Group commit: one fsync covers every record of the transaction
+        if self._dirty:
+            self._dirty = False
+            if self.durable and self.journal_file.exists():
+                with self.journal_file.open("a") as f:
+                    os.fsync(f.fileno())
+
+    def _file_signature(self) -> tuple:
+        return (
+            file_signature(self.filename),
+            file_signature(self.journal_file),
+            file_signature(self.compacting_file),
+        )
+
+    def _persist_add(self, task: Task) -> None:
+        self._append({"op": "add", "task": task.to_dict()})
+
+    def _persist_update(self, task: Task, changes: dict) -> None:
+        if not changes:
+            return
+        data = task.to_dict()
+        self._append({"op": "update", "id": task.id, "fields": {k: data[k] for k in changes}})
+
+    def _persist_delete(self, task: Task) -> None:
+        self._append({"op": "delete", "id": task.id})
+
+    def save_tasks(self) -> None:
+        with self._locked():
+            self.compact(background=False)
+
+    # compact() must be called with the file lock held (it is, from mutations
+    # and save_tasks). A background compaction writes the snapshot without the
+    # lock, then takes it to swap the snapshot in, and only does so if the
+    # journal it rotated is still in place; otherwise a newer snapshot already
+    # covers it.
+    def compact(self, background: bool = True) -> None:
+        if not background:
+            self._write_snapshot(self._snapshot_data())
+            self.compacting_file.unlink(missing_ok=True)
+            self.journal_file.unlink(missing_ok=True)
+            self._journal_offset = 0
+            return
+        if self._compaction is not None and self._compaction.is_alive():
+            return
+        if self.compacting_file.exists() or not self.journal_file.exists():
+            # Another compaction is pending (or crashed); leave it be
+            return
+        data = self._snapshot_data()
+        os.replace(self.journal_file, self.compacting_file)
+        self._journal_offset = 0
+        rotated = file_signature(self.compacting_file)
+        # Non-daemon, so the interpreter waits for it before exiting
+        self._compaction = threading.Thread(target=self._compact_in_background, args=(data, rotated))
+        self._compaction.start()
+
+    def _compact_in_background(self, data: str, rotated: tuple) -> None:
+        fd, tmp = temp_file(self.filename)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(data)
+                f.flush()
+                if self.durable:
+                    os.fsync(f.fileno())
+            with file_lock(self.lock_file):
+                if file_signature(self.compacting_file) != rotated:
+                    return
+                os.replace(tmp, self.filename)
+                self.compacting_file.unlink()
+        finally:
+            Path(tmp).unlink(missing_ok=True)
+
+    def _write_snapshot(self, data: str) -> None:
+        atomic_write(self.filename, lambda f: f.write(data), durable=self.durable)
+
+    def close(self) -> None:
+        if self._compaction is not None:
+            self._compaction.join()
+            self._compaction = None
@@ -0,0 +1,557 @@
+from collections.abc import Callable, Iterator
+from heapq import merge, nsmallest
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, date
+from pathlib import Path
+from itertools import batched, chain, islice
+from typing import Optional, TextIO
+import json
+import pickle
+import re
+import tempfile
+
+from todo import codec, trace
+from todo.codec import ID, STATUS, TASK_DATE, decode_task, encode_task, encode_tasks
+from todo.fileio import atomic_write
+from todo.models import (
+    Recurrence, Status, Task, TaskFileError, TaskStorage, _order, occurrences_between, series_rows,
+)
+
+CHUNK_SIZE = 64 * 1024
+COPY_SIZE = 1024 * 1024  # bytes per read when copying records unchanged
+WRITE_BATCH = 1024  # rows encoded per call when streaming a file out
+SORT_RUN = 50_000  # rows an unbounded listing sorts in memory at a time
+WHITESPACE = " \t\n\r"
+
+_decoder = json.JSONDecoder()
+_encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+
+# INCREMENTAL READER
+
+class _ChunkReader:
+    def __init__(self, f: TextIO) -> None:
+        self.f = f
+        self.buf = ""
+        self.pos = 0
+
+    def _fill(self) -> bool:
+        chunk = self.f.read(CHUNK_SIZE)
+        if not chunk:
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise json.JSONDecodeError(f"Expecting {char!r}", self.buf, self.pos)
+        self.pos += 1
+
+    def value(self, raw: bool = False):
+        # With raw, (value, the text it was parsed from)
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number ending the buffer may continue in the next chunk
+            if end == len(self.buf) and self._fill():
+                continue
+            text = self.buf[self.pos:end] if raw else None
+            self.pos = end
+            return (value, text) if raw else value
+
+    def array(self, raw: bool = False) -> Iterator:
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value(raw)
+            if self.peek() == "]":
+                self.pos += 1
+                return
+            self.expect(",")
+
+
+def _walk(path: Path, header: dict, records: bool, raw: bool = False) -> Iterator:
+    if not path.exists():
+        return
+    with path.open("r", encoding="utf-8") as f:
+        reader = _ChunkReader(f)
+        first = reader.peek()
+        if not first:
+            return
+        # Older files are a bare list of tasks without the header
+        if first == "[":
+            if records:
+                yield from reader.array(raw)
+            return
+        reader.expect("{")
+        while reader.peek() != "}":
+            key = reader.value()
+            reader.expect(":")
+            if key == "tasks":
+                if not records:
+                    return
+                yield from reader.array(raw)
+            else:
+                header[key] = reader.value()
+                if key == "format":
+                    codec.check_format(header[key])
+            if reader.peek() == ",":
+                reader.pos += 1
+
+
+def iter_task_rows(path: Path, header: Optional[dict] = None) -> Iterator[list]:
+    # Yields task records one at a time as positional rows (see todo.codec),
+    # holding at most one chunk of the file in memory. Header fields are
+    # collected into `header` as seen.
+    for r in _walk(Path(path), {} if header is None else header, records=True):
+        yield r if r.__class__ is list else codec.row_from_dict(r)
+
+
+def iter_task_texts(path: Path, header: Optional[dict] = None) -> Iterator[tuple[list, str]]:
+    # Rows with the JSON text they were read from, for writers that copy
+    # the records they leave alone instead of encoding them again
+    for r, text in _walk(Path(path), {} if header is None else header, records=True, raw=True):
+        if r.__class__ is list:
+            yield r, text
+        else:
+            row = codec.row_from_dict(r)
+            yield row, _encode(row)
+
+
+def iter_task_records(path: Path, header: Optional[dict] = None) -> Iterator[dict]:
+    # The same as task dicts, as Task.to_dict writes them
+    for r in _walk(Path(path), {} if header is None else header, records=True):
+        yield codec.row_to_dict(r) if r.__class__ is list else r
+
+
+def read_header(path: Path) -> dict:
+    header: dict = {}
+    for _ in _walk(Path(path), header, records=False):
+        pass
+    return header
+
+
+def _file_header(last_id: int) -> str:
+    return f'{{"format":{codec.FORMAT},"last_id":{last_id},"tasks":['
+
+
+# The header as _file_header (and codec.dumps) write it
+_HEADER = re.compile(rb'\{"format":(\d+),"last_id":\d+,"tasks":\[')
+
+
+def write_task_file(path: Path, last_id: int, texts: Iterator[str], durable: bool = True) -> None:
+    # Same layout as TaskStorage.save_tasks, from the records' JSON texts
+    # (one or more comma-separated rows each), written a batch at a time
+    # into a temp file so the iterator may still be reading `path`.
+    def write(f) -> None:
+        f.write(_file_header(last_id))
+        sep = ""
+        while batch := list(islice(texts, WRITE_BATCH)):
+            f.write(sep + ",".join(batch))
+            sep = ","
+        f.write("]}")
+
+    atomic_write(Path(path), write, durable=durable)
+
+
+def append_task_file(path: Path, last_id: int, text: str, durable: bool = True) -> bool:
+    # Adds records (`text`, as for write_task_file) behind a new header,
+    # copying the bytes of the ones already there instead of parsing them.
+    # False, with nothing written, for a file that isn't in the layout
+    # written here (older formats, or hand-edited): rewrite it instead.
+    path = Path(path)
+    if not path.exists():
+        return False
+    with path.open("rb") as src:
+        m = _HEADER.match(src.read(64))
+        size = src.seek(0, 2)
+        src.seek(max(size - 64, 0))
+        tail = src.read()
+        trimmed = tail.rstrip(WHITESPACE.encode())
+        if m is None or int(m[1]) != codec.FORMAT or not trimmed.endswith(b"]}"):
+            return False
+        # The records: from the header to the closing "]"
+        start, end = m.end(), size - len(tail) + len(trimmed) - 2
+        if end < start:
+            return False
+        src.seek(start)
+        empty = not src.read(min(end - start, 64)).strip()
+
+        def write(f) -> None:
+            f.write(_file_header(last_id).encode())
+            src.seek(start)
+            remaining = end - start
+            while remaining > 0:
+                chunk = src.read(min(COPY_SIZE, remaining))
+                if not chunk:
+                    raise ValueError(f"{path} changed while being copied")
+                f.write(chunk)
+                remaining -= len(chunk)
+            f.write(("" if empty else ",").encode() + text.encode("utf-8") + b"]}")
+
+        atomic_write(path, write, binary=True, durable=durable)
+    return True
+
+
+def sorted_rows(rows: Iterator[list]) -> Iterator[list]:
+    # rows in (task_date, id) order, holding at most SORT_RUN of them in
+    # memory: past that, each run is sorted into a temp file and the runs
+    # are merged back. Reads all of `rows` before returning.
+    run = sorted(islice(rows, SORT_RUN), key=_row_key)
+    if len(run) < SORT_RUN:
+        return iter(run)
+    files = []
+    try:
+        while run:
+            f = tempfile.TemporaryFile()
+            files.append(f)
+            for batch in batched(run, WRITE_BATCH):
+                pickle.dump(batch, f, pickle.HIGHEST_PROTOCOL)
+            f.seek(0)
+            run = sorted(islice(rows, SORT_RUN), key=_row_key)
+    except BaseException:
+        for f in files:
+            f.close()
+        raise
+    return _merge_runs(files)
+
+
+def _read_run(f) -> Iterator[list]:
+    while True:
+        try:
+            yield from pickle.load(f)
+        except EOFError:
+            return
+
+
+def _merge_runs(files: list) -> Iterator[list]:
+    with ExitStack() as stack:
+        for f in files:
+            stack.enter_context(f)
+        yield from merge(*map(_read_run, files), key=_row_key)
+
+
+def _row_key(r: list) -> tuple[str, int]:
+    return r[TASK_DATE], r[ID]
+
+
+class _NotFound(Exception):
+    pass
+
+
+# STORAGE
+
+# Answers single-task commands and date-window queries by streaming the task
+# file, materializing Task objects only for matching records. The full
+# in-memory index is built on first use of anything that needs every task.
+class LazyTaskStorage(TaskStorage):
+    def _load(self) -> None:
+        self._loaded = False
+        self._last_id_known = False
+        # Nothing is indexed yet, so any cached view may be stale
+        self._epoch += 1
+        self._day_versions.clear()
+        self._search = None
+
+    def _reload(self) -> None:
+        loaded = self._loaded
+        self._load()
+        if loaded:
+            self._ensure_loaded()
+
+    @contextmanager
+    def transaction(self) -> Iterator["LazyTaskStorage"]:
+        with super().transaction():
+            self._ensure_loaded()
+            yield self
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        header: dict = {}
+        with trace.span("load"):
+            tasks = codec.decode_tasks(self._iter_rows(header))
+        trace.count("tasks_loaded", len(tasks))
+        self._last_id = max(self._last_id, header.get("last_id", 0))
+        self._set_tasks(tasks)
+        self._loaded = self._last_id_known = True
+
+    def _iter_rows(self, header: Optional[dict] = None, texts: bool = False) -> Iterator:
+        # With texts, (row, its JSON text) pairs (see iter_task_texts)
+        if trace.enabled and self.filename.exists():
+            trace.count("bytes_read", self.filename.stat().st_size)
+        read = iter_task_texts if texts else iter_task_rows
+        try:
+            yield from read(self.filename, header)
+        except ValueError as e:
+            raise TaskFileError(f"{self.filename} is corrupt: {e}") from e
+
+    def _plain_rows(self, series: list[Task]) -> Iterator[list]:
+        # Rows of plain tasks; series are collected into `series` instead,
+        # to be expanded for the window being asked for
+        for r in self._iter_rows():
+            if len(r) > codec.RECURRENCE:
+                series.append(decode_task(r))
+            else:
+                yield r
+
+    def _rewrite(self, task_id: int, transform: Callable[[list], Optional[list]]) -> bool:
+        # Rewrites the file with task_id's row replaced by transform(row), or
+        # dropped for None; the other records are copied as they were read,
+        # not encoded again. False, and the file left alone, if there's no
+        # such row: ids past the high-water mark are turned away from the
+        # header, anything else abandons the temp file before it's synced
+        # and renamed into place.
+        with self._locked():
+            if not self.filename.exists() or task_id >= self._next_id():
+                return False
+            found = False
+
+            def texts() -> Iterator[str]:
+                nonlocal found
+                for r, text in self._iter_rows(texts=True):
+                    if r[ID] == task_id:
+                        found = True
+                        r = transform(r)
+                        if r is None:
+                            continue
+                        text = _encode(r)
+                    yield text
+                if not found:
+                    raise _NotFound
+
+            try:
+                write_task_file(self.filename, self._next_id() - 1, texts(), durable=self.durable)
+            except _NotFound:
+                return False
+        return True
+
+    @property
+    def tasks(self) -> list[Task]:
+        self._ensure_loaded()
+        return super().tasks
+
+    def load_tasks(self) -> list[Task]:
+        return codec.decode_tasks(self._iter_rows())
+
+    def save_tasks(self) -> None:
+        # Streaming mutations are written as they happen
+        if self._loaded:
+            super().save_tasks()
+
+    def _next_id(self) -> int:
+        if not self._last_id_known:
+            header = read_header(self.filename) if self.filename.exists() else {}
+            if "last_id" in header:
+                self._last_id = max(self._last_id, header["last_id"])
+            else:
+                self._last_id = max((r[ID] for r in self._iter_rows()), default=self._last_id)
+            self._last_id_known = True
+        return super()._next_id()
+
+    def add_task(
+        self,
+        title: str,
+        task_date: date,
+        description: Optional[str] = None,
+        recurrence: Optional[Recurrence] = None
+    ) -> Task:
+        if self._loaded:
+            return super().add_task(title, task_date, description, recurrence)
+        with self._locked():
+            task = Task(
+                id=self._next_id(),
+                title=title,
+                task_date=task_date,
+                description=description,
+                created_at=datetime.now(),
+                recurrence=recurrence
+            )
+            self._last_id = task.id
+            text = _encode(encode_task(task))
+            if not append_task_file(self.filename, self._last_id, text, durable=self.durable):
+                old = (t for _, t in self._iter_rows(texts=True))
+                write_task_file(self.filename, self._last_id, chain(old, [text]), durable=self.durable)
+            self._touch_task(None, task)
+            self._reindex(None, task)
+        return task
+
+    def insert_tasks(self, tasks) -> int:
+        if self._loaded or self._in_transaction:
+            self._ensure_loaded()
+            return super().insert_tasks(tasks)
+        # A few tasks (an undone delete): one pass, like add_task
+        new = {t.id: t for t in tasks}
+        if not new:
+            return 0
+        with self._locked():
+            self._last_id = max(self._next_id() - 1, *new)
+
+            def texts() -> Iterator[str]:
+                for r, text in self._iter_rows(texts=True):
+                    if r[ID] in new:
+                        old = decode_task(r)
+                        self._touch_task(old, None)
+                        self._reindex(old, None)
+                    else:
+                        yield text
+                yield codec.encode_rows(encode_tasks(new.values()))
+
+            write_task_file(self.filename, self._last_id, texts(), durable=self.durable)
+            for task in new.values():
+                self._touch_task(None, task)
+                self._reindex(None, task)
+        return len(new)
+
+    def get_task(self, task_id: int) -> Optional[Task]:
+        if self._loaded:
+            return super().get_task(task_id)
+        row = next((r for r in self._iter_rows() if r[ID] == task_id), None)
+        return decode_task(row) if row else None
+
+    def update_task(
+        self,
+        task_id: int,
+        title: Optional[str] = None,
+        task_date: Optional[date] = None,
+        description: Optional[str] = None,
+        status: Optional[Status] = None,
+        recurrence: Optional[Recurrence] = None
+    ) -> Optional[Task]:
+        if self._loaded:
+            return super().update_task(task_id, title, task_date, description, status, recurrence)
+        changes = {
+            "title": title,
+            "task_date": task_date,
+            "description": description,
+            "status": status,
+            "recurrence": recurrence,
+        }
+        updated: list[Task] = []
+
+        def apply(row: list) -> list:
+            old = decode_task(row)
+            task = decode_task(row)
+            for field, value in changes.items():
+                if value is not None:
+                    setattr(task, field, value)
+            updated.append(task)
+            self._touch_task(old, task)
+            if title is not None or description is not None:
+                self._reindex(old, task)
+            return encode_task(task)
+
+        self._rewrite(task_id, apply)
+        return updated[0] if updated else None
+
+    def delete_task(self, task_id: int) -> bool:
+        if self._loaded:
+            return super().delete_task(task_id)
+
+        def drop(row: list) -> None:
+            task = decode_task(row)
+            self._touch_task(task, None)
+            self._reindex(task, None)
+
+        return self._rewrite(task_id, drop)
+
+    def _fetch(self, ids: list[int]) -> list[Task]:
+        if self._loaded:
+            return super()._fetch(ids)
+        # One pass over the file for all of them
+        wanted = set(ids)
+        found = {r[ID]: r for r in self._iter_rows() if r[ID] in wanted}
+        return [decode_task(found[task_id]) for task_id in ids if task_id in found]
+
+    def list_tasks(self, status: Optional[Status] = None, task_date: Optional[date] = None) -> list[Task]:
+        if task_date and not self._loaded:
+            return self.tasks_between(task_date, task_date, status)
+        self._ensure_loaded()
+        return super().list_tasks(status, task_date)
+
+    def tasks_between(self, start: date, end: date, status: Optional[Status] = None) -> list[Task]:
+        if self._loaded:
+            return super().tasks_between(start, end, status)
+        # ISO dates compare correctly as strings, so nothing is parsed
+        # for records outside the window.
+        lo, hi = start.isoformat(), end.isoformat()
+        code = None if status is None else codec.STATUS_CODES[status]
+        series: list[Task] = []
+        with trace.span("scan"):
+            result = codec.decode_tasks(
+                r for r in self._plain_rows(series)
+                if lo <= r[TASK_DATE] <= hi and (code is None or r[STATUS] == code)
+            )
+        trace.count("tasks_loaded", len(result))
+        result.sort(key=_order)
+        if series:
+            result = list(merge(result, occurrences_between(series, start, end, status), key=_order))
+        return result
+
+    def iter_tasks(
+        self,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        status: Optional[Status] = None,
+        after: Optional[tuple[date, int]] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> Iterator[Task]:
+        if self._loaded:
+            return super().iter_tasks(start, end, status, after, offset, limit)
+        # The file is in insertion order, so records must be ordered here;
+        # with a limit only the first offset+limit are kept while streaming,
+        # without one they're sorted in runs (sorted_rows). Either way Tasks
+        # are decoded a batch at a time as the caller reads.
+        lo = start.isoformat() if start else ""
+        hi = end.isoformat() if end else "9999-12-31"
+        cursor = (after[0].isoformat(), after[1]) if after else ("", 0)
+        code = None if status is None else codec.STATUS_CODES[status]
+        series: list[Task] = []
+        matching = (
+            r for r in self._plain_rows(series)
+            if lo <= r[TASK_DATE] <= hi
+            and (code is None or r[STATUS] == code)
+            and (r[TASK_DATE], r[ID]) > cursor
+        )
+        if limit is None:
+            ordered = sorted_rows(matching)
+        else:
+            ordered = nsmallest(offset + limit, matching, key=_row_key)
+        tasks = chain.from_iterable(map(codec.decode_tasks, batched(ordered, WRITE_BATCH)))
+        if series:
+            tasks = merge(tasks, series_rows(series, start, end, status, after), key=_order)
+        return islice(tasks, offset, None if limit is None else offset + limit)
+
+    def date_ordinals(self, start: date, end: date) -> list[int]:
+        if self._loaded:
+            return super().date_ordinals(start, end)
+        lo, hi = start.isoformat(), end.isoformat()
+        ordinals: dict[str, int] = {}  # task dates repeat heavily
+        result = []
+        series: list[Task] = []
+        for r in self._plain_rows(series):
+            day = r[TASK_DATE]
+            if lo <= day <= hi:
+                ordinal = ordinals.get(day)
+                if ordinal is None:
+                    ordinal = ordinals[day] = date.fromisoformat(day).toordinal()
+                result.append(ordinal)
+        return result + [t.task_date.toordinal() for t in occurrences_between(series, start, end)]
@@ -1,16 +1,115 @@
-from dataclasses import dataclass
-from datetime import datetime, date
+from bisect import bisect_left, bisect_right, insort
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
+from datetime import datetime, date, timedelta
 from enum import Enum
+from heapq import merge
+from itertools import islice
+from operator import attrgetter
 from typing import Optional
 from pathlib import Path
 import json
 
+from todo import trace
+from todo.fileio import atomic_write, file_lock, file_signature
+
+class TaskFileError(Exception):
+    pass
+
 class Status(str, Enum):
     ACTIVE = "active"
     DONE = "done"
     CANCELED = "canceled"
 
-@dataclass
+class Frequency(str, Enum):
+    DAILY = "daily"
+    WEEKLY = "weekly"
+    MONTHLY = "monthly"
+
+def _add_months(day: date, months: int) -> date:
+    # Same day of the month, clamped to the month's last day
+    month = day.month - 1 + months
+    year, month = day.year + month // 12, month % 12 + 1
+    last = (date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)).day
+    return date(year, month, min(day.day, last))
+
+# A repeating task is stored once, as a series: the Task's task_date is the
+# first occurrence and its recurrence the rule. Occurrences are expanded only
+# for the window being shown; a change to a single occurrence is kept here
+# instead of as a copy of the task.
+@dataclass(slots=True)
+class Recurrence:
+    freq: Frequency
+    interval: int = 1
+    until: Optional[date] = None
+    exceptions: frozenset[date] = frozenset()  # dates left out of the series
+    overrides: dict[date, Status] = field(default_factory=dict)  # per-occurrence status
+
+    def dates(self, first: date, start: date, end: date) -> Iterator[date]:
+        # Occurrence dates within [start, end], starting from the first one
+        # at or after `start` rather than walking from `first`.
+        if self.until is not None and self.until < end:
+            end = self.until
+        if start < first:
+            start = first
+        if start > end:
+            return
+        if self.freq is Frequency.MONTHLY:
+            months = (start.year - first.year) * 12 + start.month - first.month
+            n = months // self.interval * self.interval
+            while (day := _add_months(first, n)) <= end:
+                if day >= start and day not in self.exceptions:
+                    yield day
+                n += self.interval
+            return
+        step = self.interval * (7 if self.freq is Frequency.WEEKLY else 1)
+        day = first + timedelta(days=-(-(start - first).days // step) * step)
+        delta = timedelta(days=step)
+        while day <= end:
+            if day not in self.exceptions:
+                yield day
+            day += delta
+
+    def occurs_on(self, first: date, day: date) -> bool:
+        return next(self.dates(first, day, day), None) is not None
+
+    def with_occurrence(self, day: date, status: Optional[Status] = None, skip: bool = False) -> "Recurrence":
+        overrides = {d: s for d, s in self.overrides.items() if d != day}
+        if skip:
+            return replace(self, exceptions=self.exceptions | {day}, overrides=overrides)
+        return replace(self, overrides={**overrides, day: status})
+
+    def changed_days(self, other: "Recurrence") -> Optional[set[date]]:
+        # Days whose occurrence differs between the two rules, or None if
+        # the series itself changed
+        if (self.freq, self.interval, self.until) != (other.freq, other.interval, other.until):
+            return None
+        days = set(self.exceptions ^ other.exceptions)
+        days.update(d for d in self.overrides.keys() | other.overrides.keys()
+                    if self.overrides.get(d) != other.overrides.get(d))
+        return days
+
+    def to_dict(self) -> dict:
+        return {
+            "freq": self.freq.value,
+            "interval": self.interval,
+            "until": self.until.isoformat() if self.until else None,
+            "exceptions": sorted(d.isoformat() for d in self.exceptions),
+            "overrides": {d.isoformat(): s.value for d, s in sorted(self.overrides.items())},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(
+            freq=Frequency(data["freq"]),
+            interval=data.get("interval", 1),
+            until=date.fromisoformat(data["until"]) if data.get("until") else None,
+            exceptions=frozenset(date.fromisoformat(d) for d in data.get("exceptions", ())),
+            overrides={date.fromisoformat(d): Status(s) for d, s in data.get("overrides", {}).items()},
+        )
+
+@dataclass(slots=True)
 class Task:
     id: int
     title: str
@@ -18,9 +117,10 @@ class Task:
     task_date: date
     status: Status = Status.ACTIVE
     description: Optional[str] = None
+    recurrence: Optional[Recurrence] = None
 
     def to_dict(self) -> dict:
-        return {
+        data = {
             "id": self.id,
             "title": self.title,
             "description": self.description,
@@ -28,65 +128,363 @@ class Task:
             "task_date": self.task_date.isoformat(),
             "status": self.status.value
         }
+        # Only series carry the key, so plain task files are unchanged
+        if self.recurrence is not None:
+            data["recurrence"] = self.recurrence.to_dict()
+        return data
     
     @classmethod
     def from_dict(cls, data: dict):
+        recurrence = data.get("recurrence")
         return cls(
             id=data["id"],
             title=data["title"],
             description=data.get("description"),
             created_at=datetime.fromisoformat(data["created_at"]),
             task_date=date.fromisoformat(data["task_date"]),
-            status=Status(data.get("status", "active"))
+            status=Status(data.get("status", "active")),
+            recurrence=Recurrence.from_dict(recurrence) if recurrence else None,
+        )
+
+    def occurrences(self, start: date, end: date) -> Iterator["Task"]:
+        # One plain Task per occurrence of this series within [start, end].
+        # They share the series id; the status is the occurrence's override,
+        # if any, else the series' own.
+        rule = self.recurrence
+        for day in rule.dates(self.task_date, start, end):
+            yield Task(
+                self.id, self.title, self.created_at, day,
+                rule.overrides.get(day, self.status), self.description,
+            )
+
+_order = attrgetter("task_date", "id")
+INSORT_MAX = 16  # insert_tasks() re-sorts the date index past this many
+
+def occurrences_between(
+    series: Iterable[Task],
+    start: date,
+    end: date,
+    status: Optional[Status] = None,
+) -> list[Task]:
+    tasks = [
+        occurrence for task in series for occurrence in task.occurrences(start, end)
+        if status is None or occurrence.status == status
+    ]
+    tasks.sort(key=_order)
+    return tasks
+
+def series_rows(
+    series: Iterable[Task],
+    start: Optional[date],
+    end: Optional[date],
+    status: Optional[Status],
+    after: Optional[tuple[date, int]],
+) -> list[Task]:
+    # What iter_tasks() lists for the series: their occurrences when the
+    # window is bounded, otherwise each series once, on its first day.
+    if end is None:
+        rows = sorted(
+            (t for t in series
+             if (start is None or t.task_date >= start) and (status is None or t.status == status)),
+            key=_order,
         )
+    else:
+        rows = occurrences_between(series, start or date.min, end, status)
+    if after:
+        rows = [t for t in rows if (t.task_date, t.id) > after]
+    return rows
 
 class TaskStorage:
-    def __init__(self, filename: Path) -> None:
+    def __init__(self, filename: Path, durable: bool = True) -> None:
         self.filename = Path(filename)
         self.filename.parent.mkdir(parents=True, exist_ok=True)
-        self.tasks: list[Task] = self.load_tasks()
+        self.lock_file = self.filename.with_name(self.filename.name + ".lock")
+        # fsync every write; inside transaction() there's one write per commit
+        self.durable = durable
+        self._in_transaction = False
+        self._lock_held = False
+        self._dirty = False
+        # id -> Task, in insertion order, plus the highest id ever handed
+        # out so that ids of deleted tasks are never reused.
+        self._tasks: dict[int, Task] = {}
+        self._last_id = 0
+        # Sorted (task_date, id) pairs for range queries. Kept in sync by
+        # add/update/delete_task, so dates must be changed through update_task.
+        self._date_index: list[tuple[date, int]] = []
+        # Recurring tasks stay out of the date index; their occurrences are
+        # expanded from here for each window that's asked for.
+        self._series: dict[int, Task] = {}
+        # Change tracking for render caches: a full (re)load bumps the epoch,
+        # a mutation stamps the days it touched with a new change number.
+        self._epoch = 0
+        self._changes = 0
+        self._day_versions: dict[date, int] = {}
+        # Full-text index (todo.search), attached on first search and kept
+        # up to date by the mutations from then on. While a saved index
+        # exists, mutations also log their changes to it.
+        self._search = None
+        self._log_search = False
+        self._search_ops: list[tuple] = []
+        self._seen = self._file_signature()
+        self._load()
+
+    def _load(self) -> None:
+        with trace.span("load"):
+            self._set_tasks(self.load_tasks())
+
+    def _reload(self) -> None:
+        self._load()
+
+    def _file_signature(self) -> tuple:
+        return (file_signature(self.filename),)
+
+    def _refresh(self) -> None:
+        # Pick up writes made by other processes since we last looked
+        signature = self._file_signature()
+        if signature != self._seen:
+            self._seen = signature
+            self._reload()
+
+    def refresh(self) -> None:
+        with file_lock(self.lock_file):
+            self._refresh()
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        # Read-modify-write under the advisory lock, starting from the
+        # current file contents. Re-entrant within one storage object.
+        if self._lock_held:
+            yield
+            return
+        with file_lock(self.lock_file):
+            self._lock_held = True
+            try:
+                self._refresh()
+                stamp = repr(self._seen)
+                self._log_search = self._search is not None or self.search_file.exists()
+                yield
+                self._seen = self._file_signature()
+                if self._search_ops:
+                    from todo.search import append_log
+                    append_log(self.search_file, stamp, repr(self._seen), self._search_ops)
+            finally:
+                self._lock_held = False
+                self._search_ops = []
+
+    def locked(self):
+        # The lock alone, for a caller's own read-modify-write over a few
+        # tasks: each write is saved as it happens, and nothing is loaded
+        # that a transaction would load (LazyTaskStorage)
+        return self._locked()
+
+    @contextmanager
+    def transaction(self) -> Iterator["TaskStorage"]:
+        # Holds the lock across several mutations and writes (and fsyncs)
+        # once at the end instead of after each one.
+        with self._locked():
+            self._in_transaction = True
+            try:
+                try:
+                    yield self
+                finally:
+                    self._in_transaction = False
+                self._commit()
+            except BaseException:
+                self._rollback()
+                raise
+
+    def _rollback(self) -> None:
+        # Back to what the file holds: batch and the daemon keep using the
+        # storage after a failed transaction, and reads don't refresh
+        self._dirty = False
+        self._last_id = 0
+        self._seen = None
+        self._reload()
+        self._seen = self._file_signature()
+
+    def _commit(self) -> None:
+        if self._dirty:
+            self._dirty = False
+            self.save_tasks()
+
+    @property
+    def tasks(self) -> list[Task]:
+        return list(self._tasks.values())
+
+    def _set_tasks(self, tasks: list[Task]) -> None:
+        with trace.span("index"):
+            self._tasks = {t.id: t for t in tasks}
+            self._last_id = max(self._last_id, max(self._tasks, default=0))
+            self._date_index = sorted((t.task_date, t.id) for t in self._tasks.values() if t.recurrence is None)
+            self._series = {t.id: t for t in self._tasks.values() if t.recurrence is not None}
+        self._epoch += 1
+        self._day_versions.clear()
+        self._search = None
+
+    def _reindex(self, old: Optional[Task], new: Optional[Task]) -> None:
+        ops = []
+        if old is not None:
+            ops.append(("-", old.id, old.title, old.description))
+        if new is not None:
+            ops.append(("+", new.id, new.title, new.description))
+        if self._search is not None:
+            self._search.apply(ops)
+        if self._log_search:
+            self._search_ops += ops
+
+    def _touch(self, *days: date) -> None:
+        self._changes += 1
+        for day in days:
+            self._day_versions[day] = self._changes
+
+    def _touch_task(self, old: Optional[Task], new: Optional[Task]) -> None:
+        # A series spans every day it repeats on, so changing one drops all
+        # cached views, except for a per-occurrence change to its rule.
+        if all(t is None or t.recurrence is None for t in (old, new)):
+            self._touch(*(t.task_date for t in (old, new) if t is not None))
+            return
+        if old is not None and new is not None and old.recurrence and new.recurrence:
+            days = old.recurrence.changed_days(new.recurrence)
+            if days is not None and replace(old, recurrence=None) == replace(new, recurrence=None):
+                self._touch(*days)
+                return
+        self._epoch += 1
+
+    def day_version(self, day: date) -> tuple[int, int]:
+        return self._epoch, self._day_versions.get(day, 0)
+
+    def window_version(self, start: date, end: date) -> tuple[int, int]:
+        if (end - start).days + 1 <= len(self._day_versions):
+            versions = (self._day_versions.get(start + timedelta(days=i), 0) for i in range((end - start).days + 1))
+        else:
+            versions = (v for d, v in self._day_versions.items() if start <= d <= end)
+        return self._epoch, max(versions, default=0)
+
+    def _index(self, task: Task) -> None:
+        if task.recurrence is not None:
+            self._series[task.id] = task
+        else:
+            insort(self._date_index, (task.task_date, task.id))
+
+    def _unindex(self, task: Task) -> None:
+        if task.recurrence is not None:
+            del self._series[task.id]
+            return
+        key = (task.task_date, task.id)
+        del self._date_index[bisect_left(self._date_index, key)]
 
     def load_tasks(self) -> list[Task]:
+        from todo import codec
+
         if not self.filename.exists():
             return []
         try:
-            with self.filename.open("r", encoding="utf-8") as f:
-                content = f.read().strip()
-                if not content:
-                    return []
+            with trace.span("read"), self.filename.open("rb") as f:
+                content = f.read()
+            trace.count("bytes_read", len(content))
+            if not content.strip():
+                return []
+            with trace.span("parse"):
                 data = json.loads(content)
-                return [Task.from_dict(item) for item in data]
-        except json.JSONDecodeError:
-            return []
+            with trace.span("decode"):
+                last_id, tasks = codec.loads(data)
+            self._last_id = max(self._last_id, last_id)
+            trace.count("tasks_loaded", len(tasks))
+            return tasks
+        except ValueError as e:  # JSON and Unicode errors, unknown formats
+            raise TaskFileError(f"{self.filename} is corrupt: {e}") from e
     
+    def _snapshot_data(self) -> str:
+        from todo import codec
+
+        with trace.span("encode"):
+            return codec.dumps(self._last_id, codec.encode_tasks(self._tasks.values()))
+
     def save_tasks(self) -> None:
-        with self.filename.open('w', encoding="utf-8") as f:
-            json.dump([t.to_dict() for t in self.tasks], f, indent=2)
+        with trace.span("save"):
+            data = self._snapshot_data()
+            atomic_write(self.filename, lambda f: f.write(data), durable=self.durable)
+
+    # Persistence hooks, called after every mutation. Backends that don't
+    # rewrite the whole file (see todo.journal) override these.
+    def _persist(self) -> None:
+        if self._in_transaction:
+            self._dirty = True
+        else:
+            self.save_tasks()
+
+    def _persist_add(self, task: Task) -> None:
+        self._persist()
+
+    def _persist_update(self, task: Task, changes: dict) -> None:
+        self._persist()
+
+    def _persist_delete(self, task: Task) -> None:
+        self._persist()
 
     def _next_id(self) -> int:
-        if not self.tasks:
-            return 1
-        return max(task.id for task in self.tasks) + 1
+        return self._last_id + 1
     
     def add_task(
         self,
         title: str,
         task_date: date,
-        description: Optional[str] = None
+        description: Optional[str] = None,
+        recurrence: Optional[Recurrence] = None
     ) -> Task:
-        task = Task(
-        id=self._next_id(),
-        title=title,
-        task_date=task_date,
-        description=description,
-        created_at=datetime.now()
-        )
-        self.tasks.append(task)
-        self.save_tasks()
+        with self._locked():
+            task = Task(
+            id=self._next_id(),
+            title=title,
+            task_date=task_date,
+            description=description,
+            created_at=datetime.now(),
+            recurrence=recurrence
+            )
+            self._tasks[task.id] = task
+            self._last_id = task.id
+            self._index(task)
+            self._touch_task(None, task)
+            self._reindex(None, task)
+            self._persist_add(task)
         return task
     
     def get_task(self, task_id: int) -> Optional[Task]:
-        return next((t for t in self.tasks if t.id == task_id), None)
+        return self._tasks.get(task_id)
+
+    def insert_tasks(self, tasks: Iterable[Task]) -> int:
+        # Stores tasks that already have ids (moved from elsewhere, or
+        # imported), replacing any task with the same id, in one write.
+        if not self._in_transaction:
+            with self.transaction():
+                return self.insert_tasks(tasks)
+        keys = []
+        count = 0
+        for task in tasks:
+            old = self._tasks.get(task.id)
+            if old is not None:
+                self._unindex(old)
+                self._touch_task(old, None)
+                self._reindex(old, None)
+            self._tasks[task.id] = task
+            self._last_id = max(self._last_id, task.id)
+            if task.recurrence is not None:
+                self._series[task.id] = task
+            else:
+                keys.append((task.task_date, task.id))
+            self._touch_task(None, task)
+            self._reindex(None, task)
+            self._persist_add(task)
+            count += 1
+        if len(keys) <= INSORT_MAX:
+            for key in keys:
+                insort(self._date_index, key)
+        else:
+            # Two sorted runs: timsort merges them in one pass
+            keys.sort()
+            self._date_index += keys
+            self._date_index.sort()
+        return count
     
     def update_task(
         self,
@@ -94,34 +492,159 @@ class TaskStorage:
         title: Optional[str] = None,
         task_date: Optional[date] = None,
         description: Optional[str] = None,
-        status: Optional[Status] = None
+        status: Optional[Status] = None,
+        recurrence: Optional[Recurrence] = None
     ) -> Optional[Task]:
-        task = self.get_task(task_id)
-        if not task:
-            return None
-        if title is not None:
-            task.title = title
-        if task_date is not None:
-            task.task_date = task_date
-        if description is not None:
-            task.description = description
-        if status is not None:
-            task.status = status
-        self.save_tasks()
+        with self._locked():
+            task = self.get_task(task_id)
+            if not task:
+                return None
+            changes = {}
+            if title is not None:
+                changes["title"] = title
+            if task_date is not None:
+                changes["task_date"] = task_date
+            if description is not None:
+                changes["description"] = description
+            if status is not None:
+                changes["status"] = status
+            if recurrence is not None:
+                changes["recurrence"] = recurrence
+            old = replace(task)
+            for name, value in changes.items():
+                setattr(task, name, value)
+            if (old.task_date, old.recurrence is None) != (task.task_date, task.recurrence is None):
+                self._unindex(old)
+                self._index(task)
+            self._touch_task(old, task)
+            if title is not None or description is not None:
+                self._reindex(old, task)
+            self._persist_update(task, changes)
         return task
+
+    def update_occurrence(
+        self,
+        task_id: int,
+        day: date,
+        status: Optional[Status] = None,
+        skip: bool = False
+    ) -> Optional[Task]:
+        # Marks one occurrence of a series done/canceled, or leaves it out
+        # (skip). None unless the task repeats on `day`.
+        with self._locked():
+            task = self.get_task(task_id)
+            if task is None or task.recurrence is None or not task.recurrence.occurs_on(task.task_date, day):
+                return None
+            return self.update_task(task_id, recurrence=task.recurrence.with_occurrence(day, status, skip))
     
     def delete_task(self, task_id: int) -> bool:
-        task = self.get_task(task_id)
-        if not task:
-            return False
-        self.tasks.remove(task)
-        self.save_tasks()
+        with self._locked():
+            task = self._tasks.pop(task_id, None)
+            if not task:
+                return False
+            self._unindex(task)
+            self._touch_task(task, None)
+            self._reindex(task, None)
+            self._persist_delete(task)
         return True
     
+    def delete_tasks(self, task_ids: Iterable[int]) -> int:
+        # delete_task for many tasks at once: one pass over the date index
+        # and one write, instead of one of each per task
+        if not self._in_transaction:
+            with self.transaction():
+                return self.delete_tasks(task_ids)
+        removed = [task for i in task_ids if (task := self._tasks.pop(i, None)) is not None]
+        gone = {task.id for task in removed}
+        self._date_index = [key for key in self._date_index if key[1] not in gone]
+        for task in removed:
+            self._series.pop(task.id, None)
+            self._touch_task(task, None)
+            self._reindex(task, None)
+            self._persist_delete(task)
+        return len(removed)
+
     def list_tasks(self, status: Optional[Status] = None, task_date: Optional[date] = None) -> list[Task]:
-        result = self.tasks
-        if status:
-            result = [t for t in result if t.status == status]
         if task_date:
-            result = [t for t in result if t.task_date == task_date]
-        return sorted(result, key = lambda t: t.task_date)
\ No newline at end of file
+            return self.tasks_between(task_date, task_date, status)
+        return list(self.iter_tasks(status=status))
+
+    def tasks_between(self, start: date, end: date, status: Optional[Status] = None) -> list[Task]:
+        lo = bisect_left(self._date_index, (start,))
+        hi = bisect_left(self._date_index, (end + timedelta(days=1),), lo)
+        return self._with_occurrences(self._collect(self._date_index[lo:hi], status), start, end, status)
+
+    def _with_occurrences(self, tasks: list[Task], start: date, end: date, status: Optional[Status]) -> list[Task]:
+        if not self._series:
+            return tasks
+        return list(merge(tasks, occurrences_between(self._series.values(), start, end, status), key=_order))
+
+    def iter_tasks(
+        self,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        status: Optional[Status] = None,
+        after: Optional[tuple[date, int]] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> Iterator[Task]:
+        # Tasks in (task_date, id) order, produced one at a time so callers
+        # that stop early never pay for the rest. `after` is a keyset cursor:
+        # the (task_date, id) of the last task already seen.
+        tasks = self._iter_index(start, end, status, after)
+        if self._series:
+            tasks = merge(tasks, series_rows(self._series.values(), start, end, status, after), key=_order)
+        return islice(tasks, offset, None if limit is None else offset + limit)
+
+    def _iter_index(
+        self,
+        start: Optional[date],
+        end: Optional[date],
+        status: Optional[Status],
+        after: Optional[tuple[date, int]],
+    ) -> Iterator[Task]:
+        index, tasks = self._date_index, self._tasks
+        lo = bisect_right(index, after) if after else 0
+        if start:
+            lo = max(lo, bisect_left(index, (start,)))
+        hi = bisect_left(index, (end + timedelta(days=1),), lo) if end else len(index)
+        for i in range(lo, hi):
+            task = tasks[index[i][1]]
+            if status is None or task.status == status:
+                yield task
+
+    @property
+    def search_file(self) -> Path:
+        return self.filename.with_name(self.filename.name + ".index")
+
+    def search(self, query: str, limit: Optional[int] = 20) -> list[Task]:
+        from todo.search import SearchIndex
+
+        with self._locked():
+            if self._search is None:
+                # Reuse the saved index if it's current; otherwise rebuild
+                # it once and save it for the next process.
+                index = SearchIndex.load(self.search_file, repr(self._seen))
+                self._search = index or SearchIndex.build(self.tasks)
+            if self._search.dirty:
+                self._search.save(self.search_file, repr(self._seen))
+            hits = self._search.search(query, limit)
+        return self._fetch([task_id for task_id, _ in hits])
+
+    def _fetch(self, ids: list[int]) -> list[Task]:
+        return [self.get_task(task_id) for task_id in ids]
+
+    def date_ordinals(self, start: date, end: date) -> list[int]:
+        # Just the dates, for per-day counting without touching the tasks
+        lo = bisect_left(self._date_index, (start,))
+        hi = bisect_left(self._date_index, (end + timedelta(days=1),), lo)
+        return [day.toordinal() for day, _ in self._date_index[lo:hi]] + self._occurrence_ordinals(start, end)
+
+    def _occurrence_ordinals(self, start: date, end: date) -> list[int]:
+        return [t.task_date.toordinal() for t in occurrences_between(self._series.values(), start, end)]
+
+    def _collect(self, keys: list[tuple[date, int]], status: Optional[Status]) -> list[Task]:
+        tasks = self._tasks
+        if status:
+            return [tasks[i] for _, i in keys if tasks[i].status == status]
+        return [tasks[i] for _, i in keys]
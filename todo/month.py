@@ -1,6 +1,7 @@
 from datetime import date
 from calendar import monthrange
 from collections.abc import Sequence
+from functools import lru_cache
 
 from todo.models import Task
 
@@ -17,15 +18,25 @@ HEAT_COLORS = [
     "\033[1;32m",   # bright green
 ]
 
+# HEAT_LEVELS[n] is the HEAT_COLORS index for n tasks (n capped at 255), as
+# a bytes.translate table so whole runs of counts are bucketed in one call
+HEAT_LEVELS = bytes([0, 1, 2, 2] + [3] * 252)
+
 def _heat_color(count: int) -> str:
-    if count == 0:
-        return HEAT_COLORS[0]
-    if count == 1:
-        return HEAT_COLORS[1]
-    if 2 <= count <= 3:
-        return HEAT_COLORS[2]
-    else:
-        return HEAT_COLORS[3]
+    return HEAT_COLORS[HEAT_LEVELS[min(count, 255)]]
+
+def heat_levels(counts: Sequence[int]) -> bytes:
+    return bytes(min(c, 255) for c in counts).translate(HEAT_LEVELS)
+
+@lru_cache(maxsize=1024)
+def _day_cell(day: int, level: int, color_enabled: bool) -> str:
+    day_str = f"{day:>3}"
+    if color_enabled and level > 0:
+        return f"{HEAT_COLORS[level]}{day_str}{RESET}"
+    return day_str
+
+def month_bounds(year: int, month: int) -> tuple[date, date]:
+    return date(year, month, 1), date(year, month, monthrange(year, month)[1])
 
 def render_month(
     tasks: Sequence[Task],
@@ -34,13 +45,18 @@ def render_month(
     color_enabled: bool = True
 ) -> str:
     
-    first_weekday, days_in_month = monthrange(year,month)
+    days_in_month = monthrange(year, month)[1]
     # Map task count per day
-    day_task_cnt = {day: 0 for day in range(1,days_in_month+1)}
+    day_task_cnt = [0] * days_in_month
     for task in tasks:
         if task.task_date.year == year and task.task_date.month == month:
-            day_task_cnt[task.task_date.day] += 1
-    
+            day_task_cnt[task.task_date.day - 1] += 1
+
+    return "\n".join(month_lines(year, month, heat_levels(day_task_cnt), color_enabled))
+
+def month_lines(year: int, month: int, levels: bytes, color_enabled: bool = True) -> list[str]:
+    # `levels` holds the heat level of each day of the month, first day first
+    first_weekday, days_in_month = monthrange(year, month)
     lines = []
     # Header
     lines.append(f"{date(year,month,1):%B %Y}")
@@ -49,16 +65,7 @@ def render_month(
     # Dates
     current_week = ["   "] * first_weekday
     for day in range(1, days_in_month+1):
-        cnt = day_task_cnt[day]
-        day_str = f"{day:>3}"
-
-        if color_enabled and cnt > 0:
-            color = _heat_color(cnt)
-            cell = f"{color}{day_str}{RESET}"
-        else:
-            cell = f"{day_str}"
-        
-        current_week.append(cell)
+        current_week.append(_day_cell(day, levels[day - 1], color_enabled))
 
         if len(current_week) == 7:
             lines.append(" ".join(current_week))
@@ -68,4 +75,4 @@ def render_month(
         current_week += ["   "] * (7-len(current_week))
         lines.append(" ".join(current_week))
 
-    return "\n".join(lines)
\ No newline at end of file
+    return lines
\ No newline at end of file
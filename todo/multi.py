@@ -0,0 +1,228 @@
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from copy import copy
+from datetime import date
+from heapq import merge
+from itertools import chain, islice, zip_longest
+from operator import attrgetter
+from pathlib import Path
+from typing import Optional, Union
+import sys
+
+from todo.models import Recurrence, Status, Task
+
+SEPARATOR = ":"
+
+# A task id as given on the command line: 12, or team:12 for a task of the
+# source named "team"
+TaskId = Union[int, str]
+
+_task_date = attrgetter("task_date")
+
+
+def split_id(task_id: TaskId) -> tuple[Optional[str], int]:
+    if isinstance(task_id, int):
+        return None, task_id
+    name, _, number = task_id.rpartition(SEPARATOR)
+    return name or None, int(number)
+
+
+# One combined view over several task files ("sources"), each opened with
+# its own backend. Queries go to every source at once on a thread pool and
+# their results, each already in (task_date, id) order, are merged on
+# task_date; ties keep source order. Tasks come back with ids namespaced by
+# their source (team:12), and single-task commands are routed by that
+# prefix; a bare id refers to the first source.
+class MultiTaskStorage:
+    def __init__(self, sources: dict[str, object], pool: Optional[ThreadPoolExecutor] = None) -> None:
+        if not sources:
+            raise ValueError("No task sources")
+        self.sources = sources
+        self.default = next(iter(sources))
+        self._pool = pool
+
+    def _each(self, query: Callable[..., object], *args: Iterable) -> list:
+        # query(storage, *per-source args) for every source, concurrently,
+        # in source order
+        if len(self.sources) == 1:
+            return list(map(query, self.sources.values(), *args))
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=len(self.sources))
+        return list(self._pool.map(query, self.sources.values(), *args))
+
+    def source(self, name: Optional[str] = None):
+        if name is None:
+            name = self.default
+        if name not in self.sources:
+            raise ValueError(f"Unknown task source {name!r}; configured: {', '.join(self.sources)}")
+        return self.sources[name]
+
+    def _route(self, task_id: TaskId) -> tuple[Optional[str], object, int]:
+        name, local_id = split_id(task_id)
+        name = name or self.default
+        return name, self.sources.get(name), local_id
+
+    @staticmethod
+    def _name(name: str, task: Optional[Task]) -> Optional[Task]:
+        if task is None:
+            return None
+        return Task(f"{name}{SEPARATOR}{task.id}", task.title, task.created_at, task.task_date,
+                    task.status, task.description, task.recurrence)
+
+    @staticmethod
+    def _named(name: str, tasks: Iterable[Task]) -> Iterator[Task]:
+        # A copy per task (the backend's own may be its cached one), built
+        # directly: dataclasses.replace costs several times as much
+        prefix = name + SEPARATOR
+        for t in tasks:
+            yield Task(prefix + str(t.id), t.title, t.created_at, t.task_date, t.status, t.description, t.recurrence)
+
+    def _merged(self, results: list[Iterable[Task]]) -> Iterator[Task]:
+        return merge(*(self._named(name, r) for name, r in zip(self.sources, results)), key=_task_date)
+
+    # TRANSACTIONS
+
+    @contextmanager
+    def transaction(self) -> Iterator["MultiTaskStorage"]:
+        with ExitStack() as stack:
+            for storage in self.sources.values():
+                stack.enter_context(storage.transaction())
+            yield self
+
+    def refresh(self) -> None:
+        for storage in self.sources.values():
+            if hasattr(storage, "refresh"):
+                storage.refresh()
+
+    def close(self) -> None:
+        for storage in self.sources.values():
+            if hasattr(storage, "close"):
+                storage.close()
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    # READS
+
+    @property
+    def tasks(self) -> list[Task]:
+        return list(chain.from_iterable(
+            self._named(name, tasks) for name, tasks in zip(self.sources, self._each(attrgetter("tasks")))
+        ))
+
+    def get_task(self, task_id: TaskId) -> Optional[Task]:
+        name, storage, local_id = self._route(task_id)
+        return self._name(name, storage.get_task(local_id)) if storage is not None else None
+
+    def list_tasks(self, status: Optional[Status] = None, task_date: Optional[date] = None) -> list[Task]:
+        if task_date:
+            return self.tasks_between(task_date, task_date, status)
+        return list(self.iter_tasks(status=status))
+
+    def tasks_between(self, start: date, end: date, status: Optional[Status] = None) -> list[Task]:
+        return list(self._merged(self._each(lambda s: s.tasks_between(start, end, status))))
+
+    def iter_tasks(
+        self,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        status: Optional[Status] = None,
+        after: Optional[tuple[date, TaskId]] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        archived: bool = False,
+    ) -> Iterator[Task]:
+        stop = None if limit is None else offset + limit
+        # Only the sources' ArchivedStorage knows the flag
+        extra = {"archived": True} if archived else {}
+        # The merged order is (task_date, source, id), so a cursor in one
+        # source means: on its day, all of the sources before it are done
+        # and none of the ones after it are
+        cursors = [None] * len(self.sources)
+        if after is not None:
+            day, task_id = after
+            name, local_id = split_id(task_id)
+            self.source(name)  # an unknown source is an error, not a position
+            position = list(self.sources).index(name or self.default)
+            cursors = [
+                (day, sys.maxsize if i < position else local_id if i == position else 0)
+                for i in range(len(self.sources))
+            ]
+        results = self._each(lambda s, cursor: s.iter_tasks(start, end, status, cursor, 0, stop, **extra), cursors)
+        return islice(self._merged(results), offset, stop)
+
+    def date_ordinals(self, start: date, end: date) -> list[int]:
+        return list(chain.from_iterable(self._each(lambda s: s.date_ordinals(start, end))))
+
+    def search(self, query: str, limit: Optional[int] = 20) -> list[Task]:
+        # Rankings of different sources aren't comparable; take their best
+        # hits in turn
+        results = self._each(lambda s, name: list(self._named(name, s.search(query, limit))), self.sources)
+        hits = (t for t in chain.from_iterable(zip_longest(*results)) if t is not None)
+        return list(islice(hits, limit))
+
+    def window_version(self, start: date, end: date) -> tuple:
+        return tuple(s.window_version(start, end) for s in self.sources.values())
+
+    def day_version(self, day: date) -> tuple:
+        return tuple(s.day_version(day) for s in self.sources.values())
+
+    # MUTATIONS
+
+    def add_task(
+        self,
+        title: str,
+        task_date: date,
+        description: Optional[str] = None,
+        recurrence: Optional[Recurrence] = None,
+        source: Optional[str] = None,
+    ) -> Task:
+        name = source or self.default
+        return self._name(name, self.source(name).add_task(title, task_date, description, recurrence))
+
+    def update_task(
+        self,
+        task_id: TaskId,
+        title: Optional[str] = None,
+        task_date: Optional[date] = None,
+        description: Optional[str] = None,
+        status: Optional[Status] = None,
+        recurrence: Optional[Recurrence] = None
+    ) -> Optional[Task]:
+        name, storage, local_id = self._route(task_id)
+        if storage is None:
+            return None
+        return self._name(name, storage.update_task(local_id, title, task_date, description, status, recurrence))
+
+    def update_occurrence(
+        self,
+        task_id: TaskId,
+        day: date,
+        status: Optional[Status] = None,
+        skip: bool = False
+    ) -> Optional[Task]:
+        name, storage, local_id = self._route(task_id)
+        if storage is None:
+            return None
+        return self._name(name, storage.update_occurrence(local_id, day, status, skip))
+
+    def delete_task(self, task_id: TaskId) -> bool:
+        _, storage, local_id = self._route(task_id)
+        return storage is not None and storage.delete_task(local_id)
+
+
+def open_sources(config) -> MultiTaskStorage:
+    # Each source gets the configured backend (and archive), as if it were
+    # the only task file; they're opened, and so loaded, concurrently
+    from todo.storage import open_storage
+
+    def open_one(path: Path):
+        source = copy(config)
+        source.sources = {}
+        source.task_file = path
+        return open_storage(source)
+
+    pool = ThreadPoolExecutor(max_workers=len(config.sources))
+    storages = list(pool.map(open_one, config.sources.values()))
+    return MultiTaskStorage(dict(zip(config.sources, storages)), pool)
@@ -0,0 +1,92 @@
+from collections import OrderedDict
+from collections.abc import Callable
+from datetime import date, timedelta
+from weakref import WeakKeyDictionary
+
+from todo import trace
+from todo.models import Task
+from todo.month import month_bounds, render_month
+from todo.week import assemble_week, day_column, week_bounds
+
+MAX_VIEWS = 32
+
+
+# Rendered week/month views, keyed by what they show and validated against
+# the storage's change versions (see TaskStorage.window_version). A week
+# whose days were not touched is served as-is; otherwise only the day
+# columns whose own version moved are rebuilt.
+class ViewCache:
+    def __init__(self, storage, max_views: int = MAX_VIEWS) -> None:
+        self.storage = storage
+        self.max_views = max_views
+        self._views: OrderedDict[tuple, tuple[tuple, str]] = OrderedDict()
+        # (day, color_enabled, is_today) -> (day version, column lines)
+        self._columns: dict[tuple, tuple[tuple, list[str]]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.columns_rendered = 0
+
+    def _cached(self, key: tuple, version: tuple, render: Callable[[], str]) -> str:
+        entry = self._views.get(key)
+        if entry is not None and entry[0] == version:
+            self._views.move_to_end(key)
+            self.hits += 1
+            trace.count("view_cache_hits")
+            return entry[1]
+        self.misses += 1
+        with trace.span(f"render {key[0]}"):
+            text = render()
+        self._views[key] = (version, text)
+        self._views.move_to_end(key)
+        while len(self._views) > self.max_views:
+            self._views.popitem(last=False)
+        return text
+
+    def week(self, reference_date: date, color_enabled: bool = True, show_header: bool = True) -> str:
+        monday, sunday = week_bounds(reference_date)
+        today = date.today()
+        key = ("week", monday, color_enabled, show_header, today)
+        version = self.storage.window_version(monday, sunday)
+        return self._cached(key, version, lambda: self._render_week(monday, color_enabled, show_header, today))
+
+    def _render_week(self, monday: date, color_enabled: bool, show_header: bool, today: date) -> str:
+        days = [monday + timedelta(days=i) for i in range(7)]
+        keys = [(day, color_enabled, day == today) for day in days]
+        versions = [self.storage.day_version(day) for day in days]
+        stale = [
+            day for day, key, version in zip(days, keys, versions)
+            if (entry := self._columns.get(key)) is None or entry[0] != version
+        ]
+        if stale:
+            by_day: dict[date, list[Task]] = {day: [] for day in stale}
+            for task in self.storage.tasks_between(min(stale), max(stale)):
+                if task.task_date in by_day:
+                    by_day[task.task_date].append(task)
+            if len(self._columns) > self.max_views * 7:
+                self._columns.clear()
+            for day, key, version in zip(days, keys, versions):
+                if day in by_day:
+                    self._columns[key] = (version, day_column(day, by_day[day], color_enabled, today))
+                    self.columns_rendered += 1
+        return assemble_week([self._columns[key][1] for key in keys], monday, show_header)
+
+    def month(self, year: int, month: int, color_enabled: bool = True) -> str:
+        first, last = month_bounds(year, month)
+        key = ("month", year, month, color_enabled)
+        version = self.storage.window_version(first, last)
+        return self._cached(
+            key, version,
+            lambda: render_month(self.storage.tasks_between(first, last), year, month, color_enabled=color_enabled),
+        )
+
+
+_caches: "WeakKeyDictionary[object, ViewCache]" = WeakKeyDictionary()
+
+
+def view_cache(storage) -> ViewCache:
+    # One cache per storage object, so a resident storage (daemon, watch
+    # mode) keeps its rendered views between commands.
+    cache = _caches.get(storage)
+    if cache is None:
+        cache = _caches[storage] = ViewCache(storage)
+    return cache
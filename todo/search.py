@@ -0,0 +1,318 @@
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from heapq import nsmallest
+from itertools import chain
+from math import log
+from pathlib import Path
+from typing import Optional
+import json
+import mmap
+import re
+import struct
+
+from todo.fileio import atomic_write
+from todo.models import Task
+
+VERSION = 2
+MAGIC = b"TIDX"
+TOKEN = re.compile(r"[^\W_]+")
+TITLE_WEIGHT = 2
+PREFIX_BOOST = 0.5  # a prefix match counts half as much as the whole word
+LOG_COMPACT_ENTRIES = 1000  # rewrite the saved index once its log is this long
+
+# A change to the index: ("+" or "-", task id, title, description)
+Op = tuple[str, int, Optional[str], Optional[str]]
+
+
+def tokenize(text: Optional[str]) -> list[str]:
+    return TOKEN.findall(text.lower()) if text else []
+
+
+def _terms(title: Optional[str], description: Optional[str]) -> Counter:
+    terms = Counter()
+    for token in tokenize(title):
+        terms[token] += TITLE_WEIGHT
+    for token in tokenize(description):
+        terms[token] += 1
+    return terms
+
+
+def _prefix_end(prefix: str) -> str:
+    # Smallest string greater than every string starting with `prefix`
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def log_path(path: Path) -> Path:
+    return path.with_name(path.name + ".log")
+
+
+def append_log(path: Path, from_stamp: str, to_stamp: str, ops: list[Op]) -> None:
+    # Written by every process that changes tasks, so the saved index stays
+    # usable without each of them loading and rewriting it. Must be called
+    # with the task file lock held.
+    entry = {"from": from_stamp, "to": to_stamp, "ops": ops}
+    with log_path(path).open("a", encoding="utf-8") as f:
+        f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+
+def _read_log(path: Path) -> Iterator[dict]:
+    if not path.exists():
+        return
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # Torn final write
+                return
+
+
+# The saved index, mmapped, so a search reads the token table and the
+# postings of just the tokens its words expand to instead of parsing all
+# of it. Native byte order: it's a cache of this machine's.
+#
+#   header: magic, version, stamp length, task count, token count
+#   stamp (utf-8), padded to 8 bytes
+#   token ends:    uint64 * (tokens + 1), offsets into the token text
+#   postings ends: uint64 * (tokens + 1), in (id, weight) pairs
+#   postings:      int64 pairs, token by token
+#   token text:    utf-8, tokens in sorted order
+HEADER = struct.Struct("=4sIIqQ")
+
+
+def _padded(n: int) -> int:
+    return (n + 7) & ~7
+
+
+class SavedPostings:
+    def __init__(self, mm: mmap.mmap, start: int, count: int) -> None:
+        self._mm = mm
+        self._count = count
+        view = memoryview(mm)
+        ends = start + 8 * (count + 1)
+        self._token_ends = view[start:ends].cast("Q")
+        self._postings_ends = view[ends:ends + 8 * (count + 1)].cast("Q")
+        pairs_start = ends + 8 * (count + 1)
+        text_start = pairs_start + 16 * self._postings_ends[count]
+        self._pairs = view[pairs_start:text_start].cast("q")
+        self._text = view[text_start:]
+        if len(self._text) != self._token_ends[count]:
+            raise ValueError("truncated index")
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, i: int) -> str:
+        # Token i, so that bisect can search the table in place
+        lo = self._token_ends[i - 1] if i else 0
+        return str(self._text[lo:self._token_ends[i]], "utf-8")
+
+    def between(self, lo: str, hi: str) -> list[str]:
+        first = bisect_left(self, lo)
+        return [self[i] for i in range(first, bisect_left(self, hi, first))]
+
+    def get(self, token: str) -> Optional[dict[int, int]]:
+        i = bisect_left(self, token)
+        if i == self._count or self[i] != token:
+            return None
+        lo = 2 * (self._postings_ends[i - 1] if i else 0)
+        pairs = iter(self._pairs[lo:2 * self._postings_ends[i]])
+        return dict(zip(pairs, pairs))
+
+    def __iter__(self) -> Iterator[str]:
+        return (self[i] for i in range(self._count))
+
+
+# token -> {task id: weight}, plus the tokens in sorted order so that a query
+# word is expanded to every token it prefixes with two bisects. Kept in step
+# with the tasks by TaskStorage's add/update/delete_task.
+#
+# On disk: a snapshot stamped with the task file signature it was built for,
+# and a log of changes, each taking one stamp to the next. The index is good
+# as long as that chain of stamps leads to the task file as it is now.
+#
+# Loaded from disk, `postings` only holds the tokens changed since (an empty
+# dict shadows a token gone from the snapshot); the rest are read from the
+# snapshot when a query gets to them.
+class SearchIndex:
+    def __init__(self, saved: Optional[SavedPostings] = None) -> None:
+        self.postings: dict[str, dict[int, int]] = {}
+        self._saved = saved
+        self._tokens: list[str] = []  # tokens of `postings` with any
+        self._size = 0
+        # Set when the saved snapshot and log don't (efficiently) cover it
+        self.dirty = False
+
+    @classmethod
+    def build(cls, tasks: Iterable[Task]) -> "SearchIndex":
+        # _terms() inlined: this runs once per task over the whole history
+        index = cls()
+        postings = index.postings
+        findall = TOKEN.findall
+        for task in tasks:
+            task_id = task.id
+            for text, weight in ((task.title, TITLE_WEIGHT), (task.description, 1)):
+                if not text:
+                    continue
+                for token in findall(text.lower()):
+                    ids = postings.get(token)
+                    if ids is None:
+                        ids = postings[token] = {}
+                    ids[task_id] = ids.get(task_id, 0) + weight
+            index._size += 1
+        index._tokens = sorted(postings)
+        index.dirty = True
+        return index
+
+    def _get(self, token: str) -> Optional[dict[int, int]]:
+        postings = self.postings.get(token)
+        if postings is None and self._saved is not None:
+            return self._saved.get(token)
+        return postings
+
+    def _writable(self, token: str, create: bool = True) -> Optional[dict[int, int]]:
+        postings = self.postings.get(token)
+        if postings is None:
+            saved = self._saved.get(token) if self._saved is not None else None
+            if saved is None and not create:
+                return None
+            postings = self.postings[token] = saved or {}
+            if saved:
+                insort(self._tokens, token)
+        return postings
+
+    def add(self, task_id: int, title: Optional[str], description: Optional[str]) -> None:
+        for token, weight in _terms(title, description).items():
+            postings = self._writable(token)
+            if not postings:
+                insort(self._tokens, token)
+            postings[task_id] = weight
+        self._size += 1
+
+    def remove(self, task_id: int, title: Optional[str], description: Optional[str]) -> None:
+        for token in _terms(title, description):
+            postings = self._writable(token, create=False)
+            if not postings:
+                continue
+            postings.pop(task_id, None)
+            if not postings:
+                del self._tokens[bisect_left(self._tokens, token)]
+                if self._saved is None:
+                    del self.postings[token]
+        self._size -= 1
+
+    def apply(self, ops: Iterable[Op]) -> None:
+        for op, task_id, title, description in ops:
+            if op == "+":
+                self.add(task_id, title, description)
+            else:
+                self.remove(task_id, title, description)
+
+    def _expand(self, word: str) -> list[str]:
+        end = _prefix_end(word)
+        lo = bisect_left(self._tokens, word)
+        tokens = self._tokens[lo:bisect_left(self._tokens, end, lo)]
+        if self._saved is not None:
+            tokens = sorted(tokens + [t for t in self._saved.between(word, end) if t not in self.postings])
+        return tokens
+
+    def _score(self, word: str) -> dict[int, float]:
+        scores: dict[int, float] = {}
+        for token in self._expand(word):
+            postings = self._get(token)
+            idf = log(1 + self._size / len(postings))
+            if token != word:
+                idf *= PREFIX_BOOST
+            for task_id, weight in postings.items():
+                scores[task_id] = scores.get(task_id, 0.0) + weight * idf
+        return scores
+
+    def search(self, query: str, limit: Optional[int] = 20) -> list[tuple[int, float]]:
+        # Every query word must match a whole token or a token prefix; tasks
+        # are ranked by weight * idf summed over the words, highest first.
+        words = list(dict.fromkeys(tokenize(query)))
+        if not words:
+            return []
+        # Rarest word first, so the candidate set only shrinks from there
+        per_word = sorted((self._score(word) for word in words), key=len)
+        scores = per_word[0]
+        for other in per_word[1:]:
+            scores = {i: s + other[i] for i, s in scores.items() if i in other}
+        order = lambda hit: (-hit[1], hit[0])
+        if limit is None:
+            return sorted(scores.items(), key=order)
+        return nsmallest(limit, scores.items(), key=order)
+
+    # PERSISTENCE
+
+    def _all_tokens(self) -> list[str]:
+        if self._saved is None:
+            return self._tokens
+        return sorted(chain(self._tokens, (t for t in self._saved if t not in self.postings)))
+
+    def save(self, path: Path, stamp: str) -> None:
+        # Must be called with the task file lock held. The index can always
+        # be rebuilt, so it's written without fsync.
+        text = bytearray()
+        token_ends = array("Q", [0])
+        pairs = array("q")
+        postings_ends = array("Q", [0])
+        for token in self._all_tokens():
+            text += token.encode("utf-8")
+            token_ends.append(len(text))
+            pairs.extend(chain.from_iterable(self._get(token).items()))
+            postings_ends.append(len(pairs) // 2)
+        encoded_stamp = stamp.encode("utf-8")
+        header = HEADER.pack(MAGIC, VERSION, len(encoded_stamp), self._size, len(token_ends) - 1)
+        head = header + encoded_stamp
+        head += bytes(_padded(len(head)) - len(head))
+
+        def write(f) -> None:
+            f.write(head)
+            f.write(token_ends.tobytes())
+            f.write(postings_ends.tobytes())
+            f.write(pairs.tobytes())
+            f.write(text)
+
+        atomic_write(path, write, binary=True, durable=False)
+        log_path(path).unlink(missing_ok=True)
+        self.dirty = False
+
+    @classmethod
+    def load(cls, path: Path, stamp: str) -> Optional["SearchIndex"]:
+        # None unless the snapshot and its log lead up to `stamp`
+        try:
+            with open(path, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            # ValueError: an empty file can't be mapped
+            return None
+        try:
+            magic, version, stamp_length, size, count = HEADER.unpack_from(mm)
+            saved_stamp = str(mm[HEADER.size:HEADER.size + stamp_length], "utf-8")
+        except (struct.error, UnicodeDecodeError):
+            return None
+        if magic != MAGIC or version != VERSION:
+            return None
+        entries = 0
+        current = saved_stamp
+        changes = []
+        for entry in _read_log(log_path(path)):
+            entries += 1
+            if entry["from"] == current:
+                changes.append(entry["ops"])
+                current = entry["to"]
+        if current != stamp:
+            return None
+
+        try:
+            index = cls(SavedPostings(mm, _padded(HEADER.size + stamp_length), count))
+        except (ValueError, TypeError, IndexError):
+            return None
+        index._size = size
+        for ops in changes:
+            index.apply(ops)
+        index.dirty = entries >= LOG_COMPACT_ENTRIES
+        return index
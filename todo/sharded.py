@@ -0,0 +1,398 @@
+from bisect import bisect_right
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import ExitStack, contextmanager
+from dataclasses import replace
+from datetime import date, datetime
+from heapq import merge
+from itertools import chain, islice
+from pathlib import Path
+from typing import Optional
+import json
+
+from todo import trace
+from todo.fileio import atomic_write, file_lock, file_signature
+from todo.models import Recurrence, Status, Task, TaskFileError, TaskStorage, _order
+
+VERSION = 1
+MANIFEST = "manifest.json"
+
+# Shard key for a task date. Keys sort like the dates they cover, so the
+# shards of a window are those with key(start) <= key <= key(end).
+GRANULARITIES: dict[str, Callable[[date], str]] = {
+    "week": lambda d: "{:04d}-W{:02d}".format(*d.isocalendar()[:2]),
+    "month": lambda d: f"{d.year:04d}-{d.month:02d}",
+    "year": lambda d: f"{d.year:04d}",
+}
+
+# Ids held by a shard, as sorted [first, last] runs. Ids are handed out in
+# increasing order, so a shard's runs stay few and short.
+Runs = list[list[int]]
+
+
+def _add_id(runs: Runs, task_id: int) -> None:
+    i = bisect_right(runs, [task_id, float("inf")])
+    if i and runs[i - 1][1] >= task_id - 1:
+        runs[i - 1][1] = max(runs[i - 1][1], task_id)
+        if i < len(runs) and runs[i][0] == runs[i - 1][1] + 1:
+            runs[i - 1][1] = runs.pop(i)[1]
+    elif i < len(runs) and runs[i][0] == task_id + 1:
+        runs[i][0] = task_id
+    else:
+        runs.insert(i, [task_id, task_id])
+
+
+def _remove_id(runs: Runs, task_id: int) -> None:
+    i = bisect_right(runs, [task_id, float("inf")]) - 1
+    if i < 0 or runs[i][1] < task_id:
+        return
+    first, last = runs[i]
+    pieces = [[first, task_id - 1]] if first < task_id else []
+    if task_id < last:
+        pieces.append([task_id + 1, last])
+    runs[i:i + 1] = pieces
+
+
+def _has_id(runs: Runs, task_id: int) -> bool:
+    i = bisect_right(runs, [task_id, float("inf")]) - 1
+    return i >= 0 and runs[i][1] >= task_id
+
+
+# Tasks split by date into one regular task file per shard (per month by
+# default) under a directory, plus a manifest of which ids each shard holds.
+# Date-window queries load only the shards the window covers, and a mutation
+# rewrites only the shard(s) holding the task. Recurring series are listed
+# in the manifest too, since their occurrences reach past their own shard.
+#
+# Every mutation runs as a transaction under one lock: the manifest is
+# written first, then the touched shards, so a crash in between can hide a
+# task but never hand its id out again.
+class ShardedTaskStorage:
+    def __init__(self, directory: Path, granularity: str = "month", durable: bool = True) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.manifest_file = self.directory / MANIFEST
+        self.lock_file = self.directory / (MANIFEST + ".lock")
+        self.durable = durable
+        self._shards: dict[str, TaskStorage] = {}
+        self._stack: Optional[ExitStack] = None
+        self._entered: set[str] = set()
+        self._lock_held = False
+        self._manifest_dirty = False
+        self._seen = None
+        self._load_manifest(granularity)
+
+    # MANIFEST
+
+    def _load_manifest(self, granularity: Optional[str] = None) -> None:
+        self._seen = file_signature(self.manifest_file)
+        data = {}
+        if self._seen is not None:
+            try:
+                data = json.loads(self.manifest_file.read_text(encoding="utf-8"))
+            except json.JSONDecodeError as e:
+                raise TaskFileError(f"{self.manifest_file} is corrupt: {e}") from e
+        # An existing layout keeps the granularity it was written with
+        self.granularity = data.get("granularity", granularity or "month")
+        if self.granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown shard granularity: {self.granularity!r}")
+        self.key = GRANULARITIES[self.granularity]
+        self._last_id = data.get("last_id", 0)
+        self._runs: dict[str, Runs] = data.get("shards", {})
+        self._series: dict[int, str] = {int(i): key for i, key in data.get("series", {}).items()}
+
+    def _save_manifest(self) -> None:
+        data = {
+            "version": VERSION,
+            "granularity": self.granularity,
+            "last_id": self._last_id,
+            "shards": dict(sorted(self._runs.items())),
+            "series": {str(i): key for i, key in self._series.items()},
+        }
+        text = json.dumps(data, separators=(",", ":"))
+        atomic_write(self.manifest_file, lambda f: f.write(text), durable=self.durable)
+        self._seen = file_signature(self.manifest_file)
+        self._manifest_dirty = False
+
+    def refresh(self) -> None:
+        with file_lock(self.lock_file):
+            self._refresh()
+
+    def _refresh(self) -> None:
+        if file_signature(self.manifest_file) != self._seen:
+            self._load_manifest()
+        for shard in self._shards.values():
+            shard._refresh()
+
+    # SHARDS
+
+    def _shard(self, key: str) -> TaskStorage:
+        shard = self._shards.get(key)
+        if shard is None:
+            with trace.span("load shard"):
+                shard = self._shards[key] = TaskStorage(self.directory / f"{key}.json", durable=self.durable)
+            trace.count("shards_loaded")
+        return shard
+
+    def _writable(self, key: str) -> TaskStorage:
+        # Joins the shard to the running transaction, so it's written once
+        shard = self._shard(key)
+        if key not in self._entered:
+            self._stack.enter_context(shard.transaction())
+            self._entered.add(key)
+        return shard
+
+    def _key_of(self, task_id: int) -> Optional[str]:
+        for key, runs in self._runs.items():
+            if _has_id(runs, task_id):
+                return key
+        return None
+
+    def _keys_between(self, start: Optional[date], end: Optional[date]) -> list[str]:
+        lo = self.key(start) if start else ""
+        hi = self.key(end) if end else "~"
+        return sorted(key for key in self._runs if lo <= key <= hi)
+
+    def _window_keys(self, start: Optional[date], end: Optional[date]) -> list[str]:
+        # The window's own shards, plus those holding series that started
+        # before it and may repeat into it
+        keys = set(self._keys_between(start, end))
+        hi = self.key(end) if end else "~"
+        keys.update(key for key in self._series.values() if key <= hi)
+        return sorted(keys)
+
+    # TRANSACTIONS
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        if self._lock_held:
+            yield
+            return
+        with file_lock(self.lock_file):
+            self._lock_held = True
+            try:
+                self._refresh()
+                yield
+            finally:
+                self._lock_held = False
+
+    def locked(self):
+        return self._locked()
+
+    @contextmanager
+    def transaction(self) -> Iterator["ShardedTaskStorage"]:
+        if self._stack is not None:
+            yield self
+            return
+        with self._locked():
+            try:
+                with ExitStack() as stack:
+                    self._stack = stack
+                    try:
+                        yield self
+                    except BaseException:
+                        # Make the next lock holder re-read the manifest
+                        self._seen = None
+                        raise
+                    if self._manifest_dirty:
+                        self._save_manifest()
+            finally:
+                self._stack = None
+                self._entered.clear()
+
+    # READS
+
+    @property
+    def tasks(self) -> list[Task]:
+        return self.load_tasks()
+
+    def load_tasks(self) -> list[Task]:
+        return [task for key in sorted(self._runs) for task in self._shard(key).tasks]
+
+    def save_tasks(self) -> None:
+        # Mutations write their shards as they go; this rewrites loaded ones
+        for shard in self._shards.values():
+            shard.save_tasks()
+
+    def _next_id(self) -> int:
+        return self._last_id + 1
+
+    def get_task(self, task_id: int) -> Optional[Task]:
+        key = self._key_of(task_id)
+        return self._shard(key).get_task(task_id) if key else None
+
+    def list_tasks(self, status: Optional[Status] = None, task_date: Optional[date] = None) -> list[Task]:
+        if task_date:
+            return self.tasks_between(task_date, task_date, status)
+        return list(self.iter_tasks(status=status))
+
+    def tasks_between(self, start: date, end: date, status: Optional[Status] = None) -> list[Task]:
+        shards = [self._shard(key).tasks_between(start, end, status) for key in self._window_keys(start, end)]
+        return list(merge(*shards, key=_order))
+
+    def iter_tasks(
+        self,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        status: Optional[Status] = None,
+        after: Optional[tuple[date, int]] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> Iterator[Task]:
+        stop = None if limit is None else offset + limit
+        if end is None:
+            # Unbounded, a series is listed once on its first day, in its own
+            # shard; the shards are already in date order and are loaded
+            # only as the caller gets to them.
+            keys = self._keys_between(after[0] if after and (not start or after[0] > start) else start, None)
+            tasks = chain.from_iterable(
+                self._shard(key).iter_tasks(start, None, status, after) for key in keys
+            )
+        else:
+            tasks = merge(
+                *(self._shard(key).iter_tasks(start, end, status, after) for key in self._window_keys(start, end)),
+                key=_order,
+            )
+        return islice(tasks, offset, stop)
+
+    def date_ordinals(self, start: date, end: date) -> list[int]:
+        ordinals: list[int] = []
+        for key in self._window_keys(start, end):
+            ordinals += self._shard(key).date_ordinals(start, end)
+        return ordinals
+
+    def search(self, query: str, limit: Optional[int] = 20) -> list[Task]:
+        # Built in memory over every shard: per-shard rankings wouldn't be
+        # comparable, and searches are rare next to date-window reads
+        from todo.search import SearchIndex
+
+        hits = SearchIndex.build(self.tasks).search(query, limit)
+        return [self.get_task(task_id) for task_id, _ in hits]
+
+    def window_version(self, start: date, end: date) -> tuple:
+        return self._seen, tuple(self._shard(key).window_version(start, end) for key in self._window_keys(start, end))
+
+    def day_version(self, day: date) -> tuple:
+        return self.window_version(day, day)
+
+    # MUTATIONS
+
+    def _place(self, key: str, tasks: list[Task]) -> None:
+        self._writable(key).insert_tasks(tasks)
+        runs = self._runs.setdefault(key, [])
+        for task in tasks:
+            _add_id(runs, task.id)
+            if task.recurrence is not None:
+                self._series[task.id] = key
+        self._manifest_dirty = True
+
+    def _unplace(self, key: str, task_id: int) -> None:
+        _remove_id(self._runs[key], task_id)
+        self._series.pop(task_id, None)
+        self._manifest_dirty = True
+
+    def add_task(
+        self,
+        title: str,
+        task_date: date,
+        description: Optional[str] = None,
+        recurrence: Optional[Recurrence] = None
+    ) -> Task:
+        with self.transaction():
+            task = Task(
+                id=self._next_id(),
+                title=title,
+                task_date=task_date,
+                description=description,
+                created_at=datetime.now(),
+                recurrence=recurrence,
+            )
+            self._last_id = task.id
+            self._place(self.key(task_date), [task])
+        return task
+
+    def insert_tasks(self, tasks: Iterable[Task]) -> int:
+        # Grouped by shard, so each shard takes its tasks in one insert
+        by_key: dict[str, list[Task]] = {}
+        count = 0
+        with self.transaction():
+            for task in tasks:
+                # Ids above the highest handed out can't be stored yet
+                if task.id <= self._last_id and (key := self._key_of(task.id)) is not None:
+                    self._writable(key).delete_task(task.id)
+                    self._unplace(key, task.id)
+                self._last_id = max(self._last_id, task.id)
+                by_key.setdefault(self.key(task.task_date), []).append(task)
+                count += 1
+            for key, group in by_key.items():
+                self._place(key, group)
+        return count
+
+    def update_task(
+        self,
+        task_id: int,
+        title: Optional[str] = None,
+        task_date: Optional[date] = None,
+        description: Optional[str] = None,
+        status: Optional[Status] = None,
+        recurrence: Optional[Recurrence] = None
+    ) -> Optional[Task]:
+        with self.transaction():
+            key = self._key_of(task_id)
+            if key is None:
+                return None
+            shard = self._writable(key)
+            if task_date is None or self.key(task_date) == key:
+                task = shard.update_task(task_id, title, task_date, description, status, recurrence)
+                if task is not None and task.recurrence is not None and task_id not in self._series:
+                    self._series[task_id] = key
+                    self._manifest_dirty = True
+                return task
+            # The new date belongs to another shard: move the task there
+            task = shard.get_task(task_id)
+            if task is None:
+                return None
+            changes = {
+                "title": title, "task_date": task_date, "description": description,
+                "status": status, "recurrence": recurrence,
+            }
+            moved = replace(task, **{name: value for name, value in changes.items() if value is not None})
+            shard.delete_task(task_id)
+            self._unplace(key, task_id)
+            self._place(self.key(moved.task_date), [moved])
+        return moved
+
+    def update_occurrence(
+        self,
+        task_id: int,
+        day: date,
+        status: Optional[Status] = None,
+        skip: bool = False
+    ) -> Optional[Task]:
+        with self.transaction():
+            key = self._key_of(task_id)
+            return self._writable(key).update_occurrence(task_id, day, status, skip) if key else None
+
+    def delete_task(self, task_id: int) -> bool:
+        return self.delete_tasks([task_id]) > 0
+
+    def delete_tasks(self, task_ids: Iterable[int]) -> int:
+        by_key: dict[str, list[int]] = {}
+        with self.transaction():
+            for task_id in task_ids:
+                key = self._key_of(task_id)
+                if key is not None:
+                    by_key.setdefault(key, []).append(task_id)
+                    self._unplace(key, task_id)
+            return sum(self._writable(key).delete_tasks(ids) for key, ids in by_key.items())
+
+
+def migrate_to_shards(task_file: Path, directory: Path, granularity: str = "month", durable: bool = True) -> int:
+    # Splits an existing single task file into shards, keeping ids (and the
+    # highest id ever handed out)
+    source = TaskStorage(task_file)
+    storage = ShardedTaskStorage(directory, granularity, durable=durable)
+    with storage.transaction():
+        storage.insert_tasks(source.tasks)
+        storage._last_id = max(storage._last_id, source._next_id() - 1)
+        storage._manifest_dirty = True
+    return len(source.tasks)
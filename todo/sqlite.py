@@ -0,0 +1,391 @@
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from datetime import datetime, date
+from heapq import merge
+from itertools import islice
+from pathlib import Path
+from typing import Optional
+import json
+import sqlite3
+
+from todo import trace
+from todo.models import Recurrence, Status, Task, TaskStorage, _order, occurrences_between, series_rows
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL,
+    description TEXT,
+    created_at TEXT NOT NULL,
+    task_date TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'active',
+    recurrence TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_date ON tasks (task_date, id);
+CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status, task_date);
+"""
+
+# Full-text index over title/description. External content: the text lives
+# only in `tasks`, and the triggers keep the index in step with it. Created
+# in one write transaction, then filled from the rows already there.
+FTS_SCHEMA = """
+BEGIN IMMEDIATE;
+CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+    title, description, content='tasks', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN
+    INSERT INTO tasks_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+END;
+CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN
+    INSERT INTO tasks_fts (tasks_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description);
+END;
+CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF title, description ON tasks BEGIN
+    INSERT INTO tasks_fts (tasks_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description);
+    INSERT INTO tasks_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+END;
+INSERT INTO tasks_fts (tasks_fts) VALUES ('rebuild');
+COMMIT;
+"""
+TITLE_RANK_WEIGHT = 2.0
+
+# Recurring tasks (series) keep their rule as JSON in `recurrence`; plain
+# tasks leave it NULL. The partial index finds the few series quickly.
+SERIES_INDEX = "CREATE INDEX IF NOT EXISTS idx_tasks_series ON tasks (task_date) WHERE recurrence IS NOT NULL"
+
+COLUMNS = "id, title, description, created_at, task_date, status, recurrence"
+
+
+def _row_to_task(row: tuple) -> Task:
+    return Task(
+        id=row[0],
+        title=row[1],
+        description=row[2],
+        created_at=datetime.fromisoformat(row[3]),
+        task_date=date.fromisoformat(row[4]),
+        status=Status(row[5]),
+        recurrence=Recurrence.from_dict(json.loads(row[6])) if row[6] else None,
+    )
+
+
+def _rule_json(recurrence: Optional[Recurrence]) -> Optional[str]:
+    return json.dumps(recurrence.to_dict()) if recurrence else None
+
+
+# Same API as TaskStorage, but queries are answered by SQLite through the
+# task_date/status indexes instead of scanning an in-memory list.
+class SqliteTaskStorage:
+    def __init__(self, filename: Path, durable: bool = True) -> None:
+        self.filename = Path(filename)
+        self.filename.parent.mkdir(parents=True, exist_ok=True)
+        self.durable = durable
+        # Used by one thread at a time, but not always the opening one (see
+        # todo.multi, which opens and queries task sources on a thread pool)
+        self.conn = sqlite3.connect(self.filename, timeout=30, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        # Databases created before recurring tasks lack the column
+        if "recurrence" not in {row[1] for row in self.conn.execute("PRAGMA table_info(tasks)")}:
+            self.conn.execute("ALTER TABLE tasks ADD COLUMN recurrence TEXT")
+        self.conn.execute(SERIES_INDEX)
+        self.conn.commit()
+        self.conn.execute(f"PRAGMA synchronous = {'FULL' if durable else 'OFF'}")
+        # INSERT OR REPLACE only fires the delete trigger with this on
+        self.conn.execute("PRAGMA recursive_triggers = ON")
+        self._fts = self._ensure_fts()
+        self._in_transaction = False
+        self._changes = 0
+
+    def _ensure_fts(self) -> bool:
+        exists = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tasks_fts'"
+        ).fetchone()
+        if exists:
+            return True
+        try:
+            self.conn.executescript(FTS_SCHEMA)
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5; search() falls back to LIKE
+            if self.conn.in_transaction:
+                self.conn.rollback()
+            return False
+        return True
+
+    @contextmanager
+    def _write(self) -> Iterator[None]:
+        self._changes += 1
+        if self._in_transaction:
+            yield
+            return
+        with self.conn:
+            yield
+
+    def locked(self):
+        # SQLite's write lock is the transaction's
+        return self.transaction()
+
+    @contextmanager
+    def transaction(self) -> Iterator["SqliteTaskStorage"]:
+        # BEGIN IMMEDIATE takes SQLite's write lock up front, so concurrent
+        # read-modify-write cycles serialize like TaskStorage.transaction().
+        self.conn.execute("BEGIN IMMEDIATE")
+        self._in_transaction = True
+        try:
+            yield self
+        except BaseException:
+            self.conn.rollback()
+            raise
+        finally:
+            self._in_transaction = False
+        self.conn.commit()
+
+    def refresh(self) -> None:
+        # Every query reads the database, so there is nothing to reload
+        pass
+
+    def window_version(self, start: date, end: date) -> tuple[int, int]:
+        # data_version moves when another connection commits; our own writes
+        # are counted in _changes. Not per-day, but cheap and never stale.
+        (data_version,) = self.conn.execute("PRAGMA data_version").fetchone()
+        return data_version, self._changes
+
+    def day_version(self, day: date) -> tuple[int, int]:
+        return self.window_version(day, day)
+
+    @property
+    def tasks(self) -> list[Task]:
+        return self.load_tasks()
+
+    def load_tasks(self) -> list[Task]:
+        rows = self.conn.execute(f"SELECT {COLUMNS} FROM tasks ORDER BY id")
+        return [_row_to_task(row) for row in rows]
+
+    def save_tasks(self) -> None:
+        self.conn.commit()
+
+    def import_json(self, path: Path) -> int:
+        source = TaskStorage(path)
+        with self.transaction():
+            count = self.insert_tasks(source.tasks)
+            # The JSON file's high-water mark, so ids of tasks deleted there
+            # aren't handed out again
+            last_id = source._next_id() - 1
+            seeded = self.conn.execute(
+                "UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'tasks'", (last_id,)
+            ).rowcount
+            if not seeded:
+                self.conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('tasks', ?)", (last_id,))
+        return count
+
+    def insert_tasks(self, tasks: Iterable[Task]) -> int:
+        rows = [
+            (t.id, t.title, t.description, t.created_at.isoformat(),
+             t.task_date.isoformat(), t.status.value, _rule_json(t.recurrence))
+            for t in tasks
+        ]
+        with self._write():
+            self.conn.executemany(f"INSERT OR REPLACE INTO tasks ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def _next_id(self) -> int:
+        row = self.conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'tasks'").fetchone()
+        return (row[0] if row else 0) + 1
+
+    def add_task(
+        self,
+        title: str,
+        task_date: date,
+        description: Optional[str] = None,
+        recurrence: Optional[Recurrence] = None
+    ) -> Task:
+        created_at = datetime.now()
+        with self._write():
+            cur = self.conn.execute(
+                "INSERT INTO tasks (title, description, created_at, task_date, status, recurrence)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (title, description, created_at.isoformat(), task_date.isoformat(), Status.ACTIVE.value,
+                 _rule_json(recurrence)),
+            )
+        return Task(
+            id=cur.lastrowid,
+            title=title,
+            task_date=task_date,
+            description=description,
+            created_at=created_at,
+            recurrence=recurrence,
+        )
+
+    def get_task(self, task_id: int) -> Optional[Task]:
+        row = self.conn.execute(f"SELECT {COLUMNS} FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return _row_to_task(row) if row else None
+
+    def update_task(
+        self,
+        task_id: int,
+        title: Optional[str] = None,
+        task_date: Optional[date] = None,
+        description: Optional[str] = None,
+        status: Optional[Status] = None,
+        recurrence: Optional[Recurrence] = None
+    ) -> Optional[Task]:
+        changes = {}
+        if title is not None:
+            changes["title"] = title
+        if task_date is not None:
+            changes["task_date"] = task_date.isoformat()
+        if description is not None:
+            changes["description"] = description
+        if status is not None:
+            changes["status"] = status.value
+        if recurrence is not None:
+            changes["recurrence"] = _rule_json(recurrence)
+        if changes:
+            assignments = ", ".join(f"{column} = ?" for column in changes)
+            with self._write():
+                self.conn.execute(
+                    f"UPDATE tasks SET {assignments} WHERE id = ?",
+                    (*changes.values(), task_id),
+                )
+        return self.get_task(task_id)
+
+    def update_occurrence(
+        self,
+        task_id: int,
+        day: date,
+        status: Optional[Status] = None,
+        skip: bool = False
+    ) -> Optional[Task]:
+        if not self._in_transaction:
+            with self.transaction():
+                return self.update_occurrence(task_id, day, status, skip)
+        task = self.get_task(task_id)
+        if task is None or task.recurrence is None or not task.recurrence.occurs_on(task.task_date, day):
+            return None
+        return self.update_task(task_id, recurrence=task.recurrence.with_occurrence(day, status, skip))
+
+    def delete_task(self, task_id: int) -> bool:
+        with self._write():
+            cur = self.conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+        return cur.rowcount > 0
+
+    def delete_tasks(self, task_ids) -> int:
+        with self._write():
+            cur = self.conn.executemany("DELETE FROM tasks WHERE id = ?", [(i,) for i in task_ids])
+        return cur.rowcount
+
+    def _query(self, where: list[str], params: list) -> list[Task]:
+        sql = f"SELECT {COLUMNS} FROM tasks WHERE " + " AND ".join(["recurrence IS NULL", *where])
+        sql += " ORDER BY task_date, id"
+        with trace.span("query"):
+            tasks = [_row_to_task(row) for row in self.conn.execute(sql, params)]
+        trace.count("tasks_loaded", len(tasks))
+        return tasks
+
+    def list_tasks(self, status: Optional[Status] = None, task_date: Optional[date] = None) -> list[Task]:
+        if task_date:
+            return self.tasks_between(task_date, task_date, status)
+        return list(self.iter_tasks(status=status))
+
+    def _series(self, end: Optional[date] = None) -> list[Task]:
+        # Series starting by `end`; only these can have occurrences up to it
+        sql = f"SELECT {COLUMNS} FROM tasks WHERE recurrence IS NOT NULL"
+        params = []
+        if end:
+            sql += " AND task_date <= ?"
+            params.append(end.isoformat())
+        return [_row_to_task(row) for row in self.conn.execute(sql, params)]
+
+    def _with_occurrences(self, tasks: list[Task], start: date, end: date, status: Optional[Status]) -> list[Task]:
+        series = self._series(end)
+        if not series:
+            return tasks
+        return list(merge(tasks, occurrences_between(series, start, end, status), key=_order))
+
+    def tasks_between(self, start: date, end: date, status: Optional[Status] = None) -> list[Task]:
+        where = ["task_date BETWEEN ? AND ?"]
+        params = [start.isoformat(), end.isoformat()]
+        if status:
+            where.append("status = ?")
+            params.append(status.value)
+        return self._with_occurrences(self._query(where, params), start, end, status)
+
+    def iter_tasks(
+        self,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        status: Optional[Status] = None,
+        after: Optional[tuple[date, int]] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> Iterator[Task]:
+        where, params = ["recurrence IS NULL"], []
+        if start:
+            where.append("task_date >= ?")
+            params.append(start.isoformat())
+        if end:
+            where.append("task_date <= ?")
+            params.append(end.isoformat())
+        if status:
+            where.append("status = ?")
+            params.append(status.value)
+        if after:
+            where.append("(task_date, id) > (?, ?)")
+            params += [after[0].isoformat(), after[1]]
+        sql = f"SELECT {COLUMNS} FROM tasks WHERE " + " AND ".join(where)
+        # Rows come off idx_tasks_date already ordered; the cursor is read
+        # lazily, so nothing past what the caller consumes is fetched.
+        sql += " ORDER BY task_date, id LIMIT ? OFFSET ?"
+        rows = series_rows(self._series(end), start, end, status, after)
+        if not rows:
+            params += [-1 if limit is None else limit, offset]
+            return map(_row_to_task, self.conn.execute(sql, params))
+        # Series rows are merged in here, so paging happens after the merge
+        params += [-1 if limit is None else offset + limit, 0]
+        tasks = merge(map(_row_to_task, self.conn.execute(sql, params)), rows, key=_order)
+        return islice(tasks, offset, None if limit is None else offset + limit)
+
+    def search(self, query: str, limit: Optional[int] = 20) -> list[Task]:
+        from todo.search import tokenize
+
+        words = list(dict.fromkeys(tokenize(query)))
+        if not words:
+            return []
+        columns = ", ".join(f"tasks.{c}" for c in COLUMNS.split(", "))
+        if self._fts:
+            # Every word as a prefix query, ranked by bm25 with titles
+            # weighted over descriptions
+            sql = (
+                f"SELECT {columns} FROM tasks_fts JOIN tasks ON tasks.id = tasks_fts.rowid"
+                f" WHERE tasks_fts MATCH ? ORDER BY bm25(tasks_fts, {TITLE_RANK_WEIGHT}, 1.0), tasks.id"
+            )
+            params: list = [" ".join(f'"{word}"*' for word in words)]
+        else:
+            where = " AND ".join(["(title LIKE ? OR description LIKE ?)"] * len(words))
+            sql = f"SELECT {columns} FROM tasks WHERE {where} ORDER BY tasks.id"
+            params = [f"%{word}%" for word in words for _ in range(2)]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [_row_to_task(row) for row in self.conn.execute(sql, params)]
+
+    def date_ordinals(self, start: date, end: date) -> list[int]:
+        series = self._series(end)
+        # The GROUP BY below stays on the covering date index and so counts
+        # each series once on its first day; those are taken off the counts
+        # and the occurrences added instead.
+        firsts: dict[str, int] = {}
+        for task in series:
+            if task.task_date >= start:
+                day = task.task_date.isoformat()
+                firsts[day] = firsts.get(day, 0) + 1
+        ordinals: list[int] = []
+        rows = self.conn.execute(
+            "SELECT task_date, COUNT(*) FROM tasks WHERE task_date BETWEEN ? AND ? GROUP BY task_date",
+            (start.isoformat(), end.isoformat()),
+        )
+        for day, count in rows:
+            ordinals.extend([date.fromisoformat(day).toordinal()] * (count - firsts.get(day, 0)))
+        if series:
+            ordinals += [t.task_date.toordinal() for t in occurrences_between(series, start, end)]
+        return ordinals
+
+    def close(self) -> None:
+        self.conn.close()
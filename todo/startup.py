@@ -0,0 +1,54 @@
+import os
+import subprocess
+import sys
+import time
+
+TOP_IMPORTS = 15
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int]]:
+    # Lines look like "import time:  self [us] | cumulative | imported package"
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        imports.append((fields[2].rstrip(), int(fields[0]), int(fields[1])))
+    return imports
+
+
+def profile_startup(argv: list[str]) -> int:
+    # Runs the command in a fresh interpreter, as a user would, with the
+    # daemon bypassed so the numbers reflect a real cold start.
+    env = dict(os.environ, TODO_NO_DAEMON="1")
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "todo.cli", *argv],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    wall = time.perf_counter() - t0
+
+    sys.stdout.write(proc.stdout)
+    imports = parse_importtime(proc.stderr)
+    other = "\n".join(l for l in proc.stderr.splitlines() if not l.startswith("import time:"))
+    if other:
+        print(other, file=sys.stderr)
+
+    total_us = sum(self_us for _, self_us, _ in imports)
+    todo_us = sum(self_us for name, self_us, _ in imports if name.strip().startswith("todo"))
+    report = [
+        "",
+        f"Startup profile for: todo {' '.join(argv)}",
+        f"  wall time (process)  {wall * 1000:8.1f} ms",
+        f"  imports, total       {total_us / 1000:8.1f} ms  ({len(imports)} modules)",
+        f"  imports, todo.*      {todo_us / 1000:8.1f} ms",
+        f"  top {TOP_IMPORTS} imports by cumulative time:",
+    ]
+    for name, _, cumulative_us in sorted(imports, key=lambda i: i[2], reverse=True)[:TOP_IMPORTS]:
+        report.append(f"    {cumulative_us / 1000:8.1f} ms  {name.strip()}")
+    print("\n".join(report), file=sys.stderr)
+    return proc.returncode
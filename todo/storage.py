@@ -0,0 +1,60 @@
+from todo.config import Config
+from todo.models import TaskStorage
+
+
+def open_storage(config: Config):
+    # The backend, wrapped so that its changes are recorded for `todo undo`
+    # and archived tasks show up in date queries
+    from todo.archive import Archive, ArchivedStorage, apply_policy
+
+    if config.sources:
+        from todo.multi import open_sources
+        return open_sources(config)
+
+    storage = _open_backend(config)
+    if config.history_limit:
+        from todo.history import History, RecordedStorage
+
+        storage = RecordedStorage(storage, History(config.history_file, config.history_limit, durable=config.fsync))
+    archive = Archive(config.archive_dir, durable=config.fsync)
+    if config.archive_after_days:
+        apply_policy(storage, archive, config.archive_after_days)
+    return ArchivedStorage(storage, archive)
+
+
+def _open_backend(config: Config) -> TaskStorage:
+    if config.storage == "json":
+        if config.lazy_load:
+            from todo.lazy import LazyTaskStorage
+            return LazyTaskStorage(config.task_file, durable=config.fsync)
+        return TaskStorage(config.task_file, durable=config.fsync)
+    if config.storage == "journal":
+        from todo.journal import JournalTaskStorage
+        return JournalTaskStorage(
+            config.task_file,
+            compact_threshold=config.journal_compact_bytes,
+            durable=config.fsync,
+        )
+    if config.storage == "sqlite":
+        from todo.sqlite import SqliteTaskStorage
+        db_file = config.task_file.with_suffix(".db")
+        is_new = not db_file.exists()
+        storage = SqliteTaskStorage(db_file, durable=config.fsync)
+        # First run against an existing task file: migrate it in
+        if is_new and config.task_file.exists():
+            storage.import_json(config.task_file)
+        return storage
+    if config.storage == "binary":
+        from todo.binary import BinaryTaskStorage, json_to_binary
+        binary_file = config.task_file.with_suffix(".bin")
+        if not binary_file.exists() and config.task_file.exists():
+            json_to_binary(config.task_file, binary_file)
+        return BinaryTaskStorage(binary_file, durable=config.fsync)
+    if config.storage == "sharded":
+        from todo.sharded import MANIFEST, ShardedTaskStorage, migrate_to_shards
+        shard_dir = config.task_file.with_suffix(".shards")
+        # First run against an existing task file: split it into shards
+        if not (shard_dir / MANIFEST).exists() and config.task_file.exists():
+            migrate_to_shards(config.task_file, shard_dir, config.shard_granularity, durable=config.fsync)
+        return ShardedTaskStorage(shard_dir, config.shard_granularity, durable=config.fsync)
+    raise ValueError(f"Unknown storage backend: {config.storage!r}")
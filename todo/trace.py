@@ -0,0 +1,137 @@
+from pathlib import Path
+from time import perf_counter
+import json
+import sys
+
+# Off by default. While disabled, span() hands back one shared no-op context
+# manager and count() returns after a single flag check, so instrumented
+# code pays next to nothing.
+enabled = False
+
+_spans: dict[str, list] = {}  # "outer/inner" path -> [calls, seconds]
+_counters: dict[str, int] = {}
+_stack: list[str] = []
+_started = 0.0
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("name", "entry", "start")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __enter__(self) -> None:
+        _stack.append(self.name)
+        # Created on entry, so parents are listed before their children
+        self.entry = _spans.setdefault("/".join(_stack), [0, 0.0])
+        self.start = perf_counter()
+
+    def __exit__(self, *exc) -> None:
+        self.entry[0] += 1
+        self.entry[1] += perf_counter() - self.start
+        _stack.pop()
+
+
+def span(name: str):
+    if not enabled:
+        return _NULL_SPAN
+    return _Span(name)
+
+
+def count(name: str, n: int = 1) -> None:
+    if enabled:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def enable() -> None:
+    global enabled, _started
+    _spans.clear()
+    _counters.clear()
+    _stack.clear()
+    _started = perf_counter()
+    enabled = True
+
+
+def disable() -> None:
+    global enabled
+    enabled = False
+
+
+# REPORTING
+
+def snapshot() -> dict:
+    return {
+        "wall_seconds": perf_counter() - _started,
+        "spans": [
+            {"name": path, "calls": calls, "seconds": seconds}
+            for path, (calls, seconds) in _spans.items()
+        ],
+        "counters": dict(_counters),
+    }
+
+
+def format_report(data: dict, title: str = "") -> str:
+    wall = data["wall_seconds"] or 1e-9
+    lines = [f"Trace{': ' + title if title else ''}", f"  {'stage':<40} {'calls':>8} {'ms':>10} {'%':>6}"]
+    for s in data["spans"]:
+        depth = s["name"].count("/")
+        label = "  " * depth + s["name"].rsplit("/", 1)[-1]
+        lines.append(f"  {label:<40} {s['calls']:>8} {s['seconds'] * 1000:>10.2f} {s['seconds'] / wall:>6.1%}")
+    lines.append(f"  {'total (wall)':<40} {'':>8} {wall * 1000:>10.2f}")
+    if data["counters"]:
+        lines.append("  counters:")
+        for name, value in data["counters"].items():
+            lines.append(f"    {name:<38} {value:>19}")
+    return "\n".join(lines)
+
+
+def _metric_name(name: str) -> str:
+    return "".join(c if c.isalnum() else "_" for c in name)
+
+
+def format_prometheus(data: dict) -> str:
+    lines = [
+        "# HELP todo_span_seconds_total Time spent in each traced stage.",
+        "# TYPE todo_span_seconds_total counter",
+    ]
+    lines += [f'todo_span_seconds_total{{span="{s["name"]}"}} {s["seconds"]:.9f}' for s in data["spans"]]
+    lines += [
+        "# HELP todo_span_calls_total Times each traced stage ran.",
+        "# TYPE todo_span_calls_total counter",
+    ]
+    lines += [f'todo_span_calls_total{{span="{s["name"]}"}} {s["calls"]}' for s in data["spans"]]
+    for name, value in data["counters"].items():
+        metric = f"todo_{_metric_name(name)}_total"
+        lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+    lines += [
+        "# TYPE todo_wall_seconds gauge",
+        f"todo_wall_seconds {data['wall_seconds']:.9f}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def emit(target: str, title: str = "") -> None:
+    # "-" (or "1") prints the breakdown to stderr; a path ending in .json
+    # gets JSON, any other path Prometheus text format.
+    data = snapshot()
+    if target in ("-", "1"):
+        print(format_report(data, title), file=sys.stderr)
+        return
+    path = Path(target)
+    if path.suffix == ".json":
+        path.write_text(json.dumps({"command": title, **data}, indent=2), encoding="utf-8")
+    else:
+        path.write_text(format_prometheus(data), encoding="utf-8")
@@ -0,0 +1,178 @@
+from collections.abc import Callable, Iterable
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional, TextIO
+import os
+import select
+import struct
+import sys
+import time
+
+POLL_INTERVAL = 1.0  # seconds between stats without inotify
+IDLE_WAKEUP = 300.0  # seconds; a backstop for changes no watch can see
+SETTLE = 0.05  # a save is a burst of events; wait for the rest of it
+CLEAR = "\033[H\033[2J"
+
+# inotify(7)
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT = struct.Struct("iIII")  # wd, mask, cookie, name length
+
+# Written by readers too (file_lock opens the lock file for appending) or
+# only on the way to a rename, so changes to them mean nothing
+IGNORED_SUFFIXES = (".lock", ".tmp")
+
+
+def watched_directories(storage) -> set[Path]:
+    # Where the storage's files live: a change in one of these directories
+    # may change what the storage returns
+    if hasattr(storage, "sources"):
+        return set().union(*(watched_directories(s) for s in storage.sources.values()))
+    directories = set()
+    archive = getattr(storage, "archive", None)
+    if archive is not None:
+        directories.add(Path(archive.directory))
+        storage = storage.storage
+    directory = getattr(storage, "directory", None)
+    directories.add(Path(directory) if directory is not None else Path(storage.filename).parent)
+    return directories
+
+
+def _relevant(name: str) -> bool:
+    return not name.endswith(IGNORED_SUFFIXES)
+
+
+# Blocks until something changes in the watched directories, with
+# inotify where there is one, by polling their entries' stat otherwise.
+class Inotify:
+    def __init__(self, directories: Iterable[Path]) -> None:
+        import ctypes
+
+        # The interpreter's own symbols include libc's
+        libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        for directory in directories:
+            # Directories that don't exist yet (an archive) are left out
+            if directory.is_dir():
+                libc.inotify_add_watch(self.fd, os.fsencode(directory), IN_MASK)
+
+    def _changed(self) -> bool:
+        changed = False
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            pos = 0
+            while pos < len(data):
+                _, _, _, length = EVENT.unpack_from(data, pos)
+                pos += EVENT.size
+                name = data[pos:pos + length].rstrip(b"\0").decode(errors="replace")
+                pos += length
+                changed = changed or _relevant(name)
+
+    def wait(self, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while (remaining := deadline - time.monotonic()) > 0:
+            ready, _, _ = select.select([self.fd], [], [], remaining)
+            if ready and self._changed():
+                time.sleep(SETTLE)
+                self._changed()
+                return True
+        return False
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class StatPoller:
+    def __init__(self, directories: Iterable[Path], interval: float = POLL_INTERVAL) -> None:
+        self.directories = list(directories)
+        self.interval = interval
+        self._seen = self._signature()
+
+    def _signature(self) -> tuple:
+        entries = []
+        for directory in self.directories:
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        if _relevant(entry.name):
+                            st = entry.stat()
+                            entries.append((entry.path, st.st_ino, st.st_size, st.st_mtime_ns))
+            except FileNotFoundError:
+                continue
+        return tuple(sorted(entries))
+
+    def wait(self, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while (remaining := deadline - time.monotonic()) > 0:
+            time.sleep(min(self.interval, remaining))
+            signature = self._signature()
+            if signature != self._seen:
+                self._seen = signature
+                return True
+        return False
+
+    def close(self) -> None:
+        pass
+
+
+def open_watcher(directories: Iterable[Path], interval: float = POLL_INTERVAL):
+    directories = list(directories)
+    if sys.platform.startswith("linux"):
+        try:
+            return Inotify(directories)
+        except (OSError, AttributeError):
+            pass
+    return StatPoller(directories, interval)
+
+
+def _seconds_to_midnight() -> float:
+    now = datetime.now()
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    return (midnight - now).total_seconds() + 0.5
+
+
+# Shows render() now and again whenever its output changes. Between changes
+# it sleeps in the watcher, so an idle view costs nothing; a change reloads
+# only what the storage's refresh() finds out of date, and the render cache
+# rebuilds only the days that moved. Views depend on today's date too, so
+# there's always a wakeup at midnight.
+def watch(
+    storage,
+    render: Callable[[], str],
+    out: Optional[TextIO] = None,
+    interval: float = POLL_INTERVAL,
+    frames: Optional[int] = None,
+) -> int:
+    out = out or sys.stdout
+    clear = CLEAR if out.isatty() else ""
+    watcher = open_watcher(watched_directories(storage), interval)
+    last = None
+    drawn = 0
+    try:
+        while True:
+            if hasattr(storage, "refresh"):
+                storage.refresh()
+            text = render()
+            if text != last:
+                out.write(clear + text + "\n")
+                out.flush()
+                last = text
+                drawn += 1
+                if frames is not None and drawn >= frames:
+                    break
+            watcher.wait(min(_seconds_to_midnight(), IDLE_WAKEUP))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+    return drawn
@@ -1,7 +1,7 @@
 from datetime import date, timedelta
 from collections.abc import Sequence
+from functools import lru_cache
 from todo.models import Task, Status
-import re
 
 RESET = "\033[0m"
 BG_COLOR = "\u001b[40m" #"\033[46m"
@@ -12,7 +12,6 @@ STATUS_COLORS = {
 }
 
 COLUMN_WIDTH = 22
-ANSI_ESCAPE = re.compile(r'\x1B\[[0-?]*[ -/]*[@-~]')
 
 def _colorize(text: str, status: Status, color_enabled: bool, highlight_today: bool = False) -> str:
     if not color_enabled:
@@ -31,53 +30,31 @@ def _build_border() -> str:
     cell = "+" + "+".join(["-" * COLUMN_WIDTH] * 7) + "+"
     return cell
 
-def _ansi_ljust(s: str, width: int) -> str:
-    pad = width - len(ANSI_ESCAPE.sub("", s))
-    if pad > 0:
-        return s + " " * pad
-    return s
-
-def render_week(
-    tasks: Sequence[Task],
-    reference_date: date,
-    color_enabled: bool = True,
-    show_header:bool = True,
-) -> str:
-    
+def week_bounds(reference_date: date) -> tuple[date, date]:
     monday = reference_date - timedelta(days=reference_date.weekday())
-    sunday = monday + timedelta(days=6)
-
-    # Map tasks for each date
-    week_days = [monday + timedelta(days=i) for i in range(7)]
-    day_task_map: dict[date, list[Task]] = {d: [] for d in week_days}
-
+    return monday, monday + timedelta(days=6)
+
+@lru_cache(maxsize=4096)
+def _task_cell(task_id: int, title: str, status: Status, color_enabled: bool, highlight_today: bool) -> str:
+    # Truncated, colored and padded in one go. The padding comes from the
+    # visible text, so there's no need to strip escapes back out.
+    truncated = _truncate(f"[{task_id}] {title}", COLUMN_WIDTH)
+    colored = _colorize(truncated, status, color_enabled, highlight_today)
+    return colored + " " * (COLUMN_WIDTH - len(truncated))
+
+def day_column(day: date, tasks: Sequence[Task], color_enabled: bool, today: date) -> list[str]:
+    header = _truncate(f"{day:%a %d}", COLUMN_WIDTH)
+    lines = [header.ljust(COLUMN_WIDTH)]
+    highlight_today = (day == today)
     for task in tasks:
-        if task.task_date in day_task_map:
-            day_task_map[task.task_date].append(task)
-
-    # Build columns
-    columns: list[list[str]] = []
-    today = date.today()
-
-    for day in week_days:
-        header = f"{day:%a %d}"
-        column_lines = [_truncate(header,COLUMN_WIDTH)]
-        
-        highlight_today = (day == today)
-
-        for task in day_task_map[day]:
-            raw_text = f"[{task.id}] {task.title}"
-            truncated = _truncate(raw_text,COLUMN_WIDTH)
-            colored = _colorize(truncated, task.status, color_enabled, highlight_today)
-            column_lines.append(colored)
+        lines.append(_task_cell(task.id, task.title, task.status, color_enabled, highlight_today))
+    return lines
 
-        columns.append(column_lines)
+def assemble_week(columns: list[list[str]], monday: date, show_header: bool = True) -> str:
+    sunday = monday + timedelta(days=6)
     max_height = max(len(col) for col in columns)
+    blank = " " * COLUMN_WIDTH
 
-    for col in columns:
-        while len(col) < max_height:
-            col.append("")
- 
     # Render row by row
     lines = []
     border = _build_border()
@@ -88,10 +65,7 @@ def render_week(
     lines.append(border)
 
     for row in range(max_height):
-        row_cells = []
-        for col in columns:
-            cell = col[row]
-            row_cells.append(_ansi_ljust(cell, COLUMN_WIDTH))
+        row_cells = [col[row] if row < len(col) else blank for col in columns]
         lines.append("|" + "|".join(row_cells) + "|")
 
         if row == 0:
@@ -99,4 +73,27 @@ def render_week(
 
     lines.append(border)
     
-    return "\n".join(lines)
\ No newline at end of file
+    return "\n".join(lines)
+
+def render_week(
+    tasks: Sequence[Task],
+    reference_date: date,
+    color_enabled: bool = True,
+    show_header:bool = True,
+) -> str:
+    
+    monday, sunday = week_bounds(reference_date)
+
+    # Map tasks for each date
+    week_days = [monday + timedelta(days=i) for i in range(7)]
+    day_task_map: dict[date, list[Task]] = {d: [] for d in week_days}
+
+    for task in tasks:
+        if task.task_date in day_task_map:
+            day_task_map[task.task_date].append(task)
+
+    # Build columns
+    today = date.today()
+    columns = [day_column(day, day_task_map[day], color_enabled, today) for day in week_days]
+
+    return assemble_week(columns, monday, show_header)